@@ -0,0 +1 @@
+"""Benchmarks for the CodeGo compiler. Run them with `python -m benchmarks.<name>`."""
@@ -0,0 +1,501 @@
+"""
+Speed comparison of the execution backends.
+
+Times the loop-heavy programs of benchmarks.vm on the bytecode VM (parser.vm)
+and compiled to Python (parser.transpile), compiling included; the Python
+backend must be at least --min-speedup times faster on every one.
+
+CASES, programs exercising each rule of the language and each runtime error,
+and RandomProgram, which generates seeded random programs, are the programs
+that tests/test_backends.py runs on both backends, along with the samples in
+tests/valid, to check that they print the same and fail with the same errors.
+
+Usage:
+    python -m benchmarks.backends [--scale 1.0] [--min-speedup 2.0]
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+from benchmarks.vm import PROGRAMS
+from parser import CodeGoParser
+from parser.compiler import compile_program
+from parser.lexer import CodeGoLexer
+from parser.transpile import transpile
+from parser.vm import VM
+
+VALID_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'valid')
+
+# Programs exercising the semantics the backends must agree on, errors included
+CASES = {
+    'teksto': '''
+Teksto s = "a"
+s = s + 1 + 2.5 + Tama + [1, "b"] + {k: "v"}
+print(s, " ", 1 + "x", " ", "ab" * 2, " ", 3 * "c")
+print("b" > "a", " ", "" + "")
+''',
+    'numbers': '''
+print(7 / 2, " ", -7 / 2, " ", 7 / 2.0, " ", 7.5 / 2, " ", 2 * 3 - 4 / 2, " ", Tama + Tama)
+print(1 < 2, 2 <= 1, 3 >= 3, 1.5 > 1)
+''',
+    'kapag': '''
+Lista values = [0, 1, 2, Tama, Mali, "0", 1.0, 0.0]
+Bawat (v Sa values) {
+    Kapag (v) {
+        Kaso Mali:
+            print("Mali")
+            Hinto
+        Kaso 0:
+            print("zero")
+            Hinto
+        Kaso 1:
+            print("one")
+            Hinto
+        Kaso Tama:
+            print("Tama")
+            Hinto
+        Kaso "0":
+            print("text")
+            Hinto
+        Kaso 1 + 1:
+            print("two")
+            Hinto
+    }
+}
+''',
+    'bawat': '''
+Lista xs = [1, 2]
+Bawat (x Sa xs) {
+    xs = [9]
+    print(x)
+}
+Bagay o = {b: 1, a: 2}
+Bawat (k Sa o) {
+    print(k + "!", o.b)
+}
+Teksto word = "hey"
+Bawat (c Sa word) {
+    print(c * 2, c + 1)
+}
+''',
+    'gawa': '''
+Numero total = 0
+Gawa add (Numero n) {
+    Numero square = n * n
+    total = total + square
+    Gawa inner () {
+        print("inner")
+    }
+    inner()
+}
+Numero i = 0
+Habang (i < 3) {
+    add(i)
+    i = i + 1
+}
+print(total, " ", add(1), " ", add)
+Gawa fact (Numero n) {
+    Kung (n < 2) {
+        result = 1
+    }
+    Kung (n > 1) {
+        fact(n - 1)
+        result = result * n
+    }
+}
+Numero result = 0
+fact(10)
+print(result)
+''',
+    'defaults': '''
+Numero n
+Desimal d
+Teksto t
+Tsek k
+Lista l
+Bagay b
+print(n, d, t, k, l, b, [t])
+''',
+    'undeclared': '''
+Numero i = 0
+i = i + j
+''',
+    'undeclared-update': '''
+k = k + 1
+''',
+    'undeclared-branch': '''
+Numero i = 0
+Habang (i < limit) {
+    i = i + 1
+}
+''',
+    'redeclared': '''
+Numero i = 0
+Kung (i < 1) {
+    Teksto i = "a"
+}
+''',
+    'out-of-block': '''
+Kung (Tama) {
+    Numero inner = 1
+}
+print(inner)
+''',
+    'global-before-declaration': '''
+Gawa f () {
+    print(later)
+}
+f()
+Numero later = 1
+''',
+    'shadowed-global': '''
+Numero total = 1
+Gawa f (Numero n) {
+    print(total)
+    Kung (n > 0) {
+        Numero total = n * 10
+        print(total)
+    }
+    Lista totals = [n, n + 1]
+    Bawat (total Sa totals) {
+        print(total)
+    }
+    Gawa g (Numero total) {
+        print(total + 1)
+    }
+    g(n)
+    total = total + 1
+}
+f(2)
+print(total)
+''',
+    'static-types': '''
+Numero a = "x"
+''',
+    'static-operand-types': '''
+Numero i = 0
+i = i - "a"
+''',
+    'static-argument': '''
+Gawa f (Numero n) {
+    print(n)
+}
+f(1)
+f("a")
+''',
+    'static-argument-count': '''
+Gawa f (Numero a, Numero b) {
+    print(a)
+}
+f(1)
+''',
+    'typed-operators': '''
+Numero n = 7
+Desimal d = 7
+Teksto t = "t"
+Bagay o = {k: Tama}
+print(n / 2, " ", d / 2, " ", n / 2.0, " ", t + n, n + t, t + [n, t], " ", t + t)
+Kapag (n) {
+    Kaso 7.0:
+        print("seven")
+        Hinto
+}
+Kapag (o.k) {
+    Kaso 1:
+        print("one")
+        Hinto
+    Kaso Tama:
+        print("Tama")
+        Hinto
+}
+''',
+    'operand-types': '''
+Bagay v = {s: "a"}
+Numero i = 0
+i = i - v.s
+''',
+    'compare-types': '''
+Bagay v = {s: "a"}
+Numero i = 0
+Habang (i < v.s) {
+    i = i + 1
+}
+''',
+    'list-plus-number': '''
+Bagay v = {n: 1}
+print([1] + v.n)
+''',
+    'multiply-lists': '''
+Bagay v = {l: [2]}
+print([1] * v.l)
+''',
+    'negate-text': '''
+Bagay v = {s: "a"}
+print(-v.s)
+''',
+    'division-by-zero': '''
+Numero i = 1
+i = i / 0
+''',
+    'missing-property': '''
+Bagay o = {a: 1}
+print(o.b)
+''',
+    'property-of-number': '''
+Bagay v = {n: 1}
+print(v.n.b)
+''',
+    'property-of-text': '''
+Bagay v = {s: "abc"}
+print(v.s.b)
+''',
+    'call-number': '''
+Bagay v = {n: 1}
+print(v.n(2))
+''',
+    'argument-count': '''
+Gawa f (Numero a, Numero b) {
+    print(a)
+}
+Bagay v = {f: f}
+print(v.f(1))
+''',
+    'too-many-arguments': '''
+Gawa f () {
+    print(1)
+}
+Lista fs = [f]
+Bawat (g Sa fs) {
+    g(1, 2)
+}
+''',
+    'loop-over-number': '''
+Bagay v = {n: 3}
+Lista ns = [v.n]
+Bawat (n Sa ns) {
+    Bawat (x Sa n) {
+        print(x)
+    }
+}
+''',
+    'error-in-gawa': '''
+Gawa f (Numero a) {
+    print(a / 0)
+}
+f(1)
+''',
+    'python-constants': '''
+Numero None = 1
+Numero True = 2
+Teksto False = "f"
+Numero __debug__ = 4
+Gawa f (Numero None) {
+    print(None, " ", True, " ", __debug__)
+    True = True + 1
+    Numero False = 7
+    print(False)
+}
+f(5)
+print(None, " ", True, " ", False, " ", __debug__)
+''',
+    'prefixed-names': '''
+Numero _cg_divide = 6
+Numero _cg_inv0 = 2
+Teksto _cg_text0 = "t"
+Numero _cg_None = 1
+Numero None = 5
+Numero x = 1
+Gawa _cg_local_x (Numero _cg_kapag) {
+    Numero x = _cg_kapag
+    _cg_divide = _cg_divide / 2
+    Kapag (x) {
+        Kaso 3:
+            print("three ", _cg_inv0 + None)
+            Hinto
+    }
+    print(x, " ", _cg_divide, " ", _cg_text0, " ", _cg_None)
+}
+_cg_local_x(3)
+print(x / 1, " ", _cg_local_x)
+Gawa g () {
+    print(_cg_late)
+}
+g()
+Numero _cg_late = 1
+''',
+    'python-constant-undeclared': '''
+Gawa g () {
+    print(None)
+}
+g()
+Numero None = 1
+''',
+    'gawa-values': '''
+Gawa f () {
+    print(print, " ", f)
+}
+f()
+print([print, f], " ", {p: print})
+print("print is " + print)
+''',
+}
+
+
+class RandomProgram:
+    """
+    Generates a random program that declares a few variables of each type and
+    then assigns, prints, loops over, compares and passes them to functions.
+    Loops are bounded, so every program ends; some fail on purpose, e.g. by
+    dividing by zero or subtracting from a Teksto.
+    """
+
+    NUMBERS = ('a', 'b', 'c')
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.lines = []
+        self.counters = 0
+        self.functions = []
+
+    def generate(self):
+        self.lines += ['Numero a = 1', 'Numero b = 2', 'Numero c = 3', 'Desimal d = 1.5', 'Teksto t = "t"', 'Teksto w = "w"',
+                       'Tsek k = Tama', 'Lista l = [1, "x", 2.5]', 'Bagay o = {p: 1, q: "w"}']
+        for _ in range(self.random.randint(3, 12)):
+            self.statement(0)
+        self.lines.append('print(a, " ", b, " ", c, " ", d, " ", t, " ", k, " ", l, " ", o)')
+        return '\n'.join(self.lines) + '\n'
+
+    def number(self, depth=0):
+        choice = self.random.random()
+        if depth > 2 or choice < 0.3:
+            return self.random.choice(self.NUMBERS)
+        if choice < 0.5:
+            return str(self.random.randint(-3, 9))
+        if choice < 0.55:
+            # Properties can have any type, so they fail at run time or not at all
+            return self.random.choice(('o.p', 'o.q'))
+        if choice < 0.6:
+            return f'-{self.number(depth + 1)}'
+        # Numbers are only multiplied by small literals and strings never by themselves,
+        # so that values stay small however often the loops around them run
+        operator = self.random.choice('+-*/')
+        if operator == '*' or operator == '/' and self.random.random() < 0.9:
+            right = str(self.random.randint(1, 3))
+        else:
+            right = self.number(depth + 1)
+        return f'({self.number(depth + 1)} {operator} {right})'
+
+    def value(self):
+        choice = self.random.random()
+        if choice < 0.6:
+            return self.number()
+        if choice < 0.8:
+            return self.random.choice(('w', '"s"', 'o.q', 'l', 'o', 'k', '[a, w]'))
+        return f'{self.value()} + " " + {self.value()}'
+
+    def block(self, depth):
+        start = len(self.lines)
+        for _ in range(self.random.randint(1, 3)):
+            self.statement(depth + 1)
+        self.lines[start:] = ['    ' + line for line in self.lines[start:]]
+
+    def statement(self, depth):
+        choice = self.random.random()
+        if depth > 2 or choice < 0.3:
+            if self.random.random() < 0.2:
+                self.lines.append(f'd = {self.number()} {self.random.choice("+-*/")} {self.random.choice(("d", "0.5"))}')
+            else:
+                self.lines.append(f'{self.random.choice(self.NUMBERS)} = {self.number()}')
+        elif choice < 0.4:
+            self.lines.append(f't = {self.value()} + t')
+        elif choice < 0.5:
+            self.lines.append(f'print({self.value()}, " ", {self.value()})')
+        elif choice < 0.6:
+            operator = self.random.choice(('<', '>', '<=', '>='))
+            self.lines.append(f'Kung ({self.number()} {operator} {self.number()}) {{')
+            self.block(depth)
+            self.lines.append('}')
+        elif choice < 0.7:
+            counter = f'i{self.counters}'
+            self.counters += 1
+            self.lines.append(f'Numero {counter} = 0')
+            self.lines.append(f'Habang ({counter} < {self.random.randint(0, 4)}) {{')
+            self.block(depth)
+            self.lines.append(f'    {counter} = {counter} + 1')
+            self.lines.append('}')
+        elif choice < 0.8:
+            self.lines.append(f'Bawat (x{depth} Sa {self.random.choice("low")}) {{')
+            self.lines.append(f'    print(x{depth})')
+            self.block(depth)
+            self.lines.append('}')
+        elif choice < 0.9:
+            self.lines.append(f'Kapag ({self.number()} - {self.number()}) {{')
+            for case in self.random.sample(('0', '1', '2', 'Tama', '"t"', 'c'), 3):
+                self.lines.append(f'    Kaso {case}:')
+                self.block(depth + 1)
+                self.lines.append('    Hinto')
+            self.lines.append('}')
+        elif self.functions and self.random.random() < 0.5:
+            name, count = self.random.choice(self.functions)
+            self.lines.append(f'{name}({", ".join(self.number() for _ in range(count))})')
+        elif depth:
+            self.lines.append(f'print({self.value()})')
+        else:
+            # Functions are declared at the top level, where the rest of the program can
+            # call them, and can only call those declared before them, so none recurses
+            name = f'g{len(self.functions)}'
+            count = self.random.randint(0, 2)
+            self.lines.append(f'Gawa {name} ({", ".join(f"Numero p{i}" for i in range(count))}) {{')
+            self.lines.append(f'    Numero local = {self.number()}')
+            self.block(depth)
+            self.lines.append('}')
+            self.functions.append((name, count))
+
+
+def bench_program(source):
+    """ Returns the times in seconds of the VM and the Python backend on a program """
+    statements = CodeGoParser(CodeGoLexer.token_stream(source)).parse()
+
+    start = time.perf_counter()
+    VM(io.StringIO()).run(compile_program(statements))
+    vm_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    transpile(statements).run(io.StringIO())
+    py_seconds = time.perf_counter() - start
+
+    return vm_seconds, py_seconds
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='CodeGo execution backend comparison')
+    arg_parser.add_argument('--scale', type=float, default=1.0,
+                            help='multiplies the number of loop iterations (default: %(default)s)')
+    arg_parser.add_argument('--min-speedup', type=float, default=2.0,
+                            help='smallest allowed ratio of the VM time to the Python backend time '
+                                 '(default: %(default)s)')
+    args = arg_parser.parse_args()
+
+    failed = False
+    print(f"{'program':<8} {'iterations':>11} {'vm ms':>10} {'python ms':>10} {'speedup':>8}")
+    for name, (generate, iterations) in PROGRAMS.items():
+        iterations = max(1, int(iterations * args.scale))
+        vm_seconds, py_seconds = bench_program(generate(iterations))
+        speedup = vm_seconds / py_seconds
+        print(f'{name:<8} {iterations:>11,} {vm_seconds * 1000:>10,.1f} {py_seconds * 1000:>10,.1f} '
+              f'{speedup:>7.1f}x')
+        if speedup < args.min_speedup:
+            print(f'{name}: the Python backend is only {speedup:.1f}x faster than the VM')
+            failed = True
+
+    if failed:
+        sys.exit(1)
+    print(f'\nThe Python backend is at least {args.min_speedup}x faster on every program.')
+
+
+if __name__ == '__main__':
+    main()
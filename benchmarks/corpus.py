@@ -0,0 +1,214 @@
+"""
+Seeded generator of synthetic CodeGo programs.
+
+The programs mix every construct the parser understands: variable declarations,
+assignments, expressions with every operator, nested Kung/Habang/Bawat/Kapag
+blocks, Gawa declarations and calls, and large Lista literals of Bagay objects.
+
+The same seed and size always produce the same program, so results are
+comparable between runs.
+
+Usage:
+    python -m benchmarks.corpus SIZE [--seed N] [-o FILE]
+"""
+
+import argparse
+import random
+import sys
+
+BASIC_TYPES = ('Numero', 'Desimal', 'Teksto', 'Tsek')
+OPERATORS = ('+', '-', '*', '/', '>', '<', '>=', '<=')
+SYLLABLES = ('ba', 'ka', 'da', 'ga', 'ha', 'la', 'ma', 'na', 'pa', 'ra', 'sa', 'ta', 'wa', 'ya',
+             'lu', 'to', 'pre', 'syo', 'bi', 'li', 'ul', 'am', 'su', 'kli', 'ba', 'yad')
+WORDS = ('Pritong Itlog', 'Adobo', 'Sinigang', 'Kare-Kare', 'Lechon', 'Halo-halo', 'Tapsilog',
+         'May sukli na ', 'Salamat po', 'Huwag ilimbag ang resibo')
+
+UNITS = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(text):
+    """ Converts '10KB', '1MB' or a plain number of bytes to an int """
+    text = text.strip().upper()
+    for unit, factor in UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def format_size(size):
+    """ Converts a number of bytes to the shortest exact '10KB' style label """
+    for unit, factor in reversed(list(UNITS.items())):
+        if size >= factor and size % factor == 0:
+            return f'{size // factor}{unit}'
+    return f'{size}B'
+
+
+class CorpusGenerator:
+    """ Generates random but syntactically valid CodeGo programs """
+
+    def __init__(self, seed=0, max_depth=4):
+        self.random = random.Random(seed)
+        self.max_depth = max_depth
+        self.names = [self.name() for _ in range(200)]
+        self.functions = [self.name() for _ in range(50)]
+
+    def name(self):
+        parts = self.random.choices(SYLLABLES, k=self.random.randint(2, 4))
+        return ''.join(parts) + str(self.random.randint(0, 99))
+
+    def literal(self):
+        kind = self.random.random()
+        if kind < 0.4:
+            return str(self.random.randint(0, 10000))
+        if kind < 0.6:
+            return f'{self.random.randint(0, 1000)}.{self.random.randint(0, 99):02d}'
+        if kind < 0.9:
+            return f'"{self.random.choice(WORDS)}"'
+        return self.random.choice(('Tama', 'Mali'))
+
+    def operand(self):
+        kind = self.random.random()
+        if kind < 0.45:
+            return self.random.choice(self.names)
+        if kind < 0.55:
+            return f'{self.random.choice(self.names)}.{self.random.choice(self.names)}'
+        if kind < 0.6:
+            return f'-{self.random.choice(self.names)}'
+        return self.literal()
+
+    def expression(self, depth=0):
+        terms = [self.operand()]
+        for _ in range(self.random.randint(0, 3)):
+            kind = self.random.random()
+            if depth < 2 and kind < 0.2:
+                term = f'({self.expression(depth + 1)})'
+            elif depth < 2 and kind < 0.25:
+                term = self.call(depth + 1)
+            else:
+                term = self.operand()
+            terms.append(f'{self.random.choice(OPERATORS)} {term}')
+        return ' '.join(terms)
+
+    def bagay(self, indent):
+        inner = indent + '    '
+        properties = [f'{inner}{self.random.choice(self.names)}: {self.expression()}'
+                      for _ in range(self.random.randint(1, 4))]
+        return '{\n' + ',\n'.join(properties) + f'\n{indent}}}'
+
+    def lista(self, indent, items):
+        parts = []
+        for _ in range(items):
+            if self.random.random() < 0.6:
+                parts.append(self.bagay(indent))
+            else:
+                parts.append(self.literal())
+        return '[' + ', '.join(parts) + ']'
+
+    def call(self, depth=1):
+        args = ', '.join(self.expression(depth) for _ in range(self.random.randint(0, 4)))
+        return f'{self.random.choice(self.functions + ["print"])}({args})'
+
+    def block(self, indent, depth):
+        return '\n'.join(self.statement(indent, depth) for _ in range(self.random.randint(1, 4)))
+
+    def statement(self, indent, depth):
+        """ Generates one statement, nesting blocks until max_depth is reached """
+        inner = indent + '    '
+        kind = self.random.random()
+        if depth >= self.max_depth:
+            kind *= 0.5
+
+        if kind < 0.2:
+            basic_type = self.random.choice(BASIC_TYPES)
+            return f'{indent}{basic_type} {self.random.choice(self.names)} = {self.expression()}'
+        if kind < 0.3:
+            return f'{indent}{self.random.choice(self.names)} = {self.expression()}'
+        if kind < 0.42:
+            return f'{indent}{self.call()}'
+        if kind < 0.47:
+            return f'{indent}# {self.random.choice(WORDS)}'
+        if kind < 0.5:
+            items = self.random.randint(1, 6)
+            return f'{indent}Lista {self.random.choice(self.names)} = {self.lista(indent, items)}'
+        if kind < 0.65:
+            return (f'{indent}Kung ({self.expression()}) {{\n'
+                    f'{self.block(inner, depth + 1)}\n{indent}}}')
+        if kind < 0.75:
+            return (f'{indent}Habang ({self.expression()}) {{\n'
+                    f'{self.block(inner, depth + 1)}\n{indent}}}')
+        if kind < 0.85:
+            return (f'{indent}Bawat ({self.random.choice(self.names)} Sa {self.random.choice(self.names)}) {{\n'
+                    f'{self.block(inner, depth + 1)}\n{indent}}}')
+        if kind < 0.93:
+            cases = []
+            for _ in range(self.random.randint(1, 3)):
+                cases.append(f'{inner}Kaso {self.literal()}:\n'
+                             f'{self.block(inner + "    ", depth + 1)}\n{inner}    Hinto')
+            return f'{indent}Kapag ({self.expression()}) {{\n' + '\n'.join(cases) + f'\n{indent}}}'
+
+        parameters = []
+        for _ in range(self.random.randint(0, 3)):
+            if self.random.random() < 0.5:
+                parameters.append(f'{self.random.choice(BASIC_TYPES)} {self.random.choice(self.names)}')
+            else:
+                parameters.append(self.random.choice(self.names))
+        return (f'{indent}Gawa {self.random.choice(self.functions)} ({", ".join(parameters)}) {{\n'
+                f'{self.block(inner, depth + 1)}\n{indent}}}')
+
+    def top_level(self):
+        """ Generates one top-level statement; every tenth is a large Lista of Bagay objects """
+        if self.random.random() < 0.1:
+            items = self.random.randint(20, 100)
+            return f'Lista {self.random.choice(self.names)} = {self.lista("", items)}'
+        return self.statement('', 0)
+
+    def generate(self, size):
+        """
+        Generates a program of at least `size` characters.
+
+        Args:
+            size (int): The minimum length of the program.
+
+        Returns:
+            str: The program.
+        """
+
+        parts = []
+        length = 0
+        while length < size:
+            part = self.top_level() + '\n\n'
+            parts.append(part)
+            length += len(part)
+        return ''.join(parts)
+
+    def write(self, size, file):
+        """ Writes a program of at least `size` characters to a file, one statement at a time """
+        length = 0
+        while length < size:
+            part = self.top_level() + '\n\n'
+            file.write(part)
+            length += len(part)
+
+
+def generate(size, seed=0):
+    """ Generates a program of at least `size` characters with the given seed """
+    return CorpusGenerator(seed).generate(size)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Generate a synthetic CodeGo program')
+    arg_parser.add_argument('size', type=parse_size, help='minimum size, e.g. 64KB or 10MB')
+    arg_parser.add_argument('--seed', type=int, default=0, help='random seed (default: %(default)s)')
+    arg_parser.add_argument('-o', '--output', help='output file (default: standard output)')
+    args = arg_parser.parse_args()
+
+    generator = CorpusGenerator(args.seed)
+    if args.output:
+        with open(args.output, 'w') as file:
+            generator.write(args.size, file)
+    else:
+        generator.write(args.size, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Deep nesting benchmark.
+
+Parses programs with blocks, blocks used as values and parenthesized
+expressions nested thousands of levels deep, far beyond the Python recursion
+limit, and checks that the parse time grows linearly with the depth. That the
+trees come out right is checked by tests/test_depth.py.
+
+Usage:
+    python -m benchmarks.depth [--depths 1000,10000,100000] [--tolerance 3.0]
+"""
+
+import argparse
+import sys
+import time
+
+from parser import CodeGoParser
+from parser.lexer import CodeGoLexer
+
+DEFAULT_DEPTHS = '1000,10000,100000'
+
+
+def nested_blocks(depth):
+    """ Returns `depth` Kung, Habang and Bawat blocks nested inside each other """
+    openers = ('Kung (x > 1) {\n', 'Habang (x < 2) {\n', 'Bawat (x Sa xs) {\n')
+    return (''.join(openers[i % 3] for i in range(depth))
+            + 'print(x)\n'
+            + '}\n' * depth)
+
+
+def nested_parens(depth):
+    """ Returns a declaration whose expression is nested `depth` parentheses deep """
+    return 'Numero x = ' + '(1 + ' * depth + '1' + ')' * depth + '\n'
+
+
+def nested_gawa(depth):
+    """ Returns `depth` Gawa declarations nested inside each other """
+    return 'Gawa f (x) {\n' * depth + 'x = x + 1\n' + '}\n' * depth
+
+
+def nested_kapag(depth):
+    """ Returns `depth` Kapag statements nested inside each other's cases """
+    return ('Kapag (x) {\nKaso 1:\n' * depth
+            + 'print(x)\n'
+            + 'Hinto\n}\n' * depth)
+
+
+def nested_values(depth):
+    """ Returns an assignment of `depth` blocks used as values, each assigning the next """
+    return 'x = ' + '{ y = ' * depth + '1' + ' }' * depth + '\n'
+
+
+GENERATORS = {
+    'blocks': nested_blocks,
+    'parens': nested_parens,
+    'gawa': nested_gawa,
+    'kapag': nested_kapag,
+    'values': nested_values,
+}
+
+
+def bench_depth(generate, depth):
+    """ Returns the parse time in seconds of the program `generate(depth)` """
+    tokens = CodeGoLexer.token_stream(generate(depth))
+    start = time.perf_counter()
+    CodeGoParser(tokens).parse()
+    return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='CodeGo deep nesting benchmark')
+    arg_parser.add_argument('--depths', default=DEFAULT_DEPTHS,
+                            help='comma separated nesting depths (default: %(default)s)')
+    arg_parser.add_argument('--tolerance', type=float, default=3.0,
+                            help='largest allowed growth of the time per level between the '
+                                 'smallest and largest depth (default: %(default)s)')
+    args = arg_parser.parse_args()
+
+    depths = [int(depth) for depth in args.depths.split(',')]
+    failed = False
+    print(f"{'program':<8} {'depth':>8} {'parse ms':>10} {'us/level':>10}")
+    for name, generate in GENERATORS.items():
+        per_level = []
+        for depth in depths:
+            seconds = bench_depth(generate, depth)
+            per_level.append(seconds / depth)
+            print(f'{name:<8} {depth:>8,} {seconds * 1000:>10,.2f} {seconds / depth * 1e6:>10,.3f}')
+
+        growth = per_level[-1] / per_level[0]
+        if growth > args.tolerance:
+            print(f'{name}: time per level grew {growth:.1f}x, parsing is not linear in the depth')
+            failed = True
+
+    if failed:
+        sys.exit(1)
+    print('\nParse time is linear in the nesting depth.')
+
+
+if __name__ == '__main__':
+    main()
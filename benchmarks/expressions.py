@@ -0,0 +1,126 @@
+"""
+Measures expression parsing on expression-heavy input.
+
+The corpus is a long run of declarations whose values are operator chains
+over names, property accesses and literals, using only the operators the
+earlier left-to-right expression loop understood. The current precedence
+climbing engine is compared against that loop, which is kept here only as
+a reference point.
+
+Usage:
+    python -m benchmarks.expressions [--statements N] [--chain N] [--repeat N]
+"""
+
+import argparse
+import random
+import time
+
+from parser import CodeGoParser
+from parser.lexer import CodeGoLexer
+from parser.nodes import BinaryOp, Identifier, Literal, PropertyAccess
+from parser.tokens import (
+    DOT, GREATER, GREATER_EQUAL, IDENTIFIER, LESS, LESS_EQUAL, LPAREN, MINUS, NUMERO, PLUS,
+    RPAREN, TEKSTO, TSEK, token_repr,
+)
+
+OPERATORS = ('+', '-', '>', '<', '>=', '<=')
+REFERENCE_OPERATORS = frozenset((PLUS, MINUS, GREATER, LESS, GREATER_EQUAL, LESS_EQUAL))
+
+
+class ReferenceParser(CodeGoParser):
+    """ CodeGoParser with the flat left-to-right expression loop it used to have """
+
+    def resumable_expression(self):
+        # Grammar rules parse their expressions through this generator; the
+        # reference loop has no blocks used as values to hand back
+        return self.expression()
+        yield
+
+    def expression(self):
+        stack = []
+        left = operator = None
+        while True:
+            if self.current_token()[0] == LPAREN:
+                self.eat(LPAREN)
+                stack.append((left, operator))
+                left = operator = None
+                continue
+
+            term = self.term()
+            while True:
+                left = term if operator is None else BinaryOp(operator[1], left, term, operator[2])
+                if self.current_token()[0] in REFERENCE_OPERATORS:
+                    operator = self.eat(self.current_token()[0])
+                    break
+                if not stack:
+                    return left
+                self.eat(RPAREN)
+                term = left
+                left, operator = stack.pop()
+
+    def term(self):
+        current_token = self.current_token()[0]
+        if current_token == IDENTIFIER:
+            identifier = self.eat(IDENTIFIER)
+            result = Identifier(identifier[1], identifier[2])
+            while self.current_token()[0] == DOT:
+                self.eat(DOT)
+                property_name = self.eat(IDENTIFIER)
+                result = PropertyAccess(result, property_name[1], property_name[2])
+            return result
+        elif current_token in (NUMERO, TSEK, TEKSTO):
+            return Literal(*self.eat(current_token))
+        raise RuntimeError(f'Unexpected token in term: {token_repr(self.current_token())}')
+
+
+def build_corpus(statements, chain, seed=0):
+    """ Returns `statements` declarations, each an operator chain of about `chain` terms """
+    rand = random.Random(seed)
+    names = [f'halaga{i}' for i in range(100)]
+    lines = []
+    for i in range(statements):
+        terms = []
+        for _ in range(rand.randint(chain // 2, chain)):
+            kind = rand.random()
+            if kind < 0.5:
+                term = rand.choice(names)
+            elif kind < 0.65:
+                term = f'{rand.choice(names)}.{rand.choice(names)}'
+            elif kind < 0.8:
+                term = f'({rand.choice(names)} + {rand.randint(0, 99)})'
+            else:
+                term = str(rand.randint(0, 10000))
+            terms.append(term)
+        expression = terms[0] + ''.join(f' {rand.choice(OPERATORS)} {term}' for term in terms[1:])
+        lines.append(f'Numero x{i} = {expression}\n')
+    return ''.join(lines)
+
+
+def measure(parser_class, tokens, repeat):
+    """ Returns the best parse time in seconds over `repeat` runs """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser_class(tokens).parse()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='CodeGo expression parsing benchmark')
+    arg_parser.add_argument('--statements', type=int, default=20000, help='number of declarations')
+    arg_parser.add_argument('--chain', type=int, default=16, help='most terms per expression')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='timed runs, best is kept')
+    args = arg_parser.parse_args()
+
+    tokens = CodeGoLexer.token_stream(build_corpus(args.statements, args.chain))
+    reference = measure(ReferenceParser, tokens, args.repeat)
+    current = measure(CodeGoParser, tokens, args.repeat)
+
+    print(f'tokens:              {len(tokens):,}')
+    print(f'left-to-right loop:  {len(tokens) / reference:,.0f} tokens/sec')
+    print(f'precedence climbing: {len(tokens) / current:,.0f} tokens/sec ({reference / current:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Incremental reparsing benchmark.
+
+The time of edits to a generated program held in a parser.incremental
+Document is compared with the time of a full parse, both while the program is
+valid and while it has a block left open near its start, as it has while
+someone is typing. That edits give the same statements as a full parse is
+checked by tests/test_incremental.py.
+
+Usage:
+    python -m benchmarks.incremental [--size 1MB] [--edits 300] [--seed 0]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from parser.incremental import Document
+
+from .corpus import generate, parse_size
+
+# Statement inserted by the timed edits
+STATEMENT = 'Numero bago = dami * 2 + 1\n'
+
+
+def time_edits(document, edits, rand):
+    """ Returns the times of `edits` edits inserting a statement, in seconds """
+    times = []
+    for _ in range(edits):
+        offset = document.start(rand.randrange(len(document.nodes)))
+        start = time.perf_counter()
+        document.edit(offset, offset, STATEMENT)
+        times.append(time.perf_counter() - start)
+    return sorted(times)
+
+
+def report_times(name, times, full):
+    """ Prints the median and 95th percentile of edit times """
+    median = times[len(times) // 2]
+    p95 = times[len(times) * 95 // 100]
+    print(f'{name:<20} {median * 1000:,.2f} ms median, {p95 * 1000:,.2f} ms 95th percentile '
+          f'({full / median:,.0f}x faster than a full parse)')
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='CodeGo incremental reparsing benchmark')
+    arg_parser.add_argument('--size', type=parse_size, default=parse_size('1MB'),
+                            help='size of the generated program (default: 1MB)')
+    arg_parser.add_argument('--edits', type=int, default=300, help='number of edits of each kind')
+    arg_parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = arg_parser.parse_args()
+
+    rand = random.Random(args.seed)
+    source = generate(args.size, args.seed)
+    start = time.perf_counter()
+    document = Document(source)
+    full = time.perf_counter() - start
+    print(f'lines:      {source.count(chr(10)):,}')
+    print(f'full parse: {full * 1000:,.1f} ms')
+    report_times('edit:', time_edits(document, args.edits, rand), full)
+
+    # A block opened in the first statement and never closed
+    offset = document.text().index('\n') + 1
+    document.edit(offset, offset, 'Kung (bukas) {\n')
+    if document.syntax_error() is None:
+        print('opening a block near the start left the program valid')
+        sys.exit(1)
+    report_times('edit while invalid:', time_edits(document, args.edits, rand), full)
+
+
+if __name__ == '__main__':
+    main()
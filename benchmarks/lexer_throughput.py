@@ -0,0 +1,127 @@
+"""
+Measures CodeGoLexer throughput in tokens per second.
+
+The corpus is built by repeating the sample programs under tests/valid until it
+reaches the requested size. The current lexer is compared against the original
+alternation-regex lexer, which is kept here only as a reference point.
+
+Usage:
+    python -m benchmarks.lexer_throughput [--size BYTES] [--repeat N]
+"""
+
+import argparse
+import glob
+import os
+import re
+import time
+
+from parser.lexer import CodeGoLexer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The token specification used before keywords moved to a lookup table
+REFERENCE_SPECIFICATION = [
+    ('BASIC_TYPE', r'Numero|Desimal|Teksto|Tsek|Lista|Bagay'),
+    ('NUMERO',    r'\d+(\.\d+)?'),
+    ('TEKSTO',    r'"[^"]*"'),
+    ('TSEK',   r'Tama|Mali'),
+    ('KUNG', r'Kung'),
+    ('KAPAG', r'Kapag'),
+    ('KASO', r'Kaso'),
+    ('HINTO', r'Hinto'),
+    ('HABANG',    r'Habang'),
+    ('BAWAT',     r'Bawat'),
+    ('SA',        r'Sa'),
+    ('GAWA', r'Gawa'),
+    ('IDENTIFIER', r'[a-zA-Z_][a-zA-Z0-9_]*'),
+    ('NEWLINE',   r'\n'),
+    ('COMMENT',   r'#.*'),
+    ('WHITESPACE', r'\s+'),
+    ('DOT',       r'\.'),
+    ('PLUS',      r'\+'),
+    ('MINUS',     r'-'),
+    ('TIMES',     r'\*'),
+    ('DIVIDE',    r'/'),
+    ('LPAREN',    r'\('),
+    ('RPAREN',    r'\)'),
+    ('LBRACE',    r'\{'),
+    ('RBRACE',    r'\}'),
+    ('LBRACKET',  r'\['),
+    ('RBRACKET',  r'\]'),
+    ('COMMA',     r','),
+    ('SEMICOLON', r';'),
+    ('COLON',     r':'),
+    ('EQUALS',    r'='),
+    ('GREATER',   r'>'),
+    ('LESS',      r'<'),
+    ('GREATER_EQUAL', r'>='),
+    ('LESS_EQUAL', r'<='),
+    ('ERROR',     r'.'),
+]
+
+
+def reference_tokenize(source):
+    """ Tokenizes source the way the lexer did before the keyword table, rebuilding the regex per call """
+    tokens = []
+    line_number = 1
+    tok_regex = '|'.join(f'(?P<{pair[0]}>{pair[1]})' for pair in REFERENCE_SPECIFICATION)
+    for mo in re.finditer(tok_regex, source):
+        kind = mo.lastgroup
+        value = mo.group()
+        if kind == 'NEWLINE':
+            line_number += 1
+        elif kind == 'NUMERO':
+            tokens.append(('NUMERO', float(value) if '.' in value else int(value), line_number))
+        elif kind == 'TEKSTO':
+            tokens.append(('TEKSTO', value[1:-1], line_number))
+        elif kind in ('COMMENT', 'WHITESPACE'):
+            continue
+        elif kind == 'ERROR':
+            raise RuntimeError(f'Unexpected character: {value} on line {line_number}')
+        else:
+            tokens.append((kind, value, line_number))
+    tokens.append(('EOF', None, line_number))
+    return tokens
+
+
+def build_corpus(size):
+    """ Repeats the valid sample programs until the corpus is at least `size` characters long """
+    samples = []
+    for filename in sorted(glob.glob(os.path.join(ROOT, 'tests', 'valid', '*.cg'))):
+        with open(filename, 'r') as file:
+            samples.append(file.read() + '\n')
+    chunk = ''.join(samples)
+    return chunk * (size // len(chunk) + 1)
+
+
+def measure(tokenize, source, repeat):
+    """ Returns (token count, best tokens/sec) over `repeat` runs """
+    best = float('inf')
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(tokenize(source))
+        best = min(best, time.perf_counter() - start)
+    return count, count / best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='CodeGoLexer tokens/sec benchmark')
+    arg_parser.add_argument('--size', type=int, default=5_000_000, help='corpus size in characters')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='runs per lexer, best is reported')
+    args = arg_parser.parse_args()
+
+    source = build_corpus(args.size)
+    print(f'Corpus: {len(source):,} characters')
+
+    count, reference = measure(reference_tokenize, source, args.repeat)
+    print(f'reference lexer: {count:,} tokens, {reference:,.0f} tokens/sec')
+
+    count, current = measure(lambda text: CodeGoLexer(text).tokens, source, args.repeat)
+    print(f'CodeGoLexer:     {count:,} tokens, {current:,.0f} tokens/sec')
+
+    print(f'Speedup: {current / reference:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
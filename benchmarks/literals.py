@@ -0,0 +1,132 @@
+"""
+List and object literal benchmark.
+
+Parses declarations whose values are huge literals (flat lists of numbers,
+lists of objects, tables of rows, mixed expressions, and lists nested deep
+inside each other), checks that every element made it into the tree, and
+fails if the parse time per element stops being constant as the literals grow.
+
+Usage:
+    python -m benchmarks.literals [--sizes 10000,100000,1000000] [--tolerance 3.0]
+"""
+
+import argparse
+import sys
+import time
+
+from parser import CodeGoParser
+from parser.lexer import CodeGoLexer
+from parser.nodes import ListLiteral, Node, ObjectLiteral
+
+DEFAULT_SIZES = '10000,100000,1000000'
+
+
+# Each generator returns a declaration with about `size` elements (list items
+# and object properties) in all, and the exact number of elements
+
+def flat(size):
+    """ A list of numbers """
+    return 'Lista x = [' + ', '.join(str(i) for i in range(size)) + ']\n', size
+
+
+def objects(size):
+    """ A list of objects of four properties each """
+    item = '{{id: {0}, "ulam": "Adobo", presyo: {0}.50, mga: []}}'
+    count = size // 5
+    return 'Lista x = [' + ',\n'.join(item.format(i) for i in range(count)) + ']\n', count * 5
+
+
+def table(size):
+    """ A list of rows of nine numbers, with a trailing comma """
+    row = '[' + ', '.join(str(i) for i in range(9)) + ']'
+    count = size // 10
+    return 'Lista x = [\n' + ',\n'.join(row for _ in range(count)) + ',\n]\n', count * 10
+
+
+def mixed(size):
+    """ An object holding a list of expressions, calls and literals of every kind """
+    items = ('i + 1', '-2', '"a"', 'Tama', 'f(i, [i])', 'luto.ulam', '(i * 2)', '{k: i}')
+    count = size // len(items) * len(items)
+    source = 'Bagay x = {mga: [' + ', '.join(items[i % len(items)] for i in range(count)) + ']}\n'
+    return source, 1 + count + count // len(items) * 2
+
+
+def deep(size):
+    """ Lists of two items nested inside each other """
+    depth = size // 2
+    return 'Lista x = ' + '[1, ' * depth + '[]' + ']' * depth + '\n', depth * 2
+
+
+GENERATORS = {
+    'flat': flat,
+    'objects': objects,
+    'table': table,
+    'mixed': mixed,
+    'deep': deep,
+}
+
+
+def count_elements(ast):
+    """ Returns the number of list items and object properties in a tree """
+    count = 0
+    stack = [ast]
+    while stack:
+        value = stack.pop()
+        if type(value) is ListLiteral:
+            count += len(value.items)
+        elif type(value) is ObjectLiteral:
+            count += len(value.properties)
+        if isinstance(value, Node):
+            stack.extend(child for _, child in value.fields())
+        elif isinstance(value, list):
+            stack.extend(value)
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+    return count
+
+
+def bench_literal(generate, size):
+    """ Returns the expected and parsed numbers of elements and the parse time in seconds of `generate(size)` """
+    source, expected = generate(size)
+    tokens = CodeGoLexer.token_stream(source)
+    start = time.perf_counter()
+    ast = CodeGoParser(tokens).parse()
+    seconds = time.perf_counter() - start
+    return expected, count_elements(ast), seconds
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='CodeGo list and object literal benchmark')
+    arg_parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                            help='comma separated numbers of elements (default: %(default)s)')
+    arg_parser.add_argument('--tolerance', type=float, default=3.0,
+                            help='largest allowed growth of the time per element between the '
+                                 'smallest and largest size (default: %(default)s)')
+    args = arg_parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    failed = False
+    print(f"{'literal':<8} {'elements':>10} {'parse ms':>10} {'us/element':>11} {'elements/s':>12}")
+    for name, generate in GENERATORS.items():
+        per_element = []
+        for size in sizes:
+            expected, elements, seconds = bench_literal(generate, size)
+            per_element.append(seconds / elements)
+            print(f'{name:<8} {elements:>10,} {seconds * 1000:>10,.1f} '
+                  f'{seconds / elements * 1e6:>11,.3f} {elements / seconds:>12,.0f}')
+            if elements != expected:
+                print(f'{name}: expected {expected:,} elements in the tree, found {elements:,}')
+                failed = True
+
+        growth = per_element[-1] / per_element[0]
+        if growth > args.tolerance:
+            print(f'{name}: time per element grew {growth:.1f}x, parsing is not linear in the size')
+            failed = True
+
+    if failed:
+        sys.exit(1)
+    print('\nParse time is linear in the number of elements.')
+
+
+if __name__ == '__main__':
+    main()
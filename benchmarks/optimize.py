@@ -0,0 +1,203 @@
+"""
+Syntax tree optimizer check and benchmark.
+
+Runs every program of benchmarks.backends (the samples in tests/valid, the
+programs exercising each rule and runtime error, and seeded random programs)
+at each optimization level of parser.optimize, on the VM and on the Python
+backend, and fails if any of them prints anything different or fails with a
+different error than the unoptimized program on the VM. Then programs full
+of literal arithmetic, feature flag branches and loop-invariant expressions
+are timed at -O0 and -O2, optimizing and compiling included; -O2 must be at
+least --min-speedup times faster on the VM on every one.
+
+Usage:
+    python -m benchmarks.optimize [--random 300] [--seed 0] [--scale 1.0] [--repeat 3] [--min-speedup 1.1]
+"""
+
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+
+from benchmarks.backends import CASES, VALID_DIR, RandomProgram
+from parser import CodeGoParser
+from parser.compiler import CompileError, compile_program
+from parser.lexer import CodeGoLexer
+from parser.optimize import LEVELS, Optimizer
+from parser.tokens import LineIndex
+from parser.transpile import transpile
+from parser.vm import VM, ExecutionError
+
+
+# Each program takes the number of iterations of its loop
+
+def flags(n):
+    """ Feature flags and literal arithmetic in a loop """
+    return f'''
+Numero total = 0
+Numero i = 0
+Habang (i < {n}) {{
+    Kung (Tama) {{
+        total = total + i * (60 * 60 * 24) - 3600 * 24
+    }}
+    Kung (1 > 2) {{
+        print("debug ", i)
+    }}
+    Kung (Mali) {{
+        total = total + 1
+    }}
+    i = i + 1
+}}
+print(total)
+'''
+
+
+def invariant(n):
+    """ Expressions of variables that the loop does not assign """
+    return f'''
+Numero width = 640
+Numero height = 480
+Desimal scale = 1.5
+Numero sum = 0
+Desimal area = 0.0
+Numero i = 0
+Habang (i < width * height / 1000 * {max(1, n // 307)}) {{
+    sum = sum + i * (width * height - width) + (height - 1) * 3
+    area = area + scale * scale * 2.0
+    i = i + 1
+}}
+print(sum, " ", area)
+'''
+
+
+def labels(n):
+    """ Teksto joined from literals and invariant values in nested loops """
+    return f'''
+Teksto prefix = "row"
+Numero rows = {max(1, n // 50)}
+Numero count = 0
+Numero r = 0
+Habang (r < rows) {{
+    Numero c = 0
+    Habang (c < 50) {{
+        Kung (prefix + "-" + "cell" > "row") {{
+            count = count + (rows * 2 + 1)
+        }}
+        c = c + 1
+    }}
+    r = r + 1
+}}
+print(count)
+'''
+
+
+PROGRAMS = {
+    'flags': (flags, 200000),
+    'invariant': (invariant, 200000),
+    'labels': (labels, 100000),
+}
+
+
+def run_level(backend, statements, lines, level):
+    """ Optimizes and runs a program on a backend, returning what it printed and its error message, if any """
+    out = io.StringIO()
+    try:
+        optimized = Optimizer(level, lines).optimize(statements)
+        if backend == 'vm':
+            VM(out, lines).run(compile_program(optimized, lines))
+        else:
+            transpile(optimized, lines).run(out)
+    except (CompileError, ExecutionError) as e:
+        return out.getvalue(), f'{type(e).__name__}: {e}'
+    return out.getvalue(), None
+
+
+def differences(source):
+    """ Returns a description of how the optimized runs of a program differ from the unoptimized one, or None """
+    lines = LineIndex(source)
+    statements = CodeGoParser(CodeGoLexer.iter_tokens(source, lines), lines).parse()
+    expected = run_level('vm', statements, lines, 0)
+    for level in LEVELS:
+        for backend in ('vm', 'py'):
+            found = run_level(backend, statements, lines, level)
+            if found != expected:
+                return (f'-O{level} on {backend} printed {found[0]!r} with error {found[1]!r}, '
+                        f'not {expected[0]!r} with error {expected[1]!r}')
+    return None
+
+
+def bench_program(source, repeat):
+    """
+    Returns the output, best time in seconds, nodes removed and expressions
+    moved out of loops at -O0 and -O2 on the VM
+    """
+    statements = CodeGoParser(CodeGoLexer.token_stream(source)).parse()
+    results = {}
+    for level in (0, 2):
+        best = None
+        for _ in range(repeat):
+            out = io.StringIO()
+            start = time.perf_counter()
+            optimizer = Optimizer(level)
+            VM(out).run(compile_program(optimizer.optimize(statements)))
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        results[level] = (out.getvalue(), best, sum(optimizer.removed.values()), optimizer.hoisted)
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='CodeGo syntax tree optimizer check and benchmark')
+    arg_parser.add_argument('--random', type=int, default=300,
+                            help='number of random programs to compare (default: %(default)s)')
+    arg_parser.add_argument('--seed', type=int, default=0,
+                            help='seed of the first random program (default: %(default)s)')
+    arg_parser.add_argument('--scale', type=float, default=1.0,
+                            help='multiplies the number of loop iterations (default: %(default)s)')
+    arg_parser.add_argument('--repeat', type=int, default=3,
+                            help='runs of each program, of which the fastest is timed (default: %(default)s)')
+    arg_parser.add_argument('--min-speedup', type=float, default=1.1,
+                            help='smallest allowed ratio of the -O0 time to the -O2 time on the VM '
+                                 '(default: %(default)s)')
+    args = arg_parser.parse_args()
+
+    programs = []
+    for path in sorted(glob.glob(os.path.join(VALID_DIR, '*.cg'))):
+        with open(path, encoding='utf-8') as file:
+            programs.append((os.path.basename(path), file.read()))
+    programs += CASES.items()
+    programs += [(f'random-{seed}', RandomProgram(seed).generate())
+                 for seed in range(args.seed, args.seed + args.random)]
+
+    failed = False
+    for name, source in programs:
+        difference = differences(source)
+        if difference is not None:
+            print(f'{name}: {difference}')
+            failed = True
+    print(f'Compared {len(programs)} programs at -O{", -O".join(map(str, LEVELS))} on both backends.\n')
+
+    print(f"{'program':<10} {'iterations':>11} {'removed':>8} {'hoisted':>8} {'-O0 ms':>9} {'-O2 ms':>9} "
+          f"{'speedup':>8}")
+    for name, (generate, iterations) in PROGRAMS.items():
+        iterations = max(2, int(iterations * args.scale))
+        results = bench_program(generate(iterations), max(1, args.repeat))
+        speedup = results[0][1] / results[2][1]
+        print(f'{name:<10} {iterations:>11,} {results[2][2]:>8,} {results[2][3]:>8,} {results[0][1] * 1000:>9,.1f} '
+              f'{results[2][1] * 1000:>9,.1f} {speedup:>7.2f}x')
+        if results[0][0] != results[2][0]:
+            print(f'{name}: -O0 printed {results[0][0]!r}, -O2 {results[2][0]!r}')
+            failed = True
+        if speedup < args.min_speedup:
+            print(f'{name}: -O2 is only {speedup:.2f}x faster than -O0')
+            failed = True
+
+    if failed:
+        sys.exit(1)
+    print('\nEvery optimization level agrees with the unoptimized programs.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Lexer and parser benchmark suite.
+
+For every corpus size this measures CodeGoLexer throughput in tokens/sec,
+CodeGoParser throughput in nodes/sec and the peak memory of each phase (with
+tracemalloc, in a separate run so that tracing does not skew the timings).
+Results are written to a JSON file and can be compared against a stored
+baseline to catch regressions.
+
+The default sizes go up to 10MB. The 100MB corpus takes about ten minutes and
+a gigabyte of memory, so it is only measured when asked for with --sizes.
+
+Usage:
+    python -m benchmarks.run [--sizes 1KB,10KB,100KB,1MB,10MB,100MB] [--output results.json]
+    python -m benchmarks.run --baseline baseline.json [--tolerance 0.15]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from parser import CodeGoParser
+from parser.lexer import CodeGoLexer
+from parser.nodes import Node
+
+from .corpus import format_size, generate, parse_size
+
+DEFAULT_SIZES = '1KB,10KB,100KB,1MB,10MB'
+
+# Metrics compared against a baseline: name -> True if higher is better
+METRICS = {
+    'tokens_per_sec': True,
+    'nodes_per_sec': True,
+    'lex_peak_bytes': False,
+    'parse_peak_bytes': False,
+}
+
+
+def count_nodes(ast):
+    """ Counts the AST nodes in a tree without recursion """
+    count = 0
+    stack = [ast]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, Node):
+            count += 1
+            stack.extend(child for _, child in value.fields())
+        elif isinstance(value, list):
+            stack.extend(value)
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+    return count
+
+
+def best_time(function, repeat):
+    """ Returns (result of the last call, shortest wall time) over `repeat` calls """
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def peak_memory(function):
+    """ Returns the peak memory traced while calling `function`, in bytes """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_size(size, seed, repeat):
+    """ Runs the lexer and parser benchmarks on a corpus of the given size """
+    source = generate(size, seed)
+
+    # Small inputs are too quick to time reliably in a single run
+    repeat = max(repeat, min(50, (1024 * 1024) // max(size, 1)))
+
+    tokens, lex_seconds = best_time(lambda: CodeGoLexer.token_stream(source), repeat)
+    ast, parse_seconds = best_time(lambda: CodeGoParser(tokens).parse(), repeat)
+    nodes = count_nodes(ast)
+    del ast
+
+    lex_peak = peak_memory(lambda: CodeGoLexer.token_stream(source))
+    parse_peak = peak_memory(lambda: CodeGoParser(tokens).parse())
+
+    return {
+        'size': format_size(size),
+        'bytes': len(source),
+        'tokens': len(tokens),
+        'nodes': nodes,
+        'lex_seconds': lex_seconds,
+        'parse_seconds': parse_seconds,
+        'tokens_per_sec': len(tokens) / lex_seconds,
+        'nodes_per_sec': nodes / parse_seconds,
+        'lex_peak_bytes': lex_peak,
+        'parse_peak_bytes': parse_peak,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares results against a baseline.
+
+    Args:
+        results (dict): The current results.
+        baseline (dict): Results of an earlier run.
+        tolerance (float): Allowed relative change before a metric counts as a regression.
+
+    Returns:
+        list: A message for every regressed metric.
+    """
+
+    previous = {entry['size']: entry for entry in baseline['results']}
+    regressions = []
+    for entry in results['results']:
+        old = previous.get(entry['size'])
+        if old is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in old or not old[metric]:
+                continue
+            change = entry[metric] / old[metric] - 1
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{entry['size']}: {metric} {old[metric]:,.0f} -> {entry[metric]:,.0f} "
+                                   f"({change:+.1%})")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'size':>7} {'tokens':>11} {'tokens/sec':>12} {'nodes':>10} {'nodes/sec':>12} "
+          f"{'lex peak':>11} {'parse peak':>11}")
+    for entry in results:
+        print(f"{entry['size']:>7} {entry['tokens']:>11,} {entry['tokens_per_sec']:>12,.0f} "
+              f"{entry['nodes']:>10,} {entry['nodes_per_sec']:>12,.0f} "
+              f"{entry['lex_peak_bytes'] / 1024:>9,.0f}KB {entry['parse_peak_bytes'] / 1024:>9,.0f}KB")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='CodeGo lexer and parser benchmarks')
+    arg_parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                            help='comma separated corpus sizes (default: %(default)s, add 100MB for the full scaling curve)')
+    arg_parser.add_argument('--seed', type=int, default=0, help='corpus seed (default: %(default)s)')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='timed runs per phase, best is kept')
+    arg_parser.add_argument('-o', '--output', help='write the results to this JSON file')
+    arg_parser.add_argument('--baseline', help='compare against the results in this JSON file')
+    arg_parser.add_argument('--tolerance', type=float, default=0.15,
+                            help='relative change allowed before a metric is a regression (default: %(default)s)')
+    args = arg_parser.parse_args()
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'results': [],
+    }
+    for size in args.sizes.split(','):
+        entry = bench_size(parse_size(size), args.seed, args.repeat)
+        results['results'].append(entry)
+        print(f"{entry['size']}: {entry['tokens_per_sec']:,.0f} tokens/sec, "
+              f"{entry['nodes_per_sec']:,.0f} nodes/sec", file=sys.stderr)
+
+    print_table(results['results'])
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('\nRegressions against the baseline:')
+            for message in regressions:
+                print(f'  {message}')
+            sys.exit(1)
+        print('\nNo regressions against the baseline.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Binary syntax tree format benchmark.
+
+On a generated corpus, loading and walking the binary form of
+parser.serialize is timed against parsing the source again and against
+loading the same tree as JSON. Loading must be at least --min-speedup times
+faster than both. Walking is compared with loading in time and in peak memory,
+and must take at most --max-walk-memory of the memory loading takes, as it
+keeps none of the tree. Round trips and damaged data are checked by
+tests/test_serialize.py.
+
+Usage:
+    python -m benchmarks.serialize [--size 1MB] [--repeat 3] [--min-speedup 1.5] [--max-walk-memory 0.1]
+"""
+
+import argparse
+import json
+import sys
+
+from parser import CodeGoParser, serialize
+from parser.lexer import CodeGoLexer
+from parser.nodes import to_dict
+
+from .corpus import format_size, generate, parse_size
+from .run import best_time, peak_memory
+
+
+def parse(source):
+    return CodeGoParser(CodeGoLexer.iter_tokens(source)).parse()
+
+
+def walk_all(data):
+    """ Walks a whole binary tree, keeping none of its events """
+    for _ in serialize.walk(data):
+        pass
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='CodeGo binary syntax tree benchmark')
+    arg_parser.add_argument('--size', type=parse_size, default=parse_size('1MB'),
+                            help='size of the generated corpus (default: 1MB)')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='timed runs, best is kept')
+    arg_parser.add_argument('--min-speedup', type=float, default=1.5,
+                            help='smallest allowed ratio of the time of loading JSON, and of parsing the '
+                                 'source, to that of loading the binary tree (default: %(default)s)')
+    arg_parser.add_argument('--max-walk-memory', type=float, default=0.1,
+                            help='largest allowed ratio of the peak memory of walking the binary '
+                                 'tree to that of loading it (default: %(default)s)')
+    args = arg_parser.parse_args()
+
+    source = generate(args.size)
+    ast, parse_time = best_time(lambda: parse(source), args.repeat)
+    data = serialize.dumps(ast)
+    text = json.dumps(to_dict(ast))
+
+    load_time = best_time(lambda: serialize.loads(data), args.repeat)[1]
+    json_time = best_time(lambda: json.loads(text), args.repeat)[1]
+    walk_time = best_time(lambda: walk_all(data), args.repeat)[1]
+    results = [
+        ('parse source', parse_time, len(source)),
+        ('load JSON dicts', json_time, len(text)),
+        ('write binary', best_time(lambda: serialize.dumps(ast), args.repeat)[1], len(data)),
+        ('load binary', load_time, len(data)),
+        ('walk binary', walk_time, len(data)),
+    ]
+
+    print(f'corpus: {format_size(args.size)}')
+    print(f"{'':<15} {'ms':>10} {'size':>12} {'vs parse':>9}")
+    for name, seconds, size in results:
+        print(f'{name:<15} {seconds * 1000:>10,.1f} {size:>12,} {parse_time / seconds:>8.1f}x')
+
+    failed = False
+    for name, seconds in (('loading JSON', json_time), ('parsing the source', parse_time)):
+        if seconds < load_time * args.min_speedup:
+            print(f'loading the binary tree is only {seconds / load_time:.2f}x faster than {name}')
+            failed = True
+
+    load_memory = peak_memory(lambda: serialize.loads(data))
+    walk_memory = peak_memory(lambda: walk_all(data))
+    print(f'\nwalk vs load: {walk_time / load_time:.2f}x the time, '
+          f'{walk_memory:,} vs {load_memory:,} bytes peak memory')
+    if walk_memory > load_memory * args.max_walk_memory:
+        print(f'walking the binary tree takes {walk_memory / load_memory:.2f}x the memory of loading it')
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Type-specialized execution benchmark.
+
+Runs numeric loops (Numero division and remainders, a Desimal series, Kapag
+on a Numero, and Teksto labels built from numbers) compiled with and without
+the operators that parser.typecheck specializes for known types, on the VM
+and on the Python backend. Every run of a program must print the same; the
+times are the best of --repeat runs, compiling included. Fails if they differ
+or the specialized VM is not at least --min-speedup times faster than the
+generic one on every program.
+
+Usage:
+    python -m benchmarks.specialize [--scale 1.0] [--repeat 3] [--min-speedup 1.05]
+"""
+
+import argparse
+import io
+import sys
+import time
+
+from parser import CodeGoParser
+from parser.compiler import compile_program
+from parser.lexer import CodeGoLexer
+from parser.transpile import transpile
+from parser.vm import VM
+
+
+# Each program takes the number of iterations of its outer loop
+
+def collatz(n):
+    """ Collatz sequences: Kapag on a remainder, Numero division """
+    return f'''
+Numero n = 1
+Numero steps = 0
+Habang (n < {n}) {{
+    Numero x = n
+    Habang (x > 1) {{
+        Kapag (x - x / 2 * 2) {{
+            Kaso 0:
+                x = x / 2
+                Hinto
+            Kaso 1:
+                x = 3 * x + 1
+                Hinto
+        }}
+        steps = steps + 1
+    }}
+    n = n + 1
+}}
+print(steps)
+'''
+
+
+def digits(n):
+    """ Sums of decimal digits, taken with Numero division """
+    return f'''
+Numero n = 0
+Numero total = 0
+Habang (n < {n}) {{
+    Numero m = n
+    Habang (m > 0) {{
+        total = total + (m - m / 10 * 10)
+        m = m / 10
+    }}
+    n = n + 1
+}}
+print(total)
+'''
+
+
+def series(n):
+    """ A Desimal series, divided by Numero and Desimal values """
+    return f'''
+Desimal sum = 0.0
+Numero k = 1
+Habang (k < {n}) {{
+    Desimal term = sum / k
+    sum = sum + 1.0 / k - term / (k + 1.0) / 2.0
+    k = k + 1
+}}
+print(sum)
+'''
+
+
+def labels(n):
+    """ Teksto built from a Teksto and a Numero """
+    return f'''
+Teksto line = ""
+Numero i = 0
+Habang (i < {n}) {{
+    line = "item " + i + ": " + i * 2
+    Kung (i > {n} - 2) {{
+        print(line)
+    }}
+    i = i + 1
+}}
+'''
+
+
+PROGRAMS = {
+    'collatz': (collatz, 3000),
+    'digits': (digits, 60000),
+    'series': (series, 200000),
+    'labels': (labels, 100000),
+}
+
+
+def run(statements, backend, specialize):
+    """ Compiles and runs a program, returning what it printed """
+    out = io.StringIO()
+    if backend == 'vm':
+        VM(out).run(compile_program(statements, specialize=specialize))
+    else:
+        transpile(statements, specialize=specialize).run(out)
+    return out.getvalue()
+
+
+def bench_program(source, repeat):
+    """ Returns the output and best time in seconds of each (backend, specialize) pair """
+    statements = CodeGoParser(CodeGoLexer.token_stream(source)).parse()
+    results = {}
+    for backend in ('vm', 'py'):
+        for specialize in (False, True):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                output = run(statements, backend, specialize)
+                seconds = time.perf_counter() - start
+                best = seconds if best is None else min(best, seconds)
+            results[backend, specialize] = (output, best)
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='CodeGo type-specialized execution benchmark')
+    arg_parser.add_argument('--scale', type=float, default=1.0,
+                            help='multiplies the number of loop iterations (default: %(default)s)')
+    arg_parser.add_argument('--repeat', type=int, default=3,
+                            help='runs of each program, of which the fastest is timed (default: %(default)s)')
+    arg_parser.add_argument('--min-speedup', type=float, default=1.05,
+                            help='smallest allowed ratio of the generic VM time to the specialized VM time '
+                                 '(default: %(default)s)')
+    args = arg_parser.parse_args()
+
+    failed = False
+    print(f"{'program':<8} {'iterations':>11} {'vm ms':>9} {'typed ms':>9} {'speedup':>8} "
+          f"{'py ms':>9} {'typed ms':>9} {'speedup':>8}")
+    for name, (generate, iterations) in PROGRAMS.items():
+        iterations = max(2, int(iterations * args.scale))
+        results = bench_program(generate(iterations), max(1, args.repeat))
+        vm_speedup = results['vm', False][1] / results['vm', True][1]
+        py_speedup = results['py', False][1] / results['py', True][1]
+        print(f"{name:<8} {iterations:>11,} {results['vm', False][1] * 1000:>9,.1f} "
+              f"{results['vm', True][1] * 1000:>9,.1f} {vm_speedup:>7.2f}x "
+              f"{results['py', False][1] * 1000:>9,.1f} {results['py', True][1] * 1000:>9,.1f} {py_speedup:>7.2f}x")
+        outputs = {output for output, _ in results.values()}
+        if len(outputs) != 1:
+            printed = ', '.join(f'{backend} {"typed" if typed else "generic"} {output!r}'
+                                for (backend, typed), (output, _) in results.items())
+            print(f'{name}: the runs printed different output: {printed}')
+            failed = True
+        if vm_speedup < args.min_speedup:
+            print(f'{name}: the specialized VM is only {vm_speedup:.2f}x faster than the generic one')
+            failed = True
+
+    if failed:
+        sys.exit(1)
+    print('\nSpecialized and generic execution agree on every program.')
+
+
+if __name__ == '__main__':
+    main()
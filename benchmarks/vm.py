@@ -0,0 +1,306 @@
+"""
+Bytecode VM benchmark and equivalence check.
+
+Runs loop-heavy programs (Habang counters, Bawat over lists and objects,
+Gawa calls and Kapag dispatch) with parser.vm and with a reference
+interpreter that walks the dictionary form of the syntax tree, the way a
+first CodeGo interpreter would. Both must print exactly the same output; the
+VM time includes compiling to bytecode. Fails if the outputs differ or the VM
+is not at least --min-speedup times faster on every program.
+
+Usage:
+    python -m benchmarks.vm [--scale 1.0] [--min-speedup 1.5]
+"""
+
+import argparse
+import io
+import sys
+import time
+
+from parser import CodeGoParser
+from parser.compiler import compile_program
+from parser.lexer import CodeGoLexer
+from parser.vm import VM, format_value, values_equal
+
+
+# Each program takes the number of loop iterations it runs, about
+
+def habang(n):
+    """ A counter loop doing arithmetic """
+    return f'''
+Numero i = 0
+Numero total = 0
+Desimal average = 0.0
+Habang (i < {n}) {{
+    total = total + i * 3 - i / 2
+    Kung (i > {n} - 3) {{
+        print("i = ", i)
+    }}
+    i = i + 1
+}}
+average = total / 1.0 / {n}
+print(total, " ", average)
+'''
+
+
+def bawat(n):
+    """ Bawat over a list literal, repeated """
+    items = ', '.join(str(i) for i in range(1000))
+    return f'''
+Lista xs = [{items}]
+Numero total = 0
+Numero round = 0
+Habang (round < {max(1, n // 1000)}) {{
+    Bawat (x Sa xs) {{
+        total = total + x
+    }}
+    round = round + 1
+}}
+print(total)
+'''
+
+
+def gawa(n):
+    """ Calls of a function that updates globals """
+    return f'''
+Numero total = 0
+Numero calls = 0
+Gawa dagdag (Numero n, Numero m) {{
+    Numero product = n * m
+    total = total + product
+    calls = calls + 1
+}}
+Numero i = 0
+Habang (i < {n}) {{
+    dagdag(i, 2)
+    i = i + 1
+}}
+print(calls, " calls, total ", total)
+'''
+
+
+def kapag(n):
+    """ Kapag dispatch on a counter """
+    return f'''
+Numero i = 0
+Numero a = 0
+Numero b = 0
+Numero c = 0
+Habang (i < {n}) {{
+    Kapag (i - i / 4 * 4) {{
+        Kaso 0:
+            a = a + 1
+            Hinto
+        Kaso 1:
+            b = b + 1
+            Hinto
+        Kaso 2:
+            c = c + 1
+            Hinto
+    }}
+    i = i + 1
+}}
+print([a, b, c])
+'''
+
+
+def objects(n):
+    """ Bawat over a list of objects, reading their properties """
+    return f'''
+Lista menu = [{{ulam: "Adobo", presyo: 100.50}}, {{ulam: "Sinigang", presyo: 120}}, {{ulam: "Kanin", presyo: 20}}]
+Bagay orders = {{Adobo: 0, Sinigang: 0}}
+Desimal total = 0
+Numero round = 0
+Habang (round < {max(1, n // 3)}) {{
+    Bawat (luto Sa menu) {{
+        Kung (luto.presyo > 50) {{
+            total = total + luto.presyo
+        }}
+    }}
+    round = round + 1
+}}
+Bawat (ulam Sa orders) {{
+    print(ulam)
+}}
+print("Total: ", total, " ", menu)
+'''
+
+
+PROGRAMS = {
+    'habang': (habang, 1000000),
+    'bawat': (bawat, 1000000),
+    'gawa': (gawa, 200000),
+    'kapag': (kapag, 500000),
+    'objects': (objects, 300000),
+}
+
+
+class TreeWalker:
+    """
+    The reference interpreter: evaluates the dictionary form of the syntax
+    tree (see Node.to_dict()) recursively, dispatching on the 'type' strings,
+    with the same semantics as parser.vm.
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self.globals = {}
+
+    def run(self, statements):
+        self.block(statements, self.globals)
+
+    def block(self, statements, scope):
+        for statement in statements:
+            self.statement(statement, scope)
+
+    def statement(self, node, scope):
+        kind = node['type']
+        if kind == 'var_declaration':
+            if node['expression'] is not None:
+                value = self.evaluate(node['expression'], scope)
+            else:
+                value = {'Numero': 0, 'Desimal': 0.0, 'Teksto': '', 'Tsek': False, 'Lista': [], 'Bagay': {}}
+                value = value[node['basic_type']]
+                value = value.copy() if isinstance(value, (list, dict)) else value
+            scope[node['identifier']] = value
+        elif kind == 'assignment':
+            self.assign(node['identifier'], self.evaluate(node['expression'], scope), scope)
+        elif kind == 'expression_statement':
+            self.evaluate(node['expression'], scope)
+        elif kind == 'function_invocation':
+            self.evaluate(node, scope)
+        elif kind == 'kung_statement':
+            if self.evaluate(node['condition'], scope):
+                self.block(node['statements'], scope)
+        elif kind == 'habang_statement':
+            while self.evaluate(node['condition'], scope):
+                self.block(node['statements'], scope)
+        elif kind == 'bawat_statement':
+            for item in list(self.lookup(node['iterable'], scope)):
+                scope[node['iterator']] = item
+                self.block(node['body'], scope)
+        elif kind == 'kapag_statement':
+            value = self.evaluate(node['condition'], scope)
+            for case in node['cases']:
+                if values_equal(value, self.evaluate(case['case_expr'], scope)):
+                    self.block(case['case_statements'], scope)
+                    break
+        elif kind == 'gawa_declaration':
+            scope[node['name']] = ('gawa', [parameter['name'] for parameter in node['parameters']], node['body'])
+
+    def assign(self, name, value, scope):
+        if scope is self.globals or name in scope or name not in self.globals:
+            scope[name] = value
+        else:
+            self.globals[name] = value
+
+    def lookup(self, name, scope):
+        if name in scope:
+            return scope[name]
+        if name in self.globals:
+            return self.globals[name]
+        if name == 'print':
+            return 'print'
+        raise RuntimeError(f'Undeclared variable: {name}')
+
+    def evaluate(self, node, scope):
+        if isinstance(node, tuple):
+            kind, value, _ = node
+            if kind == 'IDENTIFIER':
+                return self.lookup(value, scope)
+            if kind == 'TSEK':
+                return value == 'Tama'
+            return value
+
+        kind = node['type']
+        if kind == 'binary_op':
+            left = self.evaluate(node['left'], scope)
+            right = self.evaluate(node['right'], scope)
+            operator = node['operator']
+            if operator == '+':
+                if isinstance(left, str) or isinstance(right, str):
+                    return format_value(left) + format_value(right)
+                return left + right
+            if operator == '-':
+                return left - right
+            if operator == '*':
+                return left * right
+            if operator == '/':
+                return left // right if type(left) is int and type(right) is int else left / right
+            if operator == '>':
+                return left > right
+            if operator == '<':
+                return left < right
+            if operator == '>=':
+                return left >= right
+            return left <= right
+        if kind == 'unary_op':
+            return -self.evaluate(node['operand'], scope)
+        if kind == 'property_access':
+            return self.evaluate(node['object'], scope)[node['property']]
+        if kind == 'list':
+            return [self.evaluate(item, scope) for item in node['items']]
+        if kind == 'object':
+            return {key: self.evaluate(value, scope) for key, value in node['properties'].items()}
+        if kind == 'function_invocation':
+            callee = node['function_name']
+            function = self.lookup(callee, scope) if isinstance(callee, str) else self.evaluate(callee, scope)
+            arguments = [self.evaluate(argument, scope) for argument in node['arguments']]
+            if function == 'print':
+                self.out.write(''.join(format_value(argument) for argument in arguments) + '\n')
+            else:
+                _, parameters, body = function
+                self.block(body, dict(zip(parameters, arguments)))
+            return None
+        raise RuntimeError(f'Cannot evaluate {kind}')
+
+
+def bench_program(source):
+    """ Returns the outputs of the tree walker and the VM and their times in seconds """
+    ast = CodeGoParser(CodeGoLexer.token_stream(source)).parse()
+
+    tree = [statement.to_dict() for statement in ast]
+    walker_out = io.StringIO()
+    start = time.perf_counter()
+    TreeWalker(walker_out).run(tree)
+    walker_seconds = time.perf_counter() - start
+
+    vm_out = io.StringIO()
+    start = time.perf_counter()
+    VM(vm_out).run(compile_program(ast))
+    vm_seconds = time.perf_counter() - start
+
+    return walker_out.getvalue(), vm_out.getvalue(), walker_seconds, vm_seconds
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='CodeGo bytecode VM benchmark')
+    arg_parser.add_argument('--scale', type=float, default=1.0,
+                            help='multiplies the number of loop iterations (default: %(default)s)')
+    arg_parser.add_argument('--min-speedup', type=float, default=1.5,
+                            help='smallest allowed ratio of the tree walker time to the VM time '
+                                 '(default: %(default)s)')
+    args = arg_parser.parse_args()
+
+    failed = False
+    print(f"{'program':<8} {'iterations':>11} {'tree ms':>10} {'vm ms':>10} {'speedup':>8}")
+    for name, (generate, iterations) in PROGRAMS.items():
+        iterations = max(1, int(iterations * args.scale))
+        walker_output, vm_output, walker_seconds, vm_seconds = bench_program(generate(iterations))
+        speedup = walker_seconds / vm_seconds
+        print(f'{name:<8} {iterations:>11,} {walker_seconds * 1000:>10,.1f} {vm_seconds * 1000:>10,.1f} '
+              f'{speedup:>7.1f}x')
+        if walker_output != vm_output:
+            print(f'{name}: the VM printed {vm_output!r}, the tree walker {walker_output!r}')
+            failed = True
+        if speedup < args.min_speedup:
+            print(f'{name}: the VM is only {speedup:.1f}x faster than the tree walker')
+            failed = True
+
+    if failed:
+        sys.exit(1)
+    print('\nThe VM and the tree walker agree on every program.')
+
+
+if __name__ == '__main__':
+    main()
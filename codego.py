@@ -1,68 +1,427 @@
+import argparse
+import codecs
+import mmap
+import os
 import sys
+import time
 import traceback
-from parser import CodeGoParser
+from contextlib import nullcontext
+from parser import CodeGoParser, serialize
+from parser.batch import check_files, discover
+from parser.cache import DEFAULT_MAX_SIZE, ASTCache
+from parser.compiler import CompileError, compile_program, disassemble
+from parser.errors import ParseError
+from parser.emit import BufferedWriter, write_json, write_ndjson, write_pretty, write_tokens
 from parser.lexer import CodeGoLexer
+from parser.optimize import HOISTING, LEVELS, Optimizer
+from parser.profile import Profiler
+from parser.split import parse_parts
+from parser.watch import DEFAULT_DEBOUNCE, DEFAULT_INTERVAL, watch_paths
+from parser.tokens import LineIndex
+from parser.transpile import transpile
+from parser.vm import VM, ExecutionError
+
+def add_cache_arguments(arg_parser):
+    """ Adds the syntax tree cache options to a command line parser """
+    arg_parser.add_argument('--cache-dir', default=os.environ.get('CODEGO_CACHE_DIR'),
+                            help='reuse syntax trees of unchanged files from this directory '
+                                 '(default: $CODEGO_CACHE_DIR, caching is off if unset)')
+    arg_parser.add_argument('--no-cache', action='store_true', help='disable the syntax tree cache')
+    arg_parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_SIZE // (1024 * 1024),
+                            metavar='MB', help='size limit of the cache directory (default: %(default)s)')
+
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python codego.py <filename.cg>")
-        sys.exit(1)
+    if len(sys.argv) > 1 and sys.argv[1] == 'check':
+        sys.exit(check(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'watch':
+        sys.exit(watch(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'run':
+        sys.exit(run(sys.argv[2:]))
+
+    arg_parser = argparse.ArgumentParser(prog='codego.py', description='CodeGo compiler',
+                                         epilog='Use "codego.py check <paths...>" to validate many files at once, '
+                                                '"codego.py watch <paths...>" to validate them again as they change, '
+                                                '"codego.py run <file>" to run a program.')
+    arg_parser.add_argument('filename', help='CodeGo source file with a .cg extension')
+    output = arg_parser.add_argument_group('output', 'By default the source, tokens and syntax tree are all printed. '
+                                                     'Any of these options prints only what is asked for.')
+    output.add_argument('-q', '--quiet', action='store_true',
+                        help='only validate; print nothing unless the syntax is invalid')
+    output.add_argument('--tokens', action='store_true', help='print the tokens, one per line')
+    output.add_argument('--ast', choices=('pretty', 'json', 'ndjson', 'binary'),
+                        help='print the syntax tree as indented text, one JSON document, '
+                             'one JSON document per top-level statement, or in the compact binary '
+                             'form read by parser.serialize')
+    output.add_argument('-k', '--all-errors', action='store_true',
+                        help='report every syntax error instead of stopping at the first; statements '
+                             'with errors are left out of the printed syntax tree')
+    arg_parser.add_argument('--mmap', action='store_true',
+                            help='memory-map the file and lex its bytes in place instead of reading it into a '
+                                 'string, for very large files; columns in messages count bytes')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=1,
+                            help='lex and parse a large file in this many worker processes, split at '
+                                 'top-level statements (default: %(default)s)')
+    add_cache_arguments(arg_parser)
+    profiling = arg_parser.add_argument_group('profiling')
+    profiling.add_argument('--profile', action='store_true',
+                           help='print per-phase timings, peak memory and grammar rule call counts to '
+                                'standard error; memory tracing slows the run down')
+    profiling.add_argument('--profile-format', choices=('table', 'json'), default='table',
+                           help='format of the profile (default: %(default)s)')
+    args = arg_parser.parse_args()
 
-    filename = sys.argv[1]
+    sys.exit(compile_file(args))
+
+
+def compile_file(args):
+    """ Lexes and parses a single file, writing the requested output, and returns the exit status """
+    filename = args.filename
 
     # Check if the filename ends with .cg
     if not filename.endswith('.cg'):
         print("Error: The file must have a .cg extension.")
-        sys.exit(1)
+        return 1
+
+    cache = None
+    if args.cache_dir and not args.no_cache:
+        cache = ASTCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    profiler = Profiler() if args.profile else None
+    phase = profiler.phase if profiler else no_phase
+
+    # Without any output option, print the full compilation report
+    report = not (args.quiet or args.tokens or args.ast)
+    out = BufferedWriter(sys.stdout)
+    status = 0
+
+    # Syntax errors, when every one is reported rather than only the first
+    diagnostics = [] if args.all_errors else None
 
     try:
-        with open(filename, 'r') as file:
-            source_code = file.read()
+        with phase('read'):
+            source_code = read_source(filename, args.mmap)
+
+        # Resolves token and node offsets to line numbers, only when printed or in errors
+        lines = LineIndex(source_code)
 
-        print("Running CodeGo compiler...")
-        print("Source Code:")
-        print(source_code)
-        print("\n------------------------------")
+        with phase('emit'):
+            if report:
+                out.write("Running CodeGo compiler...\n")
+                out.write("Source Code:\n")
+                write_source(source_code, out)
+                out.write("\n\n------------------------------\n")
         
+        ast = None
+        if cache:
+            with phase('cache'):
+                ast = cache.load(source_code)
+
+        # Parallel lexing and parsing; None if the file cannot be split, and
+        # then it is parsed sequentially below, with the same output and errors
+        parts = None
+        if ast is None and args.jobs > 1 and not profiler and diagnostics is None:
+            with phase('parse'):
+                # The binary form has a string table shared by all statements, so it
+                # is written here from the statements rather than by the workers
+                keep = cache is not None or args.ast == 'binary'
+                tree = 'pretty' if report else None if args.ast == 'binary' else args.ast
+                parts = parse_parts(source_code, args.jobs, report or args.tokens, tree, keep)
+            if parts is not None and not any(part[0] for part in parts):
+                parts = None  # Reported as an empty file by the sequential parse
+            if parts is not None:
+                ast = [statement for part in parts for statement in part[1]] if keep else []
+                if cache:
+                    with phase('cache'):
+                        cache.store(source_code, ast)
+
         # Tokenization
-        print("Tokens:")
-        lexer = CodeGoLexer(source_code)
-        tokens = lexer.tokens
-        for token in tokens:
-            print(token)
+        if ast is None:
+            with phase('tokenize'):
+                if report or args.tokens or profiler:
+                    tokens = CodeGoLexer.token_stream(source_code, errors=diagnostics)
+                else:
+                    tokens = CodeGoLexer.iter_tokens(source_code, lines, errors=diagnostics)
+
+        with phase('emit'):
+            if report:
+                out.write("Tokens:\n")
+            if parts is not None:
+                for part in parts:
+                    if part[2] is not None:
+                        out.write(part[2])
+            elif ast is None:
+                if report or args.tokens:
+                    write_tokens(tokens, out, lines)
+            elif args.tokens:
+                # The tree was loaded from the cache, which does not keep the tokens
+                write_tokens(CodeGoLexer.token_stream(source_code), out, lines)
+            elif report:
+                out.write("(unchanged since the last run, syntax tree loaded from cache)\n")
 
-        print("\n-----------------------------")
+            if report:
+                out.write("\n-----------------------------\n")
+                out.write("Syntax Tree:\n")
         
         # Parsing
-        print("Syntax Tree:")
-        parser = CodeGoParser(tokens)
-        ast = parser.parse()
+        if ast is None:
+            with phase('parse'):
+                parser = CodeGoParser(tokens, lines, diagnostics)
+                if profiler:
+                    profiler.instrument(parser)
+                if args.quiet and not cache:
+                    # Nothing needs the tree, so it is not kept
+                    parser.check()
+                    ast = []
+                else:
+                    ast = parser.parse()
+            if cache and not diagnostics:
+                with phase('cache'):
+                    cache.store(source_code, ast)
         
-        # Pretty print the AST
-        print_ast(ast)
+        # Print the AST
+        with phase('emit'):
+            if parts is not None and (report or args.ast in ('pretty', 'json', 'ndjson')):
+                # Already written by the workers, a text per part
+                texts = [part[3] for part in parts]
+                if args.ast == 'json':
+                    out.write('[' + ', '.join(text for text in texts if text) + ']\n')
+                else:
+                    for text in texts:
+                        out.write(text)
+            elif report or args.ast == 'pretty':
+                write_pretty(ast, out, lines)
+            elif args.ast == 'json':
+                write_json(ast, out, lines)
+                out.write('\n')
+            elif args.ast == 'ndjson':
+                write_ndjson(ast, out, lines)
+            elif args.ast == 'binary':
+                out.flush()
+                serialize.dump(ast, sys.stdout.buffer)
+
+            if report:
+                out.write("\n-----------------------------\n")
+                if not diagnostics:
+                    out.write("Result: Valid Syntax!\n")
+            out.flush()
+
+        if diagnostics:
+            for error in diagnostics:
+                print(f"Invalid Syntax: {error}", file=sys.stdout if report else sys.stderr)
+            if report:
+                print(f"Result: {len(diagnostics)} syntax error(s)")
+            status = 1
+
+    except FileNotFoundError:
+        out.flush()
+        print(f"Error: The file '{filename}' was not found.", file=sys.stdout if report else sys.stderr)
+        status = 1
+    except (OSError, UnicodeDecodeError) as e:
+        out.flush()
+        print(f"Error: {e}", file=sys.stdout if report else sys.stderr)
+        status = 1
+    except ParseError as e:
+        out.flush()
+        print(f"Invalid Syntax: {e}", file=sys.stdout if report else sys.stderr)
+        status = 1
+    except Exception:
+        # Anything else is a bug in the lexer, the parser or the output
+        out.flush()
+        print("Internal Error: the file could not be compiled because of a bug in CodeGo:", file=sys.stderr)
+        traceback.print_exc()
+        status = 2
+
+    out.flush()
+    if cache:
+        print(cache.stats(), file=sys.stdout if report else sys.stderr)
+    if profiler:
+        print(profiler.report(args.profile_format), file=sys.stderr)
+    return status
+
+
+def read_source(filename, use_mmap=False):
+    """
+    Reads a source file.
+
+    Args:
+        filename (str): The source file.
+        use_mmap (bool): Whether to memory-map the file instead of reading it.
 
-        print("\n-----------------------------")
-        print("Result: Valid Syntax!")
+    Returns:
+        str or mmap.mmap: The source code, or the mapped file, which the lexer
+            scans as UTF-8 encoded bytes. The map is closed once it is no longer
+            referenced, including by a token generator left suspended by an error.
+    """
 
+    if not use_mmap:
+        with open(filename, 'r') as file:
+            return file.read()
+
+    with open(filename, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b''  # Empty files cannot be mapped
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def write_source(source_code, out):
+    """ Writes source code, decoding encoded or memory-mapped source a chunk at a time """
+    if isinstance(source_code, str):
+        out.write(source_code)
+        return
+
+    decoder = codecs.getincrementaldecoder('utf-8')('replace')
+    for start in range(0, len(source_code), out.chunk_size):
+        out.write(decoder.decode(source_code[start:start + out.chunk_size]))
+    out.write(decoder.decode(b'', final=True))
+
+
+def no_phase(name):
+    """ Stands in for Profiler.phase() when profiling is off """
+    return nullcontext()
+
+
+def check(argv):
+    """ Validates every .cg file under the given paths in parallel, returning the exit status """
+    arg_parser = argparse.ArgumentParser(prog='codego.py check',
+                                         description='Validate the syntax of many CodeGo files in parallel')
+    arg_parser.add_argument('paths', nargs='+', help='.cg files, or directories to search recursively')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                            help='number of worker processes (default: %(default)s)')
+    add_cache_arguments(arg_parser)
+    args = arg_parser.parse_args(argv)
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    filenames = discover(args.paths)
+    start = time.perf_counter()
+
+    invalid = 0
+    failed = 0
+    hits = 0
+    unique = total = 0
+    for filename, error, cache_result, symbols, internal in check_files(filenames, args.jobs, cache_dir,
+                                                                         args.cache_size * 1024 * 1024):
+        if error is None:
+            print(f"{filename}: Valid Syntax!")
+        else:
+            invalid += 1
+            failed += internal
+            print(f"{filename}: {error}")
+        hits += cache_result == 'hit'
+        unique += symbols[0]
+        total += symbols[1]
+
+    elapsed = time.perf_counter() - start
+    print("\n-----------------------------")
+    print(f"Checked {len(filenames)} file(s) in {elapsed:.2f}s: "
+          f"{len(filenames) - invalid} valid, {invalid} invalid")
+    if cache_dir:
+        print(f"Cache: {hits} hit(s), {len(filenames) - hits} miss(es)")
+    if total:
+        # Each worker process keeps its own table, so names used in files checked
+        # by different workers count once per worker
+        print(f"Symbols: {unique:,} unique of {total:,} total ({1 - unique / total:.0%} reused)")
+
+    if failed:
+        return 2
+    return 1 if invalid or not filenames else 0
+
+
+def watch(argv):
+    """ Validates every .cg file under the given paths, then again whenever one changes """
+    arg_parser = argparse.ArgumentParser(prog='codego.py watch',
+                                         description='Validate CodeGo files again whenever they change')
+    arg_parser.add_argument('paths', nargs='+', help='.cg files, or directories to watch recursively')
+    arg_parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                            help='seconds to wait for a burst of changes to end (default: %(default)s)')
+    arg_parser.add_argument('--poll', action='store_true',
+                            help='look for changes by scanning the files instead of using inotify')
+    arg_parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                            help='seconds between scans when polling (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+
+    watch_paths(args.paths, args.debounce, args.interval, args.poll)
+    return 0
+
+
+def run(argv):
+    """ Compiles a program to bytecode or Python and runs it, returning the exit status """
+    arg_parser = argparse.ArgumentParser(prog='codego.py run', description='Run a CodeGo program')
+    arg_parser.add_argument('filename', help='CodeGo source file with a .cg extension')
+    arg_parser.add_argument('--backend', choices=('vm', 'py'), default='vm',
+                            help='run the program on the bytecode VM, or compile it to Python '
+                                 '(default: %(default)s)')
+    arg_parser.add_argument('--dis', action='store_true',
+                            help='print the bytecode, or the Python source with --backend=py, instead of '
+                                 'running the program')
+    arg_parser.add_argument('-O', dest='level', type=int, choices=LEVELS, default=0,
+                            help='optimization level: -O1 folds constants and drops dead branches, -O2 also '
+                                 'hoists invariant expressions out of loops (default: %(default)s)')
+    arg_parser.add_argument('--opt-report', action='store_true',
+                            help='print how many syntax tree nodes each optimization pass removed, and '
+                                 'how many expressions it moved out of loops, to standard error')
+    args = arg_parser.parse_args(argv)
+
+    if not args.filename.endswith('.cg'):
+        print("Error: The file must have a .cg extension.", file=sys.stderr)
+        return 1
+
+    out = BufferedWriter(sys.stdout)
+    try:
+        source_code = read_source(args.filename)
+        lines = LineIndex(source_code)
+        ast = CodeGoParser(CodeGoLexer.iter_tokens(source_code, lines), lines).parse()
+        optimizer = Optimizer(args.level, lines)
+        ast = optimizer.optimize(ast)
+        if args.opt_report:
+            print(f'Optimization (-O{args.level}):', file=sys.stderr)
+            for name, count in optimizer.removed.items():
+                if name == HOISTING:
+                    print(f'  {name}: {optimizer.hoisted} expression(s) moved out of loops', file=sys.stderr)
+                else:
+                    print(f'  {name}: {count} node(s) removed', file=sys.stderr)
+            if not optimizer.removed:
+                print('  no passes run', file=sys.stderr)
+        if args.backend == 'py':
+            program = transpile(ast, lines)
+            if args.dis:
+                out.write(program.source() + '\n')
+            else:
+                program.run(out)
+        else:
+            code = compile_program(ast, lines)
+            if args.dis:
+                out.write(disassemble(code, lines) + '\n')
+            else:
+                VM(out, lines).run(code)
     except FileNotFoundError:
-        print(f"Error: The file '{filename}' was not found.")
-    except Exception as e:
-        print(f"Invalid Syntax: {e}")
-        # Enable below line for debugging purposes
-        # traceback.print_exc()
-
-def print_ast(ast, level=0):
-    """ Pretty print the Abstract Syntax Tree (AST) """
-    indent = '  ' * level
-    if isinstance(ast, dict):
-        for key, value in ast.items():
-            print(f"{indent}{key}:")
-            print_ast(value, level + 1)
-    elif isinstance(ast, list):
-        for item in ast:
-            print_ast(item, level)
-    else:
-        print(f"{indent}{ast}")
+        print(f"Error: The file '{args.filename}' was not found.", file=sys.stderr)
+        return 1
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except ParseError as e:
+        out.flush()
+        print(f"Invalid Syntax: {e}", file=sys.stderr)
+        return 1
+    except CompileError as e:
+        out.flush()
+        print(f"Compile Error: {e}", file=sys.stderr)
+        return 1
+    except ExecutionError as e:
+        out.flush()
+        print(f"Runtime Error: {e}", file=sys.stderr)
+        return 1
+    except Exception:
+        # Anything else is a bug in the compiler, the VM or the Python backend
+        out.flush()
+        print("Internal Error: the program could not be run because of a bug in CodeGo:", file=sys.stderr)
+        traceback.print_exc()
+        return 2
+    finally:
+        out.flush()
+    return 0
+
 
 if __name__ == "__main__":
     main()
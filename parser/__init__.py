@@ -1,17 +1,96 @@
+from collections import deque
+from types import GeneratorType
+
 from .bawat import bawat_statement
+from .errors import EMPTY_FILE, EXPECTED_TOKEN, UNEXPECTED_TOKEN, ParseError, token_span
 from .expression import expression_statement
 from .gawa import gawa_declaration, gawa_invocation
 from .habang import habang_statement
 from .kapag import kapag_statement
 from .komento import komento_statement
 from .kung import kung_statement
+from .lista import list_item, object_follows, object_key, object_value
+from .nodes import (
+    BinaryOp, FunctionInvocation, Identifier, ListLiteral, Literal, ObjectLiteral, Parameter, PropertyAccess,
+    UnaryOp,
+)
+from .tokens import (
+    BASIC_TYPE, BAWAT, COMMA, COMMENT, DOT, EOF, GAWA, GREATER, GREATER_EQUAL, HABANG, HINTO,
+    DIVIDE, IDENTIFIER, KAPAG, KIND_NAMES, KUNG, LBRACE, LBRACKET, LESS, LESS_EQUAL, LPAREN, MINUS,
+    NEWLINE, NUMERO, PLUS, RBRACE, RBRACKET, RPAREN, TEKSTO, TIMES, TSEK, token_repr,
+)
 from .variable import var_declaration
 
+# Token kinds that end a block of statements
+BLOCK_END = frozenset((EOF, RBRACE, HINTO))
+
+# Token kinds that only ever start a statement; a parser recovering from an
+# error continues at the first of them (see CodeGoParser.resync())
+KEYWORD_STARTS = frozenset((BASIC_TYPE, KUNG, KAPAG, HABANG, BAWAT, GAWA))
+
+# Operator precedence used by expression(); higher binds tighter. All binary
+# operators are left associative, and prefix operators bind tighter than any
+# binary operator. Calls and property access (postfixes) bind tightest of all.
+BINARY_PRECEDENCE = {
+    GREATER: 1, LESS: 1, GREATER_EQUAL: 1, LESS_EQUAL: 1,
+    PLUS: 2, MINUS: 2,
+    TIMES: 3, DIVIDE: 3,
+}
+PREFIX_PRECEDENCE = {
+    MINUS: 4,
+}
+
+# Token kinds of literal terms
+LITERALS = frozenset((NUMERO, TSEK, TEKSTO))
+
+# Marks a prefix operator on expression()'s operator stack, in place of a left operand
+_PREFIX = object()
+
+# Yielded by resumable_expression() at a block of statements used as a value,
+# where block statements yield None (see iter_statements())
+_VALUE_BLOCK = object()
+
+# Grammar rules by name. Rules are always invoked through CodeGoParser.rules, so
+# they can be wrapped per parser instance (see parser.profile) at no cost otherwise.
+# Statement rules take the parser; the list and object literal rules (see
+# parser.lista) also take the literal and the item that was just parsed.
+RULES = {
+    'var_declaration': var_declaration,
+    'komento_statement': komento_statement,
+    'gawa_invocation': gawa_invocation,
+    'expression_statement': expression_statement,
+    'kung_statement': kung_statement,
+    'kapag_statement': kapag_statement,
+    'habang_statement': habang_statement,
+    'bawat_statement': bawat_statement,
+    'gawa_declaration': gawa_declaration,
+    'list_item': list_item,
+    'object_value': object_value,
+}
+
 class CodeGoParser:
-    def __init__(self, tokens):
-        self.tokens = tokens
+    def __init__(self, tokens, lines=None, diagnostics=None):
+        # Tokens may come from a list, a TokenStream or lazily from
+        # CodeGoLexer.iter_tokens(); only a small lookahead buffer is ever kept in memory
+        self.tokens = iter(tokens)
+        self.lookahead = deque()
         self.pos = 0
 
+        # Line index of the source, used to report line and column numbers in
+        # errors. A TokenStream brings its own.
+        self.lines = lines if lines is not None else getattr(tokens, 'lines', None)
+
+        # Offset of the last token seen, used for the implicit EOF token
+        self.last_offset = 0
+
+        # Grammar rules used by this parser, shared until a hook replaces them
+        self.rules = RULES
+
+        # Syntax errors found so far, when the parser recovers from them instead
+        # of raising the first one; the list may be shared with the lexer (see
+        # CodeGoLexer.iter_tokens()). None to raise errors.
+        self.diagnostics = diagnostics
+
     def parse(self):
         """
         Parses the input tokens into statements.
@@ -19,22 +98,65 @@ class CodeGoParser:
         This method serves as the entry point for parsing the entire code structure.
         It gathers all statements from the input token stream and returns them.
 
+        When the parser collects `diagnostics`, every syntax error is recorded
+        there, in order, and the statements that could be parsed are returned.
+
         Returns:
             list: A list of parsed statements.
 
         Raises:
-            RuntimeError: If no statements are found in the input.
+            ParseError: If the syntax is invalid or no statements are found in the input.
         """
         
         # Gather all statements from the token stream
         stmts = self.statements()
         if len(stmts) == 0:
-            raise RuntimeError('File is empty. There is nothing to parse.')
+            self.empty()
+        self.sort_diagnostics()
         
         return stmts
 
 
-    def statements(self):
+    def check(self):
+        """
+        Parses the input tokens without keeping the syntax tree.
+
+        Each top-level statement is dropped as soon as it has been parsed, so
+        memory use does not grow with the size of the input.
+
+        Returns:
+            int: The number of top-level statements.
+
+        Raises:
+            ParseError: If the syntax is invalid or no statements are found in the input.
+        """
+
+        count = 0
+        for _ in self.iter_statements():
+            count += 1
+        if count == 0:
+            self.empty()
+        self.sort_diagnostics()
+
+        return count
+
+
+    def empty(self):
+        """ Reports that the input has no statements, unless that is because of other errors """
+        error = ParseError(EMPTY_FILE, 'File is empty. There is nothing to parse.', (0, 0))
+        if self.diagnostics is None:
+            raise error
+        if not self.diagnostics:
+            self.diagnostics.append(error)
+
+
+    def sort_diagnostics(self):
+        """ Puts the collected errors in source order; the lexer reports its own a few tokens early """
+        if self.diagnostics:
+            self.diagnostics.sort(key=lambda error: error.span)
+
+
+    def statements(self, nested=False):
         """
         Parses a sequence of statements from the current token stream.
 
@@ -42,20 +164,115 @@ class CodeGoParser:
         which can be either the end of the file (EOF), a closing brace (RBRACE),
         or the HINTO token (break statement).
 
+        Args:
+            nested (bool): Whether the statements are those of a block inside an
+                expression, which a closing brace ends (see iter_statements()).
+
         Returns:
             list: A list of parsed statements.
         """
+
+        return list(self.iter_statements(nested))
+
+
+    def iter_statements(self, nested=False):
+        """
+        Parses a sequence of statements like statements(), yielding each one as soon as it is complete.
+
+        Block statements (Kung, Habang, Bawat, Kapag, Gawa) are generators that
+        yield when they reach a block of statements. Instead of recursing, this
+        method suspends the block statement on an explicit stack, collects the
+        statements of the block, and sends them back to it when the block ends.
+        Rules with expressions are generators too, which yield the same way at
+        a block used as a value (see resumable_expression()). Nesting depth is
+        therefore limited only by memory.
+
+        A closing brace or Hinto outside of any block is an error, unless the
+        statements are `nested`, where it ends them. When the parser collects
+        `diagnostics`, a statement with a syntax error is left out, the error is
+        recorded, and parsing continues after it (see resync()).
+
+        Args:
+            nested (bool): Whether the statements are those of a block inside an expression.
+
+        Yields:
+            Node: The parsed statements of the outermost block.
+        """
         
-        # Initialize an empty list to hold parsed statements
+        # Suspended block statements, each with the statements of its enclosing
+        # block and whether its open block is a value (see resumable_expression())
+        stack = []
+
+        # Statements of the innermost open block; those of the outermost block are yielded instead
         statements = []
-        while self.current_token()[0] not in ['EOF', 'RBRACE', 'HINTO']:
-            stmt = self.statement()
-            
-            # If a statement was successfully parsed, 
-            # add it to the list of statements
-            if stmt is not None:
-                statements.append(stmt)
-        return statements
+        recovering = self.diagnostics is not None
+        while True:
+            if self.current_token()[0] not in BLOCK_END:
+                start = self.pos
+                try:
+                    stmt = self.statement()
+                except RuntimeError as error:
+                    if not recovering:
+                        raise
+                    block = self.resync(error, start, opened=False)
+                    if block is not None:
+                        stack.append((block, statements, False))
+                        statements = []
+                    continue
+                if type(stmt) is not GeneratorType:
+                    # If a statement was successfully parsed, 
+                    # add it to the statements of its block
+                    if stmt is None:
+                        continue
+                    if stack:
+                        statements.append(stmt)
+                    else:
+                        yield stmt
+                    continue
+
+                # A block statement: run it up to its first block
+                rule, value, valued = stmt, None, False
+            elif stack:
+                # The end of a block: hand its statements back to the block statement
+                rule, value, valued = stack.pop()
+                value, statements = statements, value
+            elif not nested and self.current_token()[0] != EOF:
+                token = self.current_token()
+                error = ParseError(UNEXPECTED_TOKEN, f'Unexpected token: {self.describe(token)}', token_span(token))
+                if not recovering:
+                    raise error
+                self.diagnostics.append(error)
+                self.eat(token[0])
+                continue
+            else:
+                return
+
+            start = self.pos
+            try:
+                yielded = rule.send(value)
+            except StopIteration as stop:
+                if stop.value is None:
+                    pass  # A block skipped after an error
+                elif stack:
+                    statements.append(stop.value)
+                else:
+                    yield stop.value
+            except RuntimeError as error:
+                if not recovering:
+                    raise
+                if valued:
+                    # A block used as a value is closed as soon as it is sent back, so
+                    # the error is in the rest of a statement that began before the block
+                    block = self.resync(error, None, opened=False)
+                else:
+                    block = self.resync(error, start, opened=value is not None)
+                if block is not None:
+                    stack.append((block, statements, False))
+                    statements = []
+            else:
+                # The block statement needs another block parsed
+                stack.append((rule, statements, yielded is _VALUE_BLOCK))
+                statements = []
 
 
     def statement(self):
@@ -67,164 +284,365 @@ class CodeGoParser:
         control flow statements, function invocations, and other statement types.
 
         Returns:
-            dict: A parsed representation of the statement, or None for newlines.
+            Node: A parsed representation of the statement, or None for newlines.
+                Block statements return a generator, which statements() runs.
         
         Raises:
-            RuntimeError: If an unexpected token is encountered.
+            ParseError: If an unexpected token is encountered.
         """
         
         # Get the current token from the token stream
         current_token = self.current_token()
         token_type = current_token[0]
-        line_number = current_token[2]
         
         # For variable declaration
-        if token_type == 'BASIC_TYPE':
-            return var_declaration(self)
+        if token_type == BASIC_TYPE:
+            return self.rules['var_declaration'](self)
         
         # For comments
-        elif token_type == 'COMMENT':
-            return komento_statement(self)
+        elif token_type == COMMENT:
+            return self.rules['komento_statement'](self)
         
         # For new lines
-        elif token_type == 'NEWLINE':
-            self.eat('NEWLINE')
+        elif token_type == NEWLINE:
+            self.eat(NEWLINE)
             return None
         
         # For invoking functions
-        elif token_type == 'IDENTIFIER':
+        elif token_type == IDENTIFIER:
             # Look ahead for function invocation
             next_token = self.peek()  # Check the next token
-            if next_token[0] == 'LPAREN':
-                return gawa_invocation(self)
+            if next_token[0] == LPAREN:
+                return self.rules['gawa_invocation'](self)
             else:
-                return expression_statement(self)
+                return self.rules['expression_statement'](self)
         
         # Kung statement
-        elif token_type == 'KUNG':
-            return kung_statement(self)
+        elif token_type == KUNG:
+            return self.rules['kung_statement'](self)
         
         # Kapag statement
-        elif token_type == 'KAPAG':
-            return kapag_statement(self)
+        elif token_type == KAPAG:
+            return self.rules['kapag_statement'](self)
         
         # Habang statement
-        elif token_type == 'HABANG':
-            return habang_statement(self)
+        elif token_type == HABANG:
+            return self.rules['habang_statement'](self)
 
         # Bawat statement
-        elif token_type == 'BAWAT':
-            return bawat_statement(self)
+        elif token_type == BAWAT:
+            return self.rules['bawat_statement'](self)
 
         # Gawa declaration
-        elif token_type == 'GAWA':
-            return gawa_declaration(self)
+        elif token_type == GAWA:
+            return self.rules['gawa_declaration'](self)
 
         else:
-            raise RuntimeError(f'Unexpected token: {self.current_token()} on line {line_number}')
+            raise ParseError(UNEXPECTED_TOKEN, f'Unexpected token: {self.describe(current_token)}',
+                             token_span(current_token))
+
+
+    def resync(self, error, start, opened):
+        """
+        Records a syntax error and skips to where parsing can continue.
+
+        A statement that failed before opening a block is skipped up to the next
+        keyword that starts a statement, a name on a later line than the error,
+        or the end of the enclosing block. If a block opens on the way, or the
+        statement failed at the end of one of its own blocks, the block is
+        parsed to its closing brace by skipped_block(), so that braces stay
+        balanced and errors inside the block are found too.
+
+        Args:
+            error (RuntimeError): The error, normally a ParseError.
+            start (int): The position of the token the failed step started at, or
+                None if it resumed a statement after a block used as a value.
+            opened (bool): Whether the failed statement had opened a block.
+
+        Returns:
+            generator: A skipped_block() to push in place of the failed block
+                statement, or None if the parser is back between statements.
+        """
+
+        if not isinstance(error, ParseError):
+            token = self.current_token()
+            error = ParseError(UNEXPECTED_TOKEN, str(error), token_span(token))
+        self.diagnostics.append(error)
+
+        kind = self.current_token()[0]
+        if opened:
+            # Failed at a block end other than its own, e.g. a Hinto outside a Kaso
+            if kind == RBRACE:
+                self.eat(RBRACE)
+                return None
+            if kind == EOF:
+                return None
+            if kind == HINTO:
+                self.eat(HINTO)
+            return self.skipped_block()
+
+        if self.pos == start and kind != EOF:
+            # Nothing was parsed, so skip at least the token that failed
+            self.eat(kind)
+            if kind == LBRACE:
+                return self.skipped_block()
+
+        error_line = self.lines.line(error.span[0]) if self.lines is not None else None
+        while True:
+            token = self.current_token()
+            kind = token[0]
+            if kind in BLOCK_END or kind in KEYWORD_STARTS:
+                return None
+            if kind == IDENTIFIER and error_line is not None and self.lines.line(token[2]) > error_line:
+                return None
+            self.eat(kind)
+            if kind == LBRACE:
+                return self.skipped_block()
+
+
+    def skipped_block(self):
+        """
+        Stands in for a block statement that failed after opening a block.
+
+        Like a block statement, it is sent the statements of the block when its
+        closing brace is reached; it then returns None, so that they are left out.
+
+        Returns:
+            generator: The generator, already started.
+        """
+
+        def block():
+            yield
+            self.eat(RBRACE)
+
+        generator = block()
+        next(generator)
+        return generator
 
 
     def arguments(self):
         """
         Parses the arguments within a function call.
 
+        Like resumable_expression(), this is a generator, to be used with `yield from`.
+
         Returns:
-            list: A list of parsed arguments, which can include:
-                - Identifiers, potentially with property access (e.g., object.property).
-                - Numeric literals.
-                - String literals.
-                - Boolean literals.
+            list: A list of parsed arguments, each an expression (see expression()).
         """
     
         args = []
-        while self.current_token()[0] != 'RPAREN':
-            if self.current_token()[0] == 'IDENTIFIER':
-                identifier = self.eat('IDENTIFIER')
-                result = identifier
-
-                # Check for property access (e.g., luto.ulam)
-                while self.current_token()[0] == 'DOT':
-                    self.eat('DOT')
-                    property_name = self.eat('IDENTIFIER')
-                    result = {
-                        'type': 'property_access',
-                        'object': result,
-                        'property': property_name[1]
-                    }
-                args.append(result)
-            if self.current_token()[0] in ('NUMERO', 'TEKSTO', 'TSEK'):
-                args.append(self.eat(self.current_token()[0]))
-            if self.current_token()[0] == 'NEWLINE':
-                self.eat('NEWLINE')
-            if self.current_token()[0] != 'RPAREN':
-                self.eat('COMMA')
+        while self.current_token()[0] != RPAREN:
+            args.append((yield from self.resumable_expression()))
+            if self.current_token()[0] == NEWLINE:
+                self.eat(NEWLINE)
+            if self.current_token()[0] != RPAREN:
+                self.eat(COMMA)
         return args
 
 
     def expression(self):
         """
-        Parses an expression which can include binary operations (addition, subtraction, 
-        comparisons, etc.) and terms.
+        Parses a single expression on its own, outside of any statement.
+
+        This is the entry point for tools that parse a lone expression; it is not
+        used by the grammar rules, which parse their expressions with
+        resumable_expression() so that iter_statements() can parse the blocks of
+        statements used as values on its explicit stack. Here such blocks are
+        parsed as they come, by recursing into statements().
 
         Returns:
-            dict: A structured representation of the parsed expression, including:
-                - 'type': The type of operation ('binary_op' for binary operations).
-                - 'operator': The operator used in the operation (e.g., '+', '-', '>', etc.).
+            Node: The parsed expression (see resumable_expression()).
+        """
+
+        steps = self.resumable_expression()
+        value = None
+        while True:
+            try:
+                steps.send(value)
+            except StopIteration as stop:
+                return stop.value
+            value = self.statements(nested=True)
+
+
+    def resumable_expression(self):
+        """
+        Parses an expression: terms combined with prefix, binary and postfix operators.
+
+        Operators are applied by precedence climbing, driven by BINARY_PRECEDENCE and
+        PREFIX_PRECEDENCE. Calls (f(x)) and property access (luto.ulam) are postfixes
+        of any term. Pending operators, open parentheses, the argument lists of
+        calls and open list and object literals (see parser.lista) are all kept on
+        explicit stacks instead of recursing, so both long operator chains and deep
+        nesting are parsed in a single loop.
+
+        A block of statements used as a value ({ ... }) is left to the caller:
+        like a block statement, this generator yields _VALUE_BLOCK after the
+        opening brace and is sent the statements of the block, which
+        iter_statements() parses on its own explicit stack. Rules use it with
+        `yield from`, so blocks nested in expressions never recurse either.
+
+        Returns:
+            Node: The parsed term, or a tree of BinaryOp, UnaryOp, PropertyAccess,
+                FunctionInvocation, ListLiteral and ObjectLiteral nodes. A BinaryOp includes:
+                - 'operator': The operator used in the operation (e.g., '+', '*', '>', etc.).
                 - 'left': The left operand of the operation.
                 - 'right': The right operand of the operation.
         """
-    
-        term = self.term()
-        while self.current_token()[0] in ('PLUS', 'MINUS', 'GREATER', 'LESS', 'GREATER_EQUAL', 'LESS_EQUAL'):
-            operator = self.eat(self.current_token()[0])
-            term2 = self.term()
-            term = {'type': 'binary_op', 'operator': operator[1], 'left': term, 'right': term2}
-        return term
+
+        current_token = self.current_token
+        eat = self.eat
+        binary_precedence = BINARY_PRECEDENCE.get
+
+        # Pending operators as (precedence, operator token, left operand or _PREFIX)
+        operators = []
+
+        # Open parentheses, calls and literals, innermost last, as (operator stack
+        # size when opened, opener, state): the opener is None for parentheses,
+        # the token and expression of the callee for calls, with the arguments so
+        # far as state, or the ListLiteral or ObjectLiteral being filled in, with
+        # the key of the current property as the state of an object
+        groups = []
+        base = 0
+
+        while True:
+            # Prefix position: open parentheses and prefix operators before a term
+            kind = current_token()[0]
+            if kind == LPAREN:
+                eat(LPAREN)
+                base = len(operators)
+                groups.append((base, None, None))
+                continue
+            if kind in PREFIX_PRECEDENCE:
+                operators.append((PREFIX_PRECEDENCE[kind], eat(kind), _PREFIX))
+                continue
+
+            # Names and literals are by far the most common terms, so they skip term()
+            if kind == IDENTIFIER:
+                token = eat(IDENTIFIER)
+                operand = Identifier(token[1], token[2])
+            elif kind in LITERALS:
+                operand = Literal(*eat(kind))
+            elif kind == LBRACKET:
+                operand = ListLiteral([], eat(LBRACKET)[2])
+                if current_token()[0] != RBRACKET:
+                    base = len(operators)
+                    groups.append((base, operand, None))
+                    continue
+                eat(RBRACKET)
+            elif kind == LBRACE:
+                if object_follows(self):
+                    operand = ObjectLiteral({}, eat(LBRACE)[2])
+                    if current_token()[0] != RBRACE:
+                        base = len(operators)
+                        groups.append((base, operand, object_key(self)))
+                        continue
+                    eat(RBRACE)
+                else:
+                    eat(LBRACE)
+                    operand = yield _VALUE_BLOCK
+                    eat(RBRACE)
+            else:
+                operand = self.term()
+
+            # Postfix position: property access, calls, binary operators and closing parentheses
+            while True:
+                kind = current_token()[0]
+                if kind == DOT:
+                    eat(DOT)
+                    property_name = eat(IDENTIFIER)
+                    operand = PropertyAccess(operand, property_name[1], property_name[2])
+                    continue
+                if kind == LPAREN:
+                    token = eat(LPAREN)
+                    if current_token()[0] == RPAREN:
+                        eat(RPAREN)
+                        operand = self.call(operand, [], token[2])
+                        continue
+                    base = len(operators)
+                    groups.append((base, (token, operand), []))
+                    break
+
+                # Apply the pending operators of the current group that bind at least as tightly
+                precedence = binary_precedence(kind, 0)
+                while len(operators) > base and operators[-1][0] >= precedence:
+                    _, operator, left = operators.pop()
+                    if left is _PREFIX:
+                        operand = UnaryOp(operator[1], operand, operator[2])
+                    else:
+                        operand = BinaryOp(operator[1], left, operand, operator[2])
+
+                if precedence:
+                    operators.append((precedence, eat(kind), operand))
+                    break
+                if not groups:
+                    return operand
+
+                # The end of a parenthesized expression, a literal item or a call argument
+                _, opener, state = groups[-1]
+                if opener is None:
+                    eat(RPAREN)
+                    groups.pop()
+                    base = groups[-1][0] if groups else 0
+                    continue
+                opener_type = type(opener)
+                if opener_type is ListLiteral:
+                    if not self.rules['list_item'](self, opener, operand):
+                        break
+                    groups.pop()
+                    base = groups[-1][0] if groups else 0
+                    operand = opener
+                    continue
+                if opener_type is ObjectLiteral:
+                    key = self.rules['object_value'](self, opener, state, operand)
+                    if key is not None:
+                        groups[-1] = (base, opener, key)
+                        break
+                    groups.pop()
+                    base = groups[-1][0] if groups else 0
+                    operand = opener
+                    continue
+
+                callee, arguments = opener, state
+                arguments.append(operand)
+                if kind == NEWLINE:
+                    eat(NEWLINE)
+                if current_token()[0] != RPAREN:
+                    eat(COMMA)
+                    break
+                eat(RPAREN)
+                groups.pop()
+                base = groups[-1][0] if groups else 0
+                operand = self.call(callee[1], arguments, callee[0][2])
+
+
+    def call(self, callee, arguments, offset):
+        """ Returns the FunctionInvocation of `callee`, named by a string when it is a plain name """
+        if type(callee) is Identifier:
+            return FunctionInvocation(callee.name, arguments, callee.offset)
+        return FunctionInvocation(callee, arguments, offset)
 
 
     def term(self):
         """
-        Parses a term in an expression.
+        Parses a term in an expression. Parentheses, operators, list and object
+        literals and blocks used as values are handled by resumable_expression().
 
         Returns:
-            dict or any: A parsed term, which can include:
-                        - An identifier, potentially with property access.
+            Node: A parsed term, which can include:
+                        - An identifier.
                         - A numeric literal.
                         - A boolean literal.
                         - A string literal.
-                        - An expression enclosed in parentheses.
-                        - A block of statements enclosed in braces.
         """
 
         current_token = self.current_token()[0]
-        if current_token == 'IDENTIFIER':
-            identifier = self.eat('IDENTIFIER')
-            result = identifier
-
-            # Check for property access (e.g., luto.ulam)
-            while self.current_token()[0] == 'DOT':
-                self.eat('DOT')
-                property_name = self.eat('IDENTIFIER')
-                result = {
-                    'type': 'property_access',
-                    'object': result,
-                    'property': property_name[1]
-                }
-
-            return result
-        elif current_token in ['NUMERO', 'TSEK', 'TEKSTO']:
-            return self.eat(current_token)
-        elif current_token == 'LPAREN':
-            self.eat('LPAREN')
-            expr = self.expression()
-            self.eat('RPAREN')
-            return expr
-        elif current_token == 'LBRACE':
-            self.eat('LBRACE')
-            expr = self.statements()
-            self.eat('RBRACE')
-            return expr
-        raise RuntimeError(f'Unexpected token in term: {self.current_token()}')
+        if current_token == IDENTIFIER:
+            identifier = self.eat(IDENTIFIER)
+            return Identifier(identifier[1], identifier[2])
+        elif current_token in LITERALS:
+            return Literal(*self.eat(current_token))
+        raise ParseError(UNEXPECTED_TOKEN, f'Unexpected token in term: {self.describe(self.current_token())}',
+                         token_span(self.current_token()))
 
 
     def parameters(self):
@@ -233,30 +651,28 @@ class CodeGoParser:
         have a type (e.g., 'Desimal bayad' or just 'bayad').
 
         Returns:
-            list: A list of dictionaries, each representing a parameter with the following keys:
-                - 'type': The type of the parameter as a string, or None if untyped.
+            list: A list of Parameter nodes, each with the following fields:
+                - 'basic_type': The type of the parameter as a string, or None if untyped.
                 - 'name': The name of the parameter as a string.
         """
 
         parameters = []
 
-        while self.current_token()[0] != 'RPAREN':
+        while self.current_token()[0] != RPAREN:
             # Check if there is an optional BASIC_TYPE
             param_type = None
-            if self.current_token()[0] == 'BASIC_TYPE':
-                param_type = self.eat('BASIC_TYPE')[1]  # Consume the type if present
+            if self.current_token()[0] == BASIC_TYPE:
+                param_type = self.eat(BASIC_TYPE)[1]  # Consume the type if present
 
             # Next, we expect an identifier for the parameter name
-            param_name = self.eat('IDENTIFIER')[1]
+            param_name = self.eat(IDENTIFIER)
 
-            parameters.append({
-                'type': param_type,  # This will be None if no type was provided
-                'name': param_name
-            })
+            # The type will be None if no type was provided
+            parameters.append(Parameter(param_type, param_name[1], param_name[2]))
 
             # If the next token is a comma, consume it to proceed to the next parameter
-            if self.current_token()[0] == 'COMMA':
-                self.eat('COMMA')
+            if self.current_token()[0] == COMMA:
+                self.eat(COMMA)
             else:
                 break  # Exit loop if no comma (and we assume we're at the end of the parameter list)
 
@@ -268,24 +684,38 @@ class CodeGoParser:
         Consumes the current token if it matches the expected type.
 
         Args:
-            token_type (str): The type of the token expected (e.g., 'IDENTIFIER', 'NUMERO').
+            token_type (int): The kind of the token expected (e.g., IDENTIFIER, NUMERO).
 
         Returns:
-            tuple: The consumed token, which includes its type, value, and line number.
+            tuple: The consumed token, which includes its kind, value, and start offset.
 
         Raises:
-            RuntimeError: If the current token does not match the expected type, indicating an error.
+            ParseError: If the current token does not match the expected type, indicating an error.
         """
         current = self.current_token()
         
         # Check if the token type matches the expected type
         if current[0] == token_type:
-            token = current
+            self.lookahead.popleft()
             self.pos += 1
-            return token
+            return current
         else:
             # Raise an error if the current token does not match the expected type
-            raise RuntimeError(f'Expected {token_type}, got {current} on line {current[2]}')
+            raise ParseError(EXPECTED_TOKEN, f'Expected {KIND_NAMES[token_type]}, got {self.describe(current)}',
+                             token_span(current))
+
+
+    def describe(self, token):
+        """
+        Formats a token and its position for an error message.
+
+        Returns:
+            str: e.g. "('RBRACE', '}', 5) on line 5, column 1", or the offset of
+                the token when the parser has no line index.
+        """
+        if self.lines is None:
+            return f'{token_repr(token)} at offset {token[2]}'
+        return f'{token_repr(token, self.lines)} on {self.lines.describe(token[2])}'
 
 
     def current_token(self):
@@ -293,17 +723,17 @@ class CodeGoParser:
         Retrieves the current token based on the current position.
 
         Returns:
-            tuple: The current token, which is a tuple containing the token type,
-                its value, and the line number.
+            tuple: The current token, which is a tuple containing the integer token
+                kind, its value, and its start offset.
         
-        If the current position is beyond the end of the tokens list,
-        returns an 'EOF' token, indicating the end of the input.
+        If the current position is beyond the end of the tokens,
+        returns an EOF token, indicating the end of the input.
 
-        If there are no tokens, returns an 'EOF' token with line number 1.
+        If there are no tokens, returns an EOF token at offset 0.
         """
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos]
-        return ('EOF', None, self.tokens[-1][2] if self.tokens else 1)
+        if self.lookahead or self.fill(1):
+            return self.lookahead[0]
+        return (EOF, None, self.last_offset)
 
 
     def peek(self):
@@ -311,10 +741,30 @@ class CodeGoParser:
         Looks ahead to the next token in the token stream without advancing the current position.
 
         Returns:
-            tuple: The next token if available, otherwise an 'EOF' token.
+            tuple: The next token if available, otherwise an EOF token.
+
+        The EOF token indicates that there are no more tokens to process.
+        """
+        if len(self.lookahead) > 1 or self.fill(2):
+            return self.lookahead[1]
+        return (EOF, None, self.last_offset)
+
 
-        The 'EOF' token indicates that there are no more tokens to process.
+    def fill(self, size):
+        """
+        Pulls tokens from the token source until the lookahead buffer holds `size` tokens.
+
+        Args:
+            size (int): The number of tokens the lookahead buffer should hold.
+
+        Returns:
+            bool: True if the buffer holds enough tokens, False if the input ran out.
         """
-        if self.pos + 1 < len(self.tokens):
-            return self.tokens[self.pos + 1]
-        return ('EOF', None, self.tokens[-1][2] if self.tokens else 1)
+        lookahead = self.lookahead
+        while len(lookahead) < size:
+            token = next(self.tokens, None)
+            if token is None:
+                return False
+            lookahead.append(token)
+            self.last_offset = token[2]
+        return True
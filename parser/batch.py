@@ -0,0 +1,132 @@
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import CodeGoParser
+from .cache import DEFAULT_MAX_SIZE, ASTCache
+from .errors import ParseError
+from .lexer import CodeGoLexer
+from .tokens import InternTable, LineIndex
+
+# Caches opened by this worker process, by directory
+_caches = {}
+
+# Names and literals interned by this worker process, shared by all the files it checks
+_symbols = InternTable()
+
+
+def discover(paths):
+    """
+    Finds CodeGo source files.
+
+    Args:
+        paths (list): Files and directories. Directories are searched recursively
+            for files with a .cg extension; files are taken as given.
+
+    Returns:
+        list: The source file paths, sorted within each directory.
+    """
+
+    filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                filenames.extend(os.path.join(root, name) for name in sorted(files) if name.endswith('.cg'))
+        else:
+            filenames.append(path)
+    return filenames
+
+
+def check_file(filename, cache_dir=None, cache_size=DEFAULT_MAX_SIZE):
+    """
+    Lexes and parses a single file.
+
+    Args:
+        filename (str): The source file.
+        cache_dir (str): Syntax tree cache directory, or None to disable caching.
+        cache_size (int): Size limit of the cache directory, in bytes.
+
+    Returns:
+        tuple: (filename, error message or None, cache result, symbols, internal)
+            where the cache result is 'hit', 'miss' or None when caching is
+            disabled, symbols is (names and literals new to this worker, names
+            and literals in the file), and internal tells whether the error is
+            a bug in CodeGo rather than in the file.
+    """
+
+    if not filename.endswith('.cg'):
+        return (filename, 'The file must have a .cg extension.', None, (0, 0), False)
+
+    cache = None
+    if cache_dir:
+        cache = _caches.get(cache_dir)
+        if cache is None:
+            cache = _caches[cache_dir] = ASTCache(cache_dir, cache_size)
+
+    unique = len(_symbols)
+    total = _symbols.total
+    try:
+        with open(filename, 'r') as file:
+            source_code = file.read()
+
+        if cache and cache.load(source_code) is not None:
+            return (filename, None, 'hit', (0, 0), False)
+
+        lines = LineIndex(source_code)
+        parser = CodeGoParser(CodeGoLexer.iter_tokens(source_code, lines, _symbols), lines)
+        if cache:
+            cache.store(source_code, parser.parse())
+        else:
+            parser.check()
+        error = None
+    except FileNotFoundError:
+        return (filename, f"The file '{filename}' was not found.", None, (0, 0), False)
+    except (OSError, UnicodeDecodeError) as e:
+        return (filename, f'Error: {e}', None, (0, 0), False)
+    except ParseError as e:
+        error = f'Invalid Syntax: {e}'
+    except Exception:
+        # Anything else is a bug in the lexer, the parser or the cache; the
+        # traceback is sent back, as a worker process cannot print it in order
+        error = f'Internal Error: the file could not be checked because of a bug in CodeGo:\n{traceback.format_exc()}'
+        return (filename, error.rstrip(), None, (0, 0), True)
+    return (filename, error, cache and 'miss', (len(_symbols) - unique, _symbols.total - total), False)
+
+
+def _check_batch(filenames, cache_dir, cache_size):
+    return [check_file(filename, cache_dir, cache_size) for filename in filenames]
+
+
+def check_files(filenames, jobs=None, cache_dir=None, cache_size=DEFAULT_MAX_SIZE):
+    """
+    Lexes and parses many files in a pool of worker processes.
+
+    Files are sent to the workers in small batches to keep the per-task overhead
+    low, and results are yielded as soon as each batch completes.
+
+    Args:
+        filenames (list): The source files.
+        jobs (int): Number of worker processes, defaults to the number of CPUs.
+            With a single job the files are checked in this process.
+        cache_dir (str): Syntax tree cache directory, or None to disable caching.
+        cache_size (int): Size limit of the cache directory, in bytes.
+
+    Yields:
+        tuple: The check_file() result of every file, in completion order.
+    """
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(filenames) <= 1:
+        for filename in filenames:
+            yield check_file(filename, cache_dir, cache_size)
+        return
+
+    batch_size = max(1, min(32, len(filenames) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(_check_batch, filenames[i:i + batch_size], cache_dir, cache_size)
+            for i in range(0, len(filenames), batch_size)
+        ]
+        for future in as_completed(futures):
+            yield from future.result()
@@ -1,38 +1,38 @@
+from .nodes import BawatStatement
+from .tokens import BAWAT, IDENTIFIER, LBRACE, LPAREN, RBRACE, RPAREN, SA
+
 def bawat_statement(parser):
     """
     Parses a 'BAWAT' statement, which represents a for-each loop over an iterable.
+
+    The loop body is parsed by CodeGoParser.statements(), which sends it back to
+    this generator (see kung_statement).
     
     Returns:
-        dict: A dictionary representing the parsed 'bawat' statement, containing:
-            - 'type': 'bawat_statement'
+        BawatStatement: A node representing the parsed 'bawat' statement, containing:
             - 'iterator': The name of the variable that will represent each item in the loop
             - 'iterable': The name of the iterable object being looped over
             - 'body': A list of statements within the loop body
     """
     # Consume the 'BAWAT' keyword to start the loop
-    parser.eat('BAWAT')
+    offset = parser.eat(BAWAT)[2]
     
     # Parse the loop structure within parentheses
-    parser.eat('LPAREN')
+    parser.eat(LPAREN)
     
     # Variable to represent each item in the iterable
-    iterator = parser.eat('IDENTIFIER')
+    iterator = parser.eat(IDENTIFIER)
     # 'SA' keyword indicating 'in' (as in "for each item in iterable")
-    parser.eat('SA')
+    parser.eat(SA)
     
     # The iterable being looped over
-    iterable = parser.eat('IDENTIFIER')
-    parser.eat('RPAREN')
+    iterable = parser.eat(IDENTIFIER)
+    parser.eat(RPAREN)
     
     # Parse the loop body enclosed within braces
-    parser.eat('LBRACE')
-    body = parser.statements()
-    parser.eat('RBRACE')
+    parser.eat(LBRACE)
+    body = yield
+    parser.eat(RBRACE)
     
-    # Return the parsed 'bawat' statement as a structured dictionary
-    return {
-        'type': 'bawat_statement',
-        'iterator': iterator[1],
-        'iterable': iterable[1],
-        'body': body
-    }
+    # Return the parsed 'bawat' statement as a BawatStatement node
+    return BawatStatement(iterator[1], iterable[1], body, offset)
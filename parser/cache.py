@@ -0,0 +1,217 @@
+import hashlib
+import os
+import tempfile
+
+from . import serialize
+
+# Size limit of a cache directory, in bytes
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+# Suffix of cache entries
+ENTRY_SUFFIX = '.ast'
+
+# Permissions of cache entries before the umask, so that a shared cache directory can be read by everyone
+ENTRY_MODE = 0o644
+
+
+def current_umask():
+    """ Returns the umask of the process, which can only be read by setting it """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def grammar_stamp():
+    """
+    Computes a stamp identifying the current lexer and parser.
+
+    The stamp hashes the source of every module in this package, so any change
+    to the grammar or to the AST classes invalidates previously cached trees.
+
+    Returns:
+        str: A hex digest.
+    """
+
+    digest = hashlib.sha256()
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(package_dir)):
+        if name.endswith('.py'):
+            with open(os.path.join(package_dir, name), 'rb') as file:
+                digest.update(name.encode())
+                digest.update(file.read())
+    return digest.hexdigest()
+
+
+class ASTCache:
+    """
+    An on-disk cache of parsed syntax trees, keyed by a hash of the source code.
+
+    Trees are stored in the binary form of parser.serialize. Entries are written
+    atomically, so concurrent runs never see partial files, and the least
+    recently used entries are evicted once the directory grows beyond its size limit.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.stamp = grammar_stamp()
+
+        # Permissions of new entries; temporary files are created readable by their owner only
+        self.mode = ENTRY_MODE & ~current_umask()
+
+        # Total size of the entries, computed on the first store
+        self.size = None
+
+        # Statistics for this run
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+
+    def path(self, source):
+        """
+        Returns the path of the cache entry for the given source code.
+
+        Args:
+            source (str or bytes-like): The source code, or the encoded source
+                code, e.g. a memory-mapped file.
+
+        Returns:
+            str: The entry path, fanned out into subdirectories by hash prefix.
+        """
+
+        digest = hashlib.sha256(self.stamp.encode())
+        if isinstance(source, str):
+            digest.update(source.encode('utf-8', 'surrogatepass'))
+        else:
+            # Trees of encoded source record byte offsets, so they are kept apart
+            # from trees of the same source read as text
+            digest.update(b'\0bytes\0')
+            digest.update(source)
+        key = digest.hexdigest()
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+
+    def load(self, source):
+        """
+        Loads the cached syntax tree for the given source code.
+
+        Args:
+            source (str or bytes-like): The source code.
+
+        Returns:
+            list: The parsed statements, or None if the source is not cached or
+                its entry cannot be read. An entry that cannot be decoded is removed.
+        """
+
+        path = self.path(source)
+        try:
+            with open(path, 'rb') as file:
+                ast = serialize.load(file)
+        except OSError:
+            self.misses += 1
+            return None
+        except Exception:
+            # A damaged entry is parsed again and stored anew
+            self.misses += 1
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return ast
+
+
+    def store(self, source, ast):
+        """
+        Stores the syntax tree for the given source code.
+
+        Args:
+            source (str or bytes-like): The source code.
+            ast (list): The parsed statements.
+        """
+
+        path = self.path(source)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file first and rename it into place
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                serialize.dump(ast, file)
+            os.chmod(temp_path, self.mode)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        self.stores += 1
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+        else:
+            self.size += os.path.getsize(path)
+
+        if self.size > self.max_size:
+            self.evict()
+
+
+    def entries(self):
+        """
+        Lists the cache entries.
+
+        Returns:
+            list: (path, size, last used time) for every entry.
+        """
+
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for subdir in os.scandir(self.directory):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                if entry.name.endswith(ENTRY_SUFFIX):
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits in its size limit.
+        """
+
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        size = sum(entry[1] for entry in entries)
+        for path, entry_size, _ in entries:
+            if size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            size -= entry_size
+            self.evictions += 1
+        self.size = size
+
+
+    def stats(self):
+        """
+        Summarizes cache usage for this run.
+
+        Returns:
+            str: Hit, miss, store and eviction counts.
+        """
+
+        return (f'Cache: {self.hits} hit(s), {self.misses} miss(es), '
+                f'{self.stores} store(s), {self.evictions} eviction(s)')
@@ -0,0 +1,615 @@
+from array import array
+from types import MappingProxyType
+
+from .errors import CompileError
+from .nodes import (
+    Assignment, BawatStatement, BinaryOp, Comment, ExpressionStatement, FunctionInvocation, GawaDeclaration,
+    Identifier, KapagStatement, KungStatement, HabangStatement, ListLiteral, Literal, Node, ObjectLiteral,
+    PropertyAccess, UnaryOp, VarDeclaration,
+)
+from .resolve import BUILTIN, GLOBAL, Resolver
+from .tokens import TSEK
+from .typecheck import TypeChecker
+
+# Opcodes, numbered from the most to the least frequently run (see VM.run()).
+# Every instruction is two ints in Code.ops, the opcode and its argument (0
+# when it takes none); OPCODE_NAMES maps them back to names for disassembly.
+# Stack effects are noted as (popped -> pushed). Variables are slots found by
+# parser.resolve: local slots of the running function (at the top level, the
+# global slots), or global slots of the program.
+OPCODE_NAMES = (
+    'LOAD_LOCAL',       # (-> local slot arg)
+    'LOAD_CONST',       # (-> constants[arg])
+    'BINARY_CONST',     # (left -> left operator constants[arg]), fused LOAD_CONST and the BINARY after it
+    'BINARY_LOCAL',     # (left -> left operator local slot arg), fused LOAD_LOCAL and the BINARY after it
+    'STORE_LOCAL',      # (value ->) assigns local slot arg, which also declares a variable
+    'UPDATE_CONST',     # x = x operator constant: fused LOAD_LOCAL x, BINARY_CONST, BINARY and STORE_LOCAL x
+    'UPDATE_LOCAL',     # x = x operator y: fused LOAD_LOCAL x, BINARY_LOCAL y, BINARY and STORE_LOCAL x
+    'BRANCH_CONST',     # (left ->) fused BINARY_CONST, BINARY and the JUMP_IF_TRUE or JUMP_IF_FALSE after them
+    'BRANCH_LOCAL',     # (left ->) fused BINARY_LOCAL, BINARY and the JUMP_IF_TRUE or JUMP_IF_FALSE after them
+    'BINARY',           # (left right -> left OPERATORS[arg] right)
+    'FOR_ITER',         # (iterator -> iterator) assigns its next item to local slot arg and runs the
+                        # JUMP after it, or (iterator ->) and skips the JUMP when it is exhausted
+    'LOAD_GLOBAL',      # (-> global slot arg), failing if it has not been declared yet
+    'JUMP',             # jumps to the instruction at ops[arg]
+    'POP',              # (value ->)
+    'CALL',             # (function arg arguments -> result)
+    'RETURN',           # returns Wala (None) from a function, or ends the program
+    'GET_PROPERTY',     # (object -> object's property names[arg])
+    'JUMP_IF_TRUE',     # (value ->) jumps to ops[arg] if the value is true
+    'JUMP_IF_FALSE',    # (value ->) jumps to ops[arg] if the value is false
+    'DUP',              # (value -> value value)
+    'NEGATE',           # (value -> -value)
+    'GET_ITER',         # (value -> iterator) over a copy of a Lista, the keys of a Bagay or a Teksto
+    'BUILD_LIST',       # (arg items -> Lista)
+    'BUILD_OBJECT',     # (values -> Bagay) with the keys in the tuple constants[arg]
+    'STORE_GLOBAL',     # (value ->) assigns global slot arg
+    'LOAD_BUILTIN',     # (-> the built-in function names[arg])
+)
+
+(
+    LOAD_LOCAL,
+    LOAD_CONST,
+    BINARY_CONST,
+    BINARY_LOCAL,
+    STORE_LOCAL,
+    UPDATE_CONST,
+    UPDATE_LOCAL,
+    BRANCH_CONST,
+    BRANCH_LOCAL,
+    BINARY,
+    FOR_ITER,
+    LOAD_GLOBAL,
+    JUMP,
+    POP,
+    CALL,
+    RETURN,
+    GET_PROPERTY,
+    JUMP_IF_TRUE,
+    JUMP_IF_FALSE,
+    DUP,
+    NEGATE,
+    GET_ITER,
+    BUILD_LIST,
+    BUILD_OBJECT,
+    STORE_GLOBAL,
+    LOAD_BUILTIN,
+) = range(len(OPCODE_NAMES))
+
+# Binary operators, by their index in the argument of BINARY. '==' has no
+# syntax; it compares the value of a Kapag statement with each case.
+OPERATORS = ('+', '-', '*', '/', '>', '<', '>=', '<=', '==')
+# Specialized forms of some of them, chosen by parser.typecheck when the types
+# of the operands are known: / of two Numero values, / with a Desimal, + that
+# joins a Teksto with a value of another type, == of values that are not a
+# Tsek compared with something else, and + - * of values that are not a Tsek,
+# which need no check that arithmetic is not given one. The last word of each
+# is the operator.
+OPERATORS += ('Numero /', 'Desimal /', 'Teksto +', 'plain ==', 'plain +', 'plain -', 'plain *')
+OPERATOR_INDEX = MappingProxyType({operator: index for index, operator in enumerate(OPERATORS)})
+
+# Superinstructions. A run of instructions that is common in loops is fused by
+# replacing the opcode of its first instruction only: the VM then runs the whole
+# run at once and skips the instructions after the first, which stay in place
+# and take their operands from. A jump to any of them still runs correctly, so
+# fusing never needs to know about jumps. Opcode -> number of instructions it runs.
+FUSED_LENGTHS = MappingProxyType({
+    BINARY_CONST: 2,
+    BINARY_LOCAL: 2,
+    UPDATE_CONST: 4,
+    UPDATE_LOCAL: 4,
+    BRANCH_CONST: 3,
+    BRANCH_LOCAL: 3,
+})
+
+# Loads that fuse with the BINARY after them, and the fused opcodes
+FUSED_BINARY = MappingProxyType({
+    LOAD_CONST: BINARY_CONST,
+    LOAD_LOCAL: BINARY_LOCAL,
+})
+
+# Fused binary opcodes that fuse further into an assignment of the variable loaded before them
+FUSED_UPDATE = MappingProxyType({
+    BINARY_CONST: UPDATE_CONST,
+    BINARY_LOCAL: UPDATE_LOCAL,
+})
+
+# Fused binary opcodes that fuse further with a conditional jump after them
+FUSED_BRANCH = MappingProxyType({
+    BINARY_CONST: BRANCH_CONST,
+    BINARY_LOCAL: BRANCH_LOCAL,
+})
+
+# Opcodes whose argument is a local slot, a global slot, or an index in Code.names, Code.constants or Code.ops
+LOCAL_OPCODES = frozenset((LOAD_LOCAL, STORE_LOCAL, BINARY_LOCAL, UPDATE_CONST, UPDATE_LOCAL, BRANCH_LOCAL, FOR_ITER))
+GLOBAL_OPCODES = frozenset((LOAD_GLOBAL, STORE_GLOBAL))
+NAME_OPCODES = frozenset((GET_PROPERTY, LOAD_BUILTIN))
+CONSTANT_OPCODES = frozenset((LOAD_CONST, BUILD_OBJECT, BINARY_CONST, BRANCH_CONST))
+JUMP_OPCODES = frozenset((JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE))
+
+# Value of a variable declared without one, by type
+DEFAULT_VALUES = MappingProxyType({
+    'Numero': 0,
+    'Desimal': 0.0,
+    'Teksto': '',
+    'Tsek': False,
+})
+
+# Kinds of work items of Compiler.compile()
+_EMIT, _EXPRESSION, _STATEMENT, _LABEL, _ENTER, _LEAVE = range(6)
+
+
+class Code:
+    """
+    A compiled program or function body.
+
+    Attributes:
+        name (str): The name of the function, or '<program>'.
+        ops (array): The instructions, as pairs of opcode and argument.
+        offsets (array): The source offset of each instruction, for messages.
+        constants (list): The constant pool: numbers, strings, booleans, key
+            tuples of objects, and the Function of every Gawa declaration.
+        names (list): The names of the properties and built-in functions used.
+        slots (tuple): The name of each local slot; those of the program are the
+            global variables.
+    """
+
+    __slots__ = ('name', 'ops', 'offsets', 'constants', 'names', 'slots', 'constant_index', 'name_index')
+
+    def __init__(self, name, slots=()):
+        self.name = name
+        self.slots = tuple(slots)
+        self.ops = array('l')
+        self.offsets = array('l')
+        self.constants = []
+        self.names = []
+
+        # Indexes of the constants and names added so far, to add each once
+        self.constant_index = {}
+        self.name_index = {}
+
+
+    def constant(self, value):
+        """ Returns the index of a constant, adding it to the pool if needed """
+        # Key on the type too, so that 1, 1.0 and Tama stay distinct
+        key = (value.__class__, value) if value.__class__ is not Function else (Function, id(value))
+        index = self.constant_index.get(key)
+        if index is None:
+            index = self.constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+
+    def name_at(self, name):
+        """ Returns the index of a name, adding it if needed """
+        index = self.name_index.get(name)
+        if index is None:
+            index = self.name_index[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+
+    def __repr__(self):
+        return f'<Code {self.name}: {len(self.ops) // 2} instructions>'
+
+
+class Function:
+    """
+    A function declared with Gawa: its name, parameter names and compiled body.
+    Its parameters are the first local slots of the body; `padding` holds a
+    None for each of the other slots, to be appended to the arguments of a call.
+    """
+
+    __slots__ = ('name', 'parameters', 'code', 'padding')
+
+    def __init__(self, name, parameters, code):
+        self.name = name
+        self.parameters = parameters
+        self.code = code
+        self.padding = [None] * (len(code.slots) - len(parameters))
+
+    def __repr__(self):
+        return f'<Gawa {self.name}>'
+
+
+class Label:
+    """ A jump target, possibly used before its position is known """
+
+    __slots__ = ('position', 'uses')
+
+    def __init__(self):
+        self.position = None
+
+        # Indexes in Code.ops of the arguments of jumps emitted before the position was known
+        self.uses = []
+
+
+class Compiler:
+    """
+    Compiles syntax trees from CodeGoParser to bytecode for parser.vm.VM.
+
+    Variables are first resolved to slots by parser.resolve, which also
+    reports undeclared and redeclared variables, and then typed by
+    parser.typecheck, which reports type errors and, if `specialize` is true,
+    chooses the specialized operators that BINARY runs.
+
+    The tree is compiled with an explicit stack of work items instead of
+    recursion, like it was parsed, so programs nested to any depth compile.
+    Each node is expanded into the items that compile it, in order: child
+    nodes, instructions and jump targets.
+
+    Usage:
+        code = Compiler(lines).compile(CodeGoParser(tokens, lines).parse())
+        VM(lines=lines).run(code)
+    """
+
+    def __init__(self, lines=None, specialize=True):
+        # Line index of the source, used to report line and column numbers in errors
+        self.lines = lines
+
+        # Whether to run operators specialized for the types of their operands
+        self.specialize = specialize
+
+        # The code being emitted into, and the codes of the functions it is nested in
+        self.code = None
+        self.codes = []
+
+        # The slots of the variables, found by parser.resolve.Resolver, and their
+        # types, found by parser.typecheck.TypeChecker
+        self.resolution = None
+        self.typing = None
+
+        self.statement_rules = {
+            VarDeclaration: self.var_declaration,
+            Assignment: self.assignment,
+            ExpressionStatement: self.expression_statement,
+            FunctionInvocation: self.invocation_statement,
+            Comment: self.comment,
+            KungStatement: self.kung_statement,
+            HabangStatement: self.habang_statement,
+            BawatStatement: self.bawat_statement,
+            KapagStatement: self.kapag_statement,
+            GawaDeclaration: self.gawa_declaration,
+        }
+        self.expression_rules = {
+            Identifier: self.identifier,
+            Literal: self.literal,
+            BinaryOp: self.binary_op,
+            UnaryOp: self.unary_op,
+            PropertyAccess: self.property_access,
+            FunctionInvocation: self.function_invocation,
+            ListLiteral: self.list_literal,
+            ObjectLiteral: self.object_literal,
+        }
+
+
+    def compile(self, statements):
+        """
+        Compiles a program.
+
+        Args:
+            statements (list): The statements of the program, as returned by CodeGoParser.parse().
+
+        Returns:
+            Code: The compiled program.
+
+        Raises:
+            CompileError: If the program cannot be compiled.
+        """
+
+        self.resolution = Resolver(self.lines).resolve(statements)
+        self.typing = TypeChecker(self.resolution, self.lines).check(statements)
+        program = Code('<program>', self.resolution.program.names)
+        end = statements[-1].offset if statements else 0
+        items = [(_ENTER, program)] + self.block(statements) + [(_EMIT, RETURN, 0, end), (_LEAVE,)]
+        work = items[::-1]
+        while work:
+            item = work.pop()
+            kind = item[0]
+            if kind == _EMIT:
+                self.emit(item[1], item[2], item[3])
+            elif kind == _EXPRESSION:
+                node = item[1]
+                rule = self.expression_rules.get(type(node))
+                if rule is None:
+                    raise self.error(node, 'cannot be used as a value')
+                work.extend(reversed(rule(node)))
+            elif kind == _STATEMENT:
+                node = item[1]
+                rule = self.statement_rules.get(type(node))
+                if rule is None:
+                    raise self.error(node, 'cannot be used as a statement')
+                work.extend(reversed(rule(node)))
+            elif kind == _LABEL:
+                self.mark(item[1])
+            elif kind == _ENTER:
+                self.codes.append(self.code)
+                self.code = item[1]
+            else:
+                self.code = self.codes.pop()
+        return program
+
+
+    def error(self, node, message):
+        """ Returns a CompileError about a node """
+        if not isinstance(node, Node):
+            return CompileError(f'A block of statements {message}')
+        where = f'on {self.lines.describe(node.offset)}' if self.lines is not None else f'at offset {node.offset}'
+        return CompileError(f'{type(node).__name__} {message} {where}')
+
+
+    def emit(self, opcode, argument, offset):
+        """
+        Appends an instruction to the current code; a Label argument is resolved
+        to its position. Runs of instructions ending with this one are fused into
+        superinstructions (see FUSED_LENGTHS).
+        """
+        code = self.code
+        ops = code.ops
+        if type(argument) is Label:
+            label = argument
+            argument = label.position
+            if argument is None:
+                label.uses.append(len(ops) + 1)
+                argument = 0
+
+        if opcode == BINARY:
+            # i * 2: LOAD_LOCAL i, LOAD_CONST 2, BINARY * -> LOAD_LOCAL i, BINARY_CONST 2, (BINARY *)
+            if ops and ops[-2] in FUSED_BINARY:
+                ops[-2] = FUSED_BINARY[ops[-2]]
+        elif opcode == STORE_LOCAL:
+            # i = i + 1: LOAD_LOCAL i, BINARY_CONST 1, BINARY +, STORE_LOCAL i -> UPDATE_CONST i, (...)
+            if (len(ops) >= 6 and ops[-2] == BINARY and ops[-4] in FUSED_UPDATE
+                    and ops[-6] == LOAD_LOCAL and ops[-5] == argument):
+                ops[-6] = FUSED_UPDATE[ops[-4]]
+        elif opcode == JUMP_IF_TRUE or opcode == JUMP_IF_FALSE:
+            # i < 10: BINARY_CONST 10, BINARY <, JUMP_IF_TRUE -> BRANCH_CONST 10, (...)
+            if len(ops) >= 4 and ops[-2] == BINARY and ops[-4] in FUSED_BRANCH:
+                ops[-4] = FUSED_BRANCH[ops[-4]]
+
+        ops.append(opcode)
+        ops.append(argument)
+        code.offsets.append(offset)
+
+
+    def mark(self, label):
+        """ Sets the position of a label to the next instruction, and patches the jumps to it """
+        ops = self.code.ops
+        label.position = len(ops)
+        for use in label.uses:
+            ops[use] = label.position
+
+
+    def operator(self, node, default):
+        """ Returns the operator a BinaryOp or KasoClause runs, specialized if it can be """
+        return self.typing.operator(node, default) if self.specialize else default
+
+
+    def load(self, binding, offset):
+        """ Returns the work item that loads a variable, given its (kind, slot) from parser.resolve """
+        kind, slot = binding
+        if kind == GLOBAL:
+            return (_EMIT, LOAD_GLOBAL, slot, offset)
+        if kind == BUILTIN:
+            return (_EMIT, LOAD_BUILTIN, self.code.name_at(slot), offset)
+        return (_EMIT, LOAD_LOCAL, slot, offset)
+
+
+    def store(self, binding, offset):
+        """ Returns the work item that assigns a variable, given its (kind, slot) from parser.resolve """
+        kind, slot = binding
+        return (_EMIT, STORE_GLOBAL if kind == GLOBAL else STORE_LOCAL, slot, offset)
+
+
+    # Statements. Each rule returns the work items that compile its node.
+
+    def block(self, statements):
+        """ Returns the work items of a list of statements """
+        return [(_STATEMENT, statement) for statement in statements]
+
+
+    def var_declaration(self, node):
+        code = self.code
+        if node.expression is not None:
+            value = [(_EXPRESSION, node.expression)]
+        elif node.basic_type == 'Lista':
+            value = [(_EMIT, BUILD_LIST, 0, node.offset)]
+        elif node.basic_type == 'Bagay':
+            value = [(_EMIT, BUILD_OBJECT, code.constant(()), node.offset)]
+        else:
+            value = [(_EMIT, LOAD_CONST, code.constant(DEFAULT_VALUES[node.basic_type]), node.offset)]
+        return value + [self.store(self.resolution.binding(node), node.offset)]
+
+
+    def assignment(self, node):
+        return [(_EXPRESSION, node.expression), self.store(self.resolution.binding(node), node.offset)]
+
+
+    def expression_statement(self, node):
+        return [(_EXPRESSION, node.expression), (_EMIT, POP, 0, node.offset)]
+
+
+    def invocation_statement(self, node):
+        return [(_EXPRESSION, node), (_EMIT, POP, 0, node.offset)]
+
+
+    def comment(self, node):
+        return []
+
+
+    def kung_statement(self, node):
+        end = Label()
+        return ([(_EXPRESSION, node.condition), (_EMIT, JUMP_IF_FALSE, end, node.offset)]
+                + self.block(node.statements)
+                + [(_LABEL, end)])
+
+
+    def habang_statement(self, node):
+        # The condition is tested after the body, so each iteration takes one jump instead of two
+        body, test = Label(), Label()
+        return ([(_EMIT, JUMP, test, node.offset), (_LABEL, body)]
+                + self.block(node.statements)
+                + [(_LABEL, test), (_EXPRESSION, node.condition), (_EMIT, JUMP_IF_TRUE, body, node.offset)])
+
+
+    def bawat_statement(self, node):
+        # Like Habang, the next item is taken after the body, so each iteration takes one jump
+        iterable, iterator = self.resolution.binding(node)
+        body, test = Label(), Label()
+        return ([self.load(iterable, node.offset),
+                 (_EMIT, GET_ITER, 0, node.offset),
+                 (_EMIT, JUMP, test, node.offset),
+                 (_LABEL, body)]
+                + self.block(node.body)
+                + [(_LABEL, test),
+                   (_EMIT, FOR_ITER, iterator[1], node.offset),
+                   (_EMIT, JUMP, body, node.offset)])
+
+
+    def kapag_statement(self, node):
+        # The condition stays on the stack while it is compared with each case
+        end = Label()
+        items = [(_EXPRESSION, node.condition)]
+        for case in node.cases:
+            following = Label()
+            items += [(_EMIT, DUP, 0, case.offset),
+                      (_EXPRESSION, case.case_expr),
+                      (_EMIT, BINARY, OPERATOR_INDEX[self.operator(case, '==')], case.offset),
+                      (_EMIT, JUMP_IF_FALSE, following, case.offset),
+                      (_EMIT, POP, 0, case.offset)]
+            items += self.block(case.case_statements)
+            items += [(_EMIT, JUMP, end, case.offset), (_LABEL, following)]
+        return items + [(_EMIT, POP, 0, node.offset), (_LABEL, end)]
+
+
+    def gawa_declaration(self, node):
+        body = Code(node.name, self.resolution.scope(node).names)
+        function = Function(node.name, tuple(parameter.name for parameter in node.parameters), body)
+        end = node.body[-1].offset if node.body else node.offset
+        return ([(_ENTER, body)]
+                + self.block(node.body)
+                + [(_EMIT, RETURN, 0, end),
+                   (_LEAVE,),
+                   (_EMIT, LOAD_CONST, self.code.constant(function), node.offset),
+                   self.store(self.resolution.binding(node), node.offset)])
+
+
+    # Expressions. Each rule returns the work items that leave the value of its node on the stack.
+
+    def identifier(self, node):
+        return [self.load(self.resolution.binding(node), node.offset)]
+
+
+    def literal(self, node):
+        value = node.value == 'Tama' if node.kind == TSEK else node.value
+        return [(_EMIT, LOAD_CONST, self.code.constant(value), node.offset)]
+
+
+    def binary_op(self, node):
+        return [(_EXPRESSION, node.left), (_EXPRESSION, node.right),
+                (_EMIT, BINARY, OPERATOR_INDEX[self.operator(node, node.operator)], node.offset)]
+
+
+    def unary_op(self, node):
+        return [(_EXPRESSION, node.operand), (_EMIT, NEGATE, 0, node.offset)]
+
+
+    def property_access(self, node):
+        return [(_EXPRESSION, node.object), (_EMIT, GET_PROPERTY, self.code.name_at(node.property), node.offset)]
+
+
+    def function_invocation(self, node):
+        callee = node.function_name
+        if type(callee) is str:
+            items = [self.load(self.resolution.binding(node), node.offset)]
+        else:
+            items = [(_EXPRESSION, callee)]
+        items += [(_EXPRESSION, argument) for argument in node.arguments]
+        return items + [(_EMIT, CALL, len(node.arguments), node.offset)]
+
+
+    def list_literal(self, node):
+        return [(_EXPRESSION, item) for item in node.items] + [(_EMIT, BUILD_LIST, len(node.items), node.offset)]
+
+
+    def object_literal(self, node):
+        keys = tuple(node.properties)
+        return ([(_EXPRESSION, value) for value in node.properties.values()]
+                + [(_EMIT, BUILD_OBJECT, self.code.constant(keys), node.offset)])
+
+
+def compile_program(statements, lines=None, specialize=True):
+    """
+    Compiles the statements of a program to bytecode.
+
+    Args:
+        statements (list): The statements, as returned by CodeGoParser.parse().
+        lines (LineIndex): The line index of the source, for error messages. Optional.
+        specialize (bool): Whether to run operators specialized for the types of their
+            operands, where parser.typecheck knows them. True by default.
+
+    Returns:
+        Code: The compiled program, to run with parser.vm.VM.
+
+    Raises:
+        CompileError: If the program cannot be compiled.
+    """
+    return Compiler(lines, specialize).compile(statements)
+
+
+def disassemble(code, lines=None):
+    """
+    Lists the instructions of a program and of the functions declared in it.
+
+    Args:
+        code (Code): The compiled program.
+        lines (LineIndex): The line index of the source, to show line numbers. Optional.
+
+    Returns:
+        str: One instruction per line, with its position, source line, opcode
+            and argument, and the name, constant or target it refers to.
+    """
+
+    output = []
+    global_names = code.slots
+    codes = [code]
+    while codes:
+        code = codes.pop(0)
+        output.append(f'{code.name}:')
+        ops = code.ops
+        slots = code.slots
+        for position in range(0, len(ops), 2):
+            opcode, argument = ops[position], ops[position + 1]
+            offset = code.offsets[position // 2]
+            line = lines.line(offset) if lines is not None else offset
+            if opcode == BINARY:
+                detail = f'({OPERATORS[argument]})'
+            elif opcode == BINARY_CONST:
+                detail = f'({OPERATORS[ops[position + 3]]} {code.constants[argument]!r})'
+            elif opcode == BINARY_LOCAL:
+                detail = f'({OPERATORS[ops[position + 3]]} {slots[argument]})'
+            elif opcode == BRANCH_CONST or opcode == BRANCH_LOCAL:
+                operand = repr(code.constants[argument]) if opcode == BRANCH_CONST else slots[argument]
+                condition = 'true' if ops[position + 4] == JUMP_IF_TRUE else 'false'
+                detail = f'({OPERATORS[ops[position + 3]]} {operand}, to {ops[position + 5]} if {condition})'
+            elif opcode == UPDATE_CONST or opcode == UPDATE_LOCAL:
+                operand = ops[position + 3]
+                operand = repr(code.constants[operand]) if opcode == UPDATE_CONST else slots[operand]
+                detail = f'({slots[argument]} = {slots[argument]} {OPERATORS[ops[position + 5]]} {operand})'
+            elif opcode == FOR_ITER:
+                detail = f'({slots[argument]}, to {ops[position + 3]})'
+            elif opcode in LOCAL_OPCODES:
+                detail = f'({slots[argument]})'
+            elif opcode in GLOBAL_OPCODES:
+                detail = f'({global_names[argument]})'
+            elif opcode in NAME_OPCODES:
+                detail = f'({code.names[argument]})'
+            elif opcode in CONSTANT_OPCODES:
+                detail = f'({code.constants[argument]!r})'
+            elif opcode in JUMP_OPCODES:
+                detail = f'(to {argument})'
+            else:
+                detail = ''
+            output.append(f'  {position:>6} {line:>6}  {OPCODE_NAMES[opcode]:<14} {argument:<6} {detail}'.rstrip())
+        codes.extend(constant.code for constant in code.constants if type(constant) is Function)
+    return '\n'.join(output)
@@ -0,0 +1,168 @@
+import json
+
+from .nodes import Node
+from .tokens import token_repr
+
+# Output is collected and written in chunks of at least this many characters
+CHUNK_SIZE = 1 << 16
+
+# Markers for the explicit stacks used by the writers below
+_TEXT = 0
+_VALUE = 1
+
+
+class BufferedWriter:
+    """
+    Collects output in memory and writes it to a stream in large chunks.
+
+    Printing one line at a time makes output dominate the run time on large
+    files; batching the writes keeps it proportional to the amount of text.
+    """
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.stream.write(''.join(self.parts))
+            self.parts = []
+            self.size = 0
+        self.stream.flush()
+
+
+def _items(value):
+    """ Returns the (key, value) pairs of a dictionary-like value, or None for leaves and lists """
+    if isinstance(value, Node):
+        return None if value.is_leaf else value.dict_items()
+    if isinstance(value, dict):
+        return list(value.items())
+    return None
+
+
+def _scalar(value, lines):
+    """ Returns the dictionary form of a leaf value """
+    return value.to_dict(lines) if isinstance(value, Node) else value
+
+
+def write_tokens(tokens, out, lines=None):
+    """
+    Writes one token per line as ('KIND', value, line).
+
+    Args:
+        tokens (iterable): The tokens to write.
+        out (BufferedWriter): The output.
+        lines (LineIndex): The line index of the source; without it, token
+            offsets are written instead of line numbers.
+    """
+
+    write = out.write
+    for token in tokens:
+        write(token_repr(token, lines))
+        write('\n')
+
+
+def write_pretty(ast, out, lines=None):
+    """
+    Writes the syntax tree as indented 'key:' / value lines.
+
+    The tree is walked with an explicit stack, so arbitrarily deep trees are
+    written without hitting the recursion limit.
+
+    Args:
+        ast: A node, a list of nodes, or their dictionary form.
+        out (BufferedWriter): The output.
+        lines (LineIndex): The line index of the source, to show line numbers
+            instead of offsets. Optional.
+    """
+
+    write = out.write
+    stack = [(_VALUE, ast, 0)]
+    while stack:
+        marker, value, level = stack.pop()
+        if marker == _TEXT:
+            write(value)
+            continue
+
+        if isinstance(value, list):
+            stack.extend((_VALUE, item, level) for item in reversed(value))
+            continue
+
+        items = _items(value)
+        indent = '  ' * level
+        if items is None:
+            write(f'{indent}{_scalar(value, lines)}\n')
+            continue
+
+        for key, item in reversed(items):
+            stack.append((_VALUE, item, level + 1))
+            stack.append((_TEXT, f'{indent}{key}:\n', level))
+
+
+def write_json(ast, out, lines=None):
+    """
+    Writes the syntax tree as a single JSON document.
+
+    Nodes are written in their dictionary form; identifier and literal leaves
+    become [kind, value, line] arrays (or [kind, value, offset] without a line index).
+
+    Args:
+        ast: A node, a list of nodes, or their dictionary form.
+        out (BufferedWriter): The output.
+        lines (LineIndex): The line index of the source, to show line numbers
+            instead of offsets. Optional.
+    """
+
+    write = out.write
+    dumps = json.dumps
+    stack = [(_VALUE, ast)]
+    while stack:
+        marker, value = stack.pop()
+        if marker == _TEXT:
+            write(value)
+            continue
+
+        if isinstance(value, list):
+            parts = [(_TEXT, '[')]
+            for i, item in enumerate(value):
+                if i:
+                    parts.append((_TEXT, ', '))
+                parts.append((_VALUE, item))
+            parts.append((_TEXT, ']'))
+            stack.extend(reversed(parts))
+            continue
+
+        items = _items(value)
+        if items is None:
+            write(dumps(_scalar(value, lines)))
+            continue
+
+        parts = [(_TEXT, '{')]
+        for i, (key, item) in enumerate(items):
+            parts.append((_TEXT, (', ' if i else '') + dumps(str(key)) + ': '))
+            parts.append((_VALUE, item))
+        parts.append((_TEXT, '}'))
+        stack.extend(reversed(parts))
+
+
+def write_ndjson(ast, out, lines=None):
+    """
+    Writes one JSON document per top-level statement, one per line.
+
+    Args:
+        ast (list): The parsed statements.
+        out (BufferedWriter): The output.
+        lines (LineIndex): The line index of the source. Optional.
+    """
+
+    for statement in ast:
+        write_json(statement, out, lines)
+        out.write('\n')
@@ -0,0 +1,51 @@
+from .tokens import TEKSTO
+
+# Diagnostic codes
+UNEXPECTED_CHARACTER = 'unexpected-character'
+UNEXPECTED_TOKEN = 'unexpected-token'
+EXPECTED_TOKEN = 'expected-token'
+EMPTY_FILE = 'empty-file'
+
+
+class ParseError(RuntimeError):
+    """
+    A syntax error found by the lexer or the parser.
+
+    The message is the one shown to users and includes the line and column of
+    the error. Tools that collect several errors (see CodeGoParser's
+    `diagnostics`) can sort or group them by code and span instead.
+
+    Attributes:
+        code (str): What kind of error it is, e.g. EXPECTED_TOKEN.
+        message (str): The description of the error.
+        span (tuple): The (start, end) offsets of the offending text.
+    """
+
+    def __init__(self, code, message, span):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.span = span
+
+
+    def __reduce__(self):
+        return (self.__class__, (self.code, self.message, self.span))
+
+
+class CompileError(RuntimeError):
+    """ A program that parses but cannot be compiled, e.g. one using an undeclared variable """
+
+
+def token_span(token):
+    """
+    Returns the (start, end) offsets of a token.
+
+    Tokens keep only their start offset and value, so the end is found from the
+    length of the value; it is only approximate for numbers not written in their
+    shortest form (e.g. 1.50).
+    """
+    kind, value, offset = token
+    if value is None:
+        return (offset, offset)
+    length = len(value) + 2 if kind == TEKSTO else len(str(value))
+    return (offset, offset + length)
@@ -1,38 +1,34 @@
+from .nodes import Assignment, ExpressionStatement, Identifier
+from .tokens import EQUALS, IDENTIFIER
+
 def expression_statement(parser):
     """
     Parses an expression statement, which can be either an assignment 
     (e.g., x = 5) or a simple expression (e.g., just x).
 
+    Like var_declaration, this is a generator, as the expression may contain
+    blocks of statements (see CodeGoParser.resumable_expression()).
+
     Returns:
-        dict: A structured representation of the statement, including:
-              - 'type': The type of the statement ('assignment' or 'expression').
+        Assignment or ExpressionStatement: A structured representation of the statement, including:
               - 'identifier': The name of the variable (if it's an assignment).
               - 'expression': The evaluated expression (if it's an assignment or a simple expression).
     """
 
     # Handle assignments or simple expressions
-    if parser.current_token()[0] == 'IDENTIFIER':
-        identifier = parser.eat('IDENTIFIER')
+    if parser.current_token()[0] == IDENTIFIER:
+        identifier = parser.eat(IDENTIFIER)
     
         # Check if the next token is an assignment
-        if parser.current_token()[0] == 'EQUALS':
-            parser.eat('EQUALS')
-            expr = parser.expression()
-            return {
-                'type': 'assignment',
-                'identifier': identifier[1],
-                'expression': expr
-            }
+        if parser.current_token()[0] == EQUALS:
+            parser.eat(EQUALS)
+            expr = yield from parser.resumable_expression()
+            return Assignment(identifier[1], expr, identifier[2])
         else:
             # If no assignment, treat it as a simple expression
-            return {
-                'type': 'expression',
-                'expression': identifier[1]
-            }
+            return ExpressionStatement(Identifier(identifier[1], identifier[2]), identifier[2])
     else:
         # If the current token is not an identifier, handle other expressions directly
-        expr = parser.expression()
-        return {
-            'type': 'expression',
-            'expression': expr
-        }
+        offset = parser.current_token()[2]
+        expr = yield from parser.resumable_expression()
+        return ExpressionStatement(expr, offset)
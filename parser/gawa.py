@@ -1,3 +1,6 @@
+from .nodes import FunctionInvocation, GawaDeclaration
+from .tokens import GAWA, IDENTIFIER, LBRACE, LPAREN, RBRACE, RPAREN
+
 def gawa_declaration(parser):
     """
     Parses a function declaration in the syntax using the keyword 'GAWA'.
@@ -10,14 +13,16 @@ def gawa_declaration(parser):
             // statements in the function body
         }
 
+    The function body is parsed by CodeGoParser.statements(), which sends it back
+    to this generator (see kung_statement).
+
     Parameters:
         parser (CodeGoParser): The parser instance calling this function.
 
     Returns:
-        dict: A dictionary representing the parsed function with the following keys:
-            - 'type': A string ('gawa_declaration') indicating the node type.
+        GawaDeclaration: A node representing the parsed function with the following fields:
             - 'name': The name of the function as a string.
-            - 'parameters': A list of parsed parameter tokens.
+            - 'parameters': A list of Parameter nodes.
             - 'body': A list of parsed statements in the function body.
 
     Raises:
@@ -25,24 +30,19 @@ def gawa_declaration(parser):
                       'RPAREN', 'LBRACE', or 'RBRACE').
     """
 
-    parser.eat('GAWA')
+    offset = parser.eat(GAWA)[2]
     # Expect an identifier (function name)
-    function_name = parser.eat('IDENTIFIER')
+    function_name = parser.eat(IDENTIFIER)
     # Expect parameters
-    parser.eat('LPAREN')
+    parser.eat(LPAREN)
     parameters = parser.parameters()
-    parser.eat('RPAREN')
+    parser.eat(RPAREN)
     # Expect function body in braces
-    parser.eat('LBRACE')
-    body = parser.statements()
-    parser.eat('RBRACE')
+    parser.eat(LBRACE)
+    body = yield
+    parser.eat(RBRACE)
     
-    return {
-        'type': 'gawa_declaration',
-        'name': function_name[1],
-        'parameters': parameters,
-        'body': body
-    }
+    return GawaDeclaration(function_name[1], parameters, body, offset)
 
 
 def gawa_invocation(parser):
@@ -52,28 +52,25 @@ def gawa_invocation(parser):
     A gawa invocation consists of an identifier (the function name), 
     followed by a list of arguments enclosed in parentheses. This function 
     handles the parsing of these elements and returns a structured representation.
+    Its arguments are parsed by CodeGoParser.arguments(), so it is a generator
+    (see var_declaration).
 
     Returns:
-        dict: A parsed representation of the function invocation, including:
-              - 'type': The type of invocation ('function_invocation').
+        FunctionInvocation: A parsed representation of the function invocation, including:
               - 'function_name': The name of the function being invoked.
               - 'arguments': A list of arguments passed to the function.
     """
 
     # Expect and consume the identifier token for the function name
-    identifier = parser.eat('IDENTIFIER')  
+    identifier = parser.eat(IDENTIFIER)  
 
     # Expect and consume the left parenthesis token
-    parser.eat('LPAREN')  
+    parser.eat(LPAREN)  
 
     # Parse the function's arguments
-    arguments = parser.arguments()  
+    arguments = yield from parser.arguments()
 
     # Expect and consume the right parenthesis token
-    parser.eat('RPAREN')  
+    parser.eat(RPAREN)  
 
-    return {
-        'type': 'function_invocation',
-        'function_name': identifier[1],
-        'arguments': arguments
-    }
+    return FunctionInvocation(identifier[1], arguments, identifier[2])
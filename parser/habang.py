@@ -1,35 +1,36 @@
+from .nodes import HabangStatement
+from .tokens import HABANG, LBRACE, LPAREN, RBRACE, RPAREN
+
 def habang_statement(parser):
     """
     Parses a 'HABANG' statement, which represents a while-loop that executes as long as
     a specified condition evaluates to true.
+
+    The loop body is parsed by CodeGoParser.statements(), which sends it back to
+    this generator (see kung_statement).
     
     Returns:
-        dict: A dictionary representing the parsed 'habang' statement, containing:
-            - 'type': 'habang_statement'
+        HabangStatement: A node representing the parsed 'habang' statement, containing:
             - 'condition': The expression to be evaluated as the loop's condition
             - 'statements': A list of statements within the loop body that execute each iteration
     """
 
     # Consume the 'HABANG' keyword to indicate the start of a while-loop
-    parser.eat('HABANG')
+    offset = parser.eat(HABANG)[2]
     
     # Parse the condition within parentheses
-    parser.eat('LPAREN')
+    parser.eat(LPAREN)
     
     # Parse the expression serving as the loop's condition
-    condition = parser.expression()
-    parser.eat('RPAREN')
+    condition = yield from parser.resumable_expression()
+    parser.eat(RPAREN)
     
     # Parse the loop body enclosed in braces
-    parser.eat('LBRACE')
+    parser.eat(LBRACE)
 
     # Gather all statements within the loop body
-    statements = parser.statements()
-    parser.eat('RBRACE')
+    statements = yield
+    parser.eat(RBRACE)
     
-    # Return the parsed 'habang' statement as a structured dictionary
-    return {
-        'type': 'habang_statement',
-        'condition': condition,
-        'statements': statements
-    }
+    # Return the parsed 'habang' statement as a HabangStatement node
+    return HabangStatement(condition, statements, offset)
@@ -0,0 +1,527 @@
+import re
+from bisect import bisect_left, bisect_right
+
+from . import CodeGoParser
+from .errors import EMPTY_FILE, ParseError
+from .lexer import CodeGoLexer
+from .nodes import Node
+from .tokens import BASIC_TYPE, BAWAT, EOF, GAWA, HABANG, IDENTIFIER, KAPAG, KUNG, InternTable, LineIndex
+
+# Kinds of the tokens a top-level statement starts with (see CodeGoParser.statement()).
+# No statement can be continued by one of them, so a statement followed by one
+# ends there, whatever comes after.
+STATEMENT_STARTS = frozenset((BASIC_TYPE, IDENTIFIER, KUNG, KAPAG, HABANG, BAWAT, GAWA))
+
+# Characters the lexer skips as whitespace
+WHITESPACE = ' \t\r\n\f\v'
+
+# A line that starts with a name or keyword right at its beginning, where a
+# top-level statement is likely to start; used to carry on parsing a text after
+# a syntax error (see Document.reparse())
+LINE_START = re.compile(r'\n(?=[A-Za-z_])')
+
+# The error of the current text has not been looked for since the last edit
+_UNKNOWN = object()
+
+
+class Document:
+    """
+    A source file that is kept parsed while it is edited.
+
+    The text is divided into regions, one per top-level statement, each running
+    from the first token of its statement to the first token of the next one (the
+    first region also holds any text before its statement). Every region keeps
+    its own text. An edit re-lexes and re-parses only the regions it touches, and
+    every other statement is reused as it is, so the time an edit takes grows
+    with the size of the top-level statements it touches rather than with the
+    size of the file.
+
+    The regions around an edit are widened when the edit may change how their
+    neighbours parse: when a region does not start on a line of its own (a new
+    comment could run into it) or does not start with a statement. When the
+    edited regions do not parse by themselves, they are kept as one failed
+    region and the rest of the document is left as it is, so that edits stay
+    as cheap while the text has a syntax error, which is the normal state
+    while someone is typing.
+
+    Whether the whole text parses is only worked out when it is asked for (see
+    syntax_error()): from the first failed region on, the text is parsed again,
+    as far as needed (to the end of the file for a block left open). The
+    statements are therefore always exactly those of a full parse of the text,
+    or the same error is raised.
+
+    Offsets move lazily. The starts of the regions after an edit, and the
+    offsets in their nodes, are moved by the length of the edit only when they
+    are next needed; until then the amount is kept once for all regions from
+    the end of the last edit on, so that edits close to each other cost nothing
+    for the rest of the file.
+
+    Usage:
+        document = Document(source)
+        document.edit(document.line_index().offset(3, 5), ..., 'Numero x = 1')
+        ast = document.statements()
+    """
+
+    def __init__(self, text=''):
+        # Names and literals of all versions of the text
+        self.symbols = InternTable()
+
+        # Per region: start offset, text, number of new lines in the text,
+        # statement (None for a failed region), whether it failed to parse, and
+        # the amount its node offsets are still to be moved by
+        self.starts = [0]
+        self.texts = [text]
+        self.newlines = [text.count('\n')]
+        self.nodes = [None]
+        self.failed = [True]
+        self.shifts = [0]
+
+        # The starts and node offsets of the regions from `gap` on are still to
+        # be moved by `delta` (see move_gap())
+        self.gap = 1
+        self.delta = 0
+
+        # Length of the text, and the text and its line index, joined from the
+        # regions when first needed
+        self.length = len(text)
+        self.joined = text
+        self.lines = None
+
+        # The error of the current text, None if it parses, or _UNKNOWN
+        self.error = _UNKNOWN
+
+        # Part of the text re-parsed by the last edit, as (start, end)
+        self.reparsed = (0, 0)
+
+        try:
+            self.reparse()
+        except RuntimeError:
+            pass  # Raised again by statements()
+
+
+    def text(self):
+        """ Returns the current text """
+        if self.joined is None:
+            self.joined = ''.join(self.texts)
+        return self.joined
+
+
+    def line_index(self):
+        """ Returns the LineIndex of the current text """
+        if self.lines is None:
+            self.lines = LineIndex(self.text())
+        return self.lines
+
+
+    def reparse(self):
+        """
+        Parses the whole text again.
+
+        When the text does not parse, parsing carries on after the statement
+        with the error, at the next line that starts with a name or keyword, so
+        that the regions after it are parsed too and later edits stay local.
+
+        Returns:
+            list: The statements.
+
+        Raises:
+            RuntimeError: If the syntax is invalid or the text has no statements.
+        """
+
+        text = self.text()
+        starts, nodes = [], []
+        error = None
+        offset = 0
+        while True:
+            lines = LineIndex(text[offset:], offset, text.count('\n', 0, offset) + 1)
+            parser = CodeGoParser(CodeGoLexer.iter_tokens(text[offset:], lines, self.symbols, offset), lines)
+            start = offset
+            try:
+                for statement in parser.iter_statements():
+                    starts.append(start)
+                    nodes.append(statement)
+                    start = parser.current_token()[2]
+                break
+            except RuntimeError as e:
+                error = error or e
+
+                # The failed statement becomes a failed region, up to the next likely statement
+                starts.append(start)
+                nodes.append(None)
+                match = LINE_START.search(text, start + 1)
+                if match is None:
+                    break
+                offset = match.end()
+
+        if not starts:
+            # Only blank lines and comments, kept as a failed region
+            starts, nodes = [0], [None]
+            error = ParseError(EMPTY_FILE, 'File is empty. There is nothing to parse.', (0, 0))
+
+        starts[0] = 0  # The first region holds the text before its statement
+        ends = starts[1:] + [len(text)]
+        self.starts = starts
+        self.texts = [text[start:end] for start, end in zip(starts, ends)]
+        self.newlines = [part.count('\n') for part in self.texts]
+        self.nodes = nodes
+        self.failed = [node is None for node in nodes]
+        self.shifts = [0] * len(nodes)
+        self.gap = len(nodes)
+        self.delta = 0
+        self.error = error
+        self.reparsed = (0, len(text))
+
+        if error is not None:
+            raise error
+        return list(nodes)
+
+
+    def edit(self, start, end, text):
+        """
+        Replaces part of the text and parses the changed statements.
+
+        Args:
+            start (int): Offset of the first character to replace.
+            end (int): Offset after the last character to replace; equal to
+                `start` to insert text.
+            text (str): The new text.
+
+        Returns:
+            list: The statements that were parsed again, in place of those the
+                edit touched, or an empty list if the changed regions do not
+                parse by themselves. Other statements are left as they are;
+                whether the whole text parses is told by syntax_error().
+
+        Raises:
+            IndexError: If the offsets are not in the text.
+        """
+
+        if not 0 <= start <= end <= self.length:
+            raise IndexError(f'Edit {start}:{end} is not in the text')
+
+        # Regions that contain the edit or merely border on it
+        first = max(self.find(start, bisect_left) - 1, 0)
+        last = self.find(end, bisect_right)
+
+        # The regions become one, with the edit applied to its text
+        region_start = self.start(first)
+        old = ''.join(self.texts[first:last])
+        new = old[:start - region_start] + text + old[end - region_start:]
+
+        # Later regions move with the end of the edit
+        delta = len(text) - (end - start)
+        self.move_gap(last)
+        self.delta += delta
+        self.replace(first, last, [region_start], [new], [None])
+
+        self.length += delta
+        self.joined = None
+        self.lines = None
+        self.error = _UNKNOWN
+        try:
+            return self.parse_regions(first, first + 1)
+        except RuntimeError:
+            return []
+
+
+    def update(self, text):
+        """
+        Replaces the whole text, parsing only the part that differs.
+
+        For tools that are given a new version of a file rather than an edit;
+        the edit is found by comparing the two versions (see text_edit()).
+
+        Args:
+            text (str): The new text.
+
+        Returns:
+            list: The statements that were parsed again (see edit()).
+        """
+
+        return self.edit(*text_edit(self.text(), text))
+
+
+    def parse_regions(self, first, last, widen=False):
+        """
+        Parses the text of regions first to last (exclusive) again and replaces them.
+
+        The range is widened until both of its ends are places where a full parse
+        would be between two top-level statements too, as long as the range
+        parses. If it does not, the range becomes a single failed region.
+
+        With `widen`, the range is also widened when the text after it is needed
+        to tell whether it parses, e.g. to close a block it leaves open. The
+        range is then doubled each time, so that it takes time linear in the
+        size of the text it finally covers. A failure is then that of a full
+        parse, if the regions before the range parse, and the regions are left
+        as they are.
+
+        Args:
+            first (int), last (int): The regions to parse.
+            widen (bool): Whether to widen the range as far as needed.
+
+        Returns:
+            list: The new statements.
+
+        Raises:
+            RuntimeError: If the range does not parse.
+        """
+
+        texts = self.texts
+        while True:
+            last = min(last, len(texts))
+            final = last == len(texts)
+
+            # Text before the range must end in whitespace, so that no token runs
+            # into the range
+            if first and texts[first - 1][-1:] not in WHITESPACE:
+                first -= 1
+                continue
+
+            # The region after the range must start its own line, so that no
+            # comment in the range runs into it
+            text = ''.join(texts[first:last])
+            if not final:
+                line_start = text.rfind('\n') + 1
+                tail = text[line_start:] if line_start else self.line_prefix(first) + text
+                if tail.strip(WHITESPACE):
+                    last += 1
+                    continue
+
+            begin = start = self.start(first)
+            stop = begin + len(text)
+            prefix = self.line_prefix(first)
+            lines = LineIndex(prefix + text, begin - len(prefix), sum(self.newlines[:first]) + 1)
+            parser = CodeGoParser(CodeGoLexer.iter_tokens(text, lines, self.symbols, begin), lines)
+            try:
+                # Anything but the start of a statement may continue the statement before
+                kind = parser.current_token()[0]
+                if first and kind not in STATEMENT_STARTS and kind != EOF:
+                    first -= 1
+                    continue
+
+                new_starts, nodes = [], []
+                for statement in parser.iter_statements():
+                    new_starts.append(start)
+                    nodes.append(statement)
+                    start = parser.current_token()[2]
+            except RuntimeError as e:
+                # A block or string left open may be closed by the text after the range
+                if widen and not final and self.reached_end(parser, e, text, begin, stop):
+                    last += last - first
+                    continue
+                if not widen:
+                    self.replace(first, last, [begin], [text], [None])
+                    self.reparsed = (begin, stop)
+                raise
+
+            break
+
+        self.reparsed = (begin, stop)
+        if not nodes:
+            # No statements, only blank lines and comments: the text joins a neighbouring region
+            if first == 0 and final:
+                error = ParseError(EMPTY_FILE, 'File is empty. There is nothing to parse.', (0, 0))
+                if not widen:
+                    self.replace(first, last, [0], [text], [None])
+                raise error
+            if first:
+                self.settle(first - 1)
+                self.replace(first - 1, last, [self.start(first - 1)], [texts[first - 1] + text],
+                             [self.nodes[first - 1]])
+            else:
+                self.settle(last)
+                self.replace(0, last + 1, [0], [text + texts[last]], [self.nodes[last]])
+            return nodes
+
+        if first == 0:
+            new_starts[0] = 0  # The first region holds the text before its statement
+        ends = new_starts[1:] + [stop]
+        self.replace(first, last, new_starts, [text[s - begin:e - begin] for s, e in zip(new_starts, ends)], nodes)
+        return nodes
+
+
+    def reached_end(self, parser, error, text, begin, stop):
+        """
+        Tells whether the failure to parse a range may depend on the text after it:
+        whether the parser had reached the end of the range, or the lexer failed
+        at a quote that a later one could close.
+        """
+        if parser.last_offset >= stop:
+            return True
+        span = getattr(error, 'span', None)
+        return span is not None and begin <= span[0] < stop and text[span[0] - begin] == '"'
+
+
+    def replace(self, first, last, starts, texts, nodes):
+        """ Replaces regions first to last (exclusive) with new ones, whose offsets are up to date """
+        self.move_gap(last)
+        self.starts[first:last] = starts
+        self.texts[first:last] = texts
+        self.newlines[first:last] = [text.count('\n') for text in texts]
+        self.nodes[first:last] = nodes
+        self.failed[first:last] = [node is None for node in nodes]
+        self.shifts[first:last] = [0] * len(nodes)
+        self.gap = first + len(nodes)
+
+
+    def move_gap(self, index):
+        """
+        Makes `index` the first region whose start and node offsets are still to
+        be moved by `delta`, moving those of the regions in between; this takes
+        time proportional to how far the gap moves.
+        """
+        delta = self.delta
+        if delta:
+            starts, shifts = self.starts, self.shifts
+            if index > self.gap:
+                for i in range(self.gap, index):
+                    starts[i] += delta
+                    shifts[i] += delta
+            else:
+                for i in range(index, self.gap):
+                    starts[i] -= delta
+                    shifts[i] -= delta
+        self.gap = index
+
+
+    def start(self, i):
+        """ Returns the offset region i starts at """
+        if i >= self.gap:
+            return self.starts[i] + self.delta
+        return self.starts[i]
+
+
+    def find(self, offset, bisect):
+        """ Finds an offset in the starts of the regions with bisect_left() or bisect_right() """
+        i = bisect(self.starts, offset, 0, self.gap)
+        if i < self.gap:
+            return i
+        return bisect(self.starts, offset - self.delta, self.gap)
+
+
+    def line_prefix(self, first):
+        """ Returns the text between the start of the line region `first` starts on and the region """
+        parts = []
+        for i in range(first - 1, -1, -1):
+            text = self.texts[i]
+            line_start = text.rfind('\n') + 1
+            parts.append(text[line_start:])
+            if line_start:
+                break
+        return ''.join(reversed(parts))
+
+
+    def syntax_error(self):
+        """
+        Returns the error of the current text, or None if it parses.
+
+        The failed regions are parsed again from the first one on, widened as
+        far as needed (see parse_regions()), until one of them fails in the same
+        way as a full parse would or all of them parse. The result is kept until
+        the next edit.
+        """
+
+        if self.error is not _UNKNOWN:
+            return self.error
+
+        error = None
+        failed = self.failed
+        while True in failed:
+            i = failed.index(True)
+            try:
+                self.parse_regions(i, i + 1, widen=True)
+            except RuntimeError as e:
+                error = e
+                break
+        self.error = error
+        return error
+
+
+    def statements(self):
+        """
+        Returns the statements of the current text.
+
+        Returns:
+            list: The statements, equal to those of a full parse of the text.
+
+        Raises:
+            RuntimeError: The error of the current text, if it does not parse.
+        """
+
+        error = self.syntax_error()
+        if error is not None:
+            raise error
+        self.move_gap(len(self.nodes))
+        for i, shift in enumerate(self.shifts):
+            if shift:
+                self.settle(i)
+        return list(self.nodes)
+
+
+    def statement_at(self, offset):
+        """
+        Returns the top-level statement whose region contains an offset.
+
+        Raises:
+            RuntimeError: The error of the current text, if it does not parse.
+        """
+
+        error = self.syntax_error()
+        if error is not None:
+            raise error
+        i = max(self.find(offset, bisect_right) - 1, 0)
+        self.settle(i)
+        return self.nodes[i]
+
+
+    def settle(self, i):
+        """ Moves the node offsets of region i to where its text is now """
+        pending = self.delta if i >= self.gap else 0
+        shift = self.shifts[i] + pending
+        self.shifts[i] = -pending
+        if not shift:
+            return
+        stack = [self.nodes[i]]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, Node):
+                value.offset += shift
+                stack.extend([getattr(value, name) for name in value._fields])
+            elif isinstance(value, list):
+                stack.extend(value)
+            elif isinstance(value, dict):
+                stack.extend(value.values())
+
+
+def text_edit(old, new):
+    """
+    Finds a single edit that turns one text into another.
+
+    The common beginning and end of the texts are found by comparing slices,
+    halving the range each time, so that long texts are compared at the speed
+    of string comparison.
+
+    Returns:
+        tuple: (start, end, text), the arguments of Document.edit() for `old`.
+    """
+
+    # Length of the common prefix
+    low, high = 0, min(len(old), len(new))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[low:middle] == new[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    prefix = low
+
+    # Length of the common suffix, not overlapping the prefix
+    low, high = 0, min(len(old), len(new)) - prefix
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[len(old) - middle:len(old) - low] == new[len(new) - middle:len(new) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return (prefix, len(old) - low, new[prefix:len(new) - low])
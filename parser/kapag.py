@@ -1,53 +1,51 @@
+from .nodes import KapagStatement, KasoClause
+from .tokens import COLON, HINTO, KAPAG, KASO, LBRACE, LPAREN, RBRACE, RPAREN
+
 def kapag_statement(self):
     """
     Parses a 'KAPAG' statement, which represents a conditional switch-like statement.
     Each 'KASO' block acts as a case with specific expressions and statements.
+
+    The statements of each case are parsed by CodeGoParser.statements(), which
+    sends them back to this generator (see kung_statement).
     
     Returns:
-        dict: A dictionary representing the parsed 'kapag' statement, containing:
-            - 'type': 'kapag_statement'
+        KapagStatement: A node representing the parsed 'kapag' statement, containing:
             - 'condition': The expression evaluated to determine case matching
-            - 'cases': A list of case dictionaries, each with:
+            - 'cases': A list of KasoClause nodes, each with:
                 - 'case_expr': The case's expression
                 - 'case_statements': The list of statements within the case
     """
 
     # Consume the 'KAPAG' keyword, marking the start of the switch-like structure
-    self.eat('KAPAG')
+    offset = self.eat(KAPAG)[2]
     
     # Parse the condition expression within parentheses
-    self.eat('LPAREN')
-    condition = self.expression()
-    self.eat('RPAREN')
+    self.eat(LPAREN)
+    condition = yield from self.resumable_expression()
+    self.eat(RPAREN)
     
     # Parse the cases within braces
-    self.eat('LBRACE')
+    self.eat(LBRACE)
 
     cases = []
-    while self.current_token()[0] == 'KASO':
+    while self.current_token()[0] == KASO:
         # Consume the 'KASO' keyword, indicating a new case
-        self.eat('KASO')
+        case_offset = self.eat(KASO)[2]
         
         # Parse the case expression
-        case_expr = self.expression()
-        self.eat('COLON')
+        case_expr = yield from self.resumable_expression()
+        self.eat(COLON)
         
         # Collect the statements in the case block
-        case_statements = self.statements()
-        cases.append({
-            'case_expr': case_expr,
-            'case_statements': case_statements
-        })
+        case_statements = yield
+        cases.append(KasoClause(case_expr, case_statements, case_offset))
         
         # Consume 'HINTO' to end the current case
-        self.eat('HINTO')
+        self.eat(HINTO)
     
     # Consume the closing brace to end the 'KAPAG' statement
-    self.eat('RBRACE')
+    self.eat(RBRACE)
     
-    # Return the parsed 'kapag' statement as a structured dictionary
-    return {
-        'type': 'kapag_statement',
-        'condition': condition,
-        'cases': cases
-    }
+    # Return the parsed 'kapag' statement as a KapagStatement node
+    return KapagStatement(condition, cases, offset)
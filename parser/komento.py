@@ -1,3 +1,6 @@
+from .nodes import Comment
+from .tokens import COMMENT
+
 def komento_statement(parser):
     """
     Parses a comment from the token stream.
@@ -6,15 +9,11 @@ def komento_statement(parser):
     structured representation of the comment.
 
     Returns:
-        dict: A parsed representation of the comment, including:
-              - 'type': The type of token ('comment').
+        Comment: A parsed representation of the comment, including:
               - 'text': The text of the comment, stripped of the leading '#' character.
     """
 
     # Expect and consume the comment token
-    comment = parser.eat('COMMENT')  
+    comment = parser.eat(COMMENT)  
 
-    return {
-        'type': 'comment',
-        'text': comment[1]
-    }
\ No newline at end of file
+    return Comment(comment[1], comment[2])
\ No newline at end of file
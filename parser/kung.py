@@ -1,34 +1,36 @@
+from .nodes import KungStatement
+from .tokens import KUNG, LBRACE, LPAREN, RBRACE, RPAREN
+
 def kung_statement(parser):
     """
     Parses a 'KUNG' statement, which represents a conditional statement similar to an if statement.
 
+    Like every block statement, this is a generator: it yields when it reaches the
+    block body and is sent the parsed statements back by CodeGoParser.statements(),
+    so nested blocks never recurse.
+
     Returns:
-        dict: A dictionary representing the parsed 'kung' statement, containing:
-            - 'type': 'kung_statement'
+        KungStatement: A node representing the parsed 'kung' statement, containing:
             - 'condition': The expression that determines whether the statements are executed
             - 'statements': A list of statements to execute if the condition is true
     """
 
     # Consume the 'KUNG' keyword, marking the start of the conditional statement
-    parser.eat('KUNG')
+    offset = parser.eat(KUNG)[2]
     
     # Parse the condition expression within parentheses
-    parser.eat('LPAREN')
-    condition = parser.expression()
-    parser.eat('RPAREN')
+    parser.eat(LPAREN)
+    condition = yield from parser.resumable_expression()
+    parser.eat(RPAREN)
     
     # Parse the statements within braces
-    parser.eat('LBRACE')
+    parser.eat(LBRACE)
 
     # Collect the statements to execute if the condition is true
-    statements = parser.statements()
+    statements = yield
     
     # Consume the closing brace to end the 'KUNG' statement
-    parser.eat('RBRACE')
+    parser.eat(RBRACE)
     
-    # Return the parsed 'kung' statement as a structured dictionary
-    return {
-        'type': 'kung_statement',
-        'condition': condition,
-        'statements': statements
-    }
+    # Return the parsed 'kung' statement as a KungStatement node
+    return KungStatement(condition, statements, offset)
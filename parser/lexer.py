@@ -1,19 +1,218 @@
+import mmap
 import re
+from types import MappingProxyType
+
+from .errors import UNEXPECTED_CHARACTER, ParseError
+from .tokens import (
+    BASIC_TYPE, BAWAT, EOF, GAWA, HABANG, HINTO, IDENTIFIER, KAPAG, KASO, KINDS, KUNG,
+    NUMERO, SA, TEKSTO, TSEK, InternTable, LineIndex, TokenStream,
+)
+
+# Pseudo kinds for matches that never become tokens
+SKIP = -1
+ERROR = -2
+
+# Reserved words. Keywords are lexed as identifiers first and then looked up
+# here, so names that merely start with a keyword (e.g. 'Sabado') stay identifiers.
+KEYWORDS = MappingProxyType({
+    # Basic types
+    'Numero': BASIC_TYPE,
+    'Desimal': BASIC_TYPE,
+    'Teksto': BASIC_TYPE,
+    'Tsek': BASIC_TYPE,
+    'Lista': BASIC_TYPE,
+    'Bagay': BASIC_TYPE,
+
+    # Boolean literals
+    'Tama': TSEK,
+    'Mali': TSEK,
+
+    # Conditional Statements
+    'Kung': KUNG,
+    'Kapag': KAPAG,
+    'Kaso': KASO,
+    'Hinto': HINTO,
+
+    # Loop Statements
+    'Habang': HABANG,
+    'Bawat': BAWAT,
+    'Sa': SA,
+
+    # Function declaration keyword
+    'Gawa': GAWA,
+})
+
+# Token rules, tried in order. Multi-character operators come before their
+# single-character prefixes so that the longest match wins.
+TOKEN_SPECIFICATION = [
+    ('WHITESPACE', r'[ \t\r\n\f\v]+'),   # Skip whitespace, including new lines
+    ('IDENTIFIER', r'[a-zA-Z_][a-zA-Z0-9_]*'),  # Identifiers and keywords
+    ('NUMERO',    r'\d+(?:\.\d+)?'),  # Numeric literals
+    ('TEKSTO',    r'"[^"]*"'),      # String literals
+    ('COMMENT',   r'#.*'),           # Comments
+    ('DOT',       r'\.'),
+    ('LPAREN',    r'\('),            # Left parenthesis
+    ('RPAREN',    r'\)'),            # Right parenthesis
+    ('LBRACE',    r'\{'),            # Left brace
+    ('RBRACE',    r'\}'),            # Right brace
+    ('LBRACKET',  r'\['),            # Left square bracket (for lists)
+    ('RBRACKET',  r'\]'),            # Right square bracket (for lists)
+    ('COMMA',     r','),             # Comma
+    ('SEMICOLON', r';'),             # Semicolon
+    ('COLON',     r':'),             # Colon
+    ('GREATER_EQUAL', r'>='),        # Greater than or equal to
+    ('LESS_EQUAL', r'<='),           # Less than or equal to
+    ('EQUALS',    r'='),             # Equals
+    ('GREATER',   r'>'),             # Greater than
+    ('LESS',      r'<'),             # Less than
+    ('PLUS',      r'\+'),            # Addition
+    ('MINUS',     r'-'),             # Subtraction
+    ('TIMES',     r'\*'),            # Multiplication
+    ('DIVIDE',    r'/'),             # Division
+    ('ERROR',     r'.'),             # Any other character
+]
+
+# Master pattern, compiled once and shared by every lexer
+TOKEN_REGEX = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in TOKEN_SPECIFICATION))
+
+# The master pattern and keywords for scanning encoded source, such as a
+# memory-mapped file, without decoding it first
+BYTES_TOKEN_REGEX = re.compile(TOKEN_REGEX.pattern.encode())
+BYTES_KEYWORDS = MappingProxyType({word.encode(): kind for word, kind in KEYWORDS.items()})
+
+# The value of every token whose text never varies (operators and punctuation),
+# indexed by match.lastindex like GROUP_KINDS; None for the others
+GROUP_TEXTS = (None,) + tuple(
+    None if name in ('WHITESPACE', 'IDENTIFIER', 'NUMERO', 'TEKSTO', 'COMMENT', 'ERROR')
+    else re.sub(r'\\(.)', r'\1', pattern)
+    for name, pattern in TOKEN_SPECIFICATION
+)
+
+# Sources scanned as encoded bytes
+BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+# Token kind for each group of the master pattern, indexed by match.lastindex
+GROUP_KINDS = (None,) + tuple(
+    SKIP if name in ('WHITESPACE', 'COMMENT') else ERROR if name == 'ERROR' else KINDS[name]
+    for name, _ in TOKEN_SPECIFICATION
+)
+
+def literal_value(kind, spelling):
+    """ Converts the spelling of a NUMERO or TEKSTO literal to its value """
+    if kind == TEKSTO:
+        return spelling[1:-1]  # Strip the quotes
+    return float(spelling) if '.' in spelling else int(spelling)
+
 
 class CodeGoLexer:
-    def __init__(self, source):
+    def __init__(self, source, symbols=None):
         self.source = source
+
+        # Interned names and literals, possibly shared with other lexers
+        self.symbols = InternTable() if symbols is None else symbols
         
         # List to store the generated tokens
         self.tokens = []
         
-        # Line number tracker for error reporting
-        self.line_number = 1
+        # Line index of the source, used only for error reporting
+        self.lines = LineIndex(source)
+
+        # Errors are raised, not collected (see iter_tokens())
+        self.errors = None
         
         # Start the tokenization process
         self.tokenize()
 
 
+    @classmethod
+    def iter_tokens(cls, source, lines=None, symbols=None, offset=0, errors=None):
+        """
+        Lazily tokenizes source code, yielding one token at a time.
+
+        Unlike the constructor, this never builds the full token list, so memory
+        stays flat no matter how large the input is and a parser can start
+        consuming tokens before the whole file has been lexed.
+
+        Args:
+            source (str, bytes or file): The source code, UTF-8 encoded source code
+                (e.g. a memory-mapped file, see scan_bytes()), or an open text file
+                which is read one line at a time.
+            lines (LineIndex): The line index of the source. When reading a file,
+                every line read is added to it, so that the caller can resolve
+                token offsets afterwards. Optional.
+            symbols (InternTable): The table to intern names and literals in, e.g.
+                one shared by all files of a batch. Optional.
+            offset (int): The offset of the source in a larger one, added to the
+                offsets of the tokens (see parser.split).
+            errors (list): A list to append unexpected characters to as ParseErrors,
+                skipping them instead of raising an error (see CodeGoParser's
+                `diagnostics`). Optional.
+
+        Yields:
+            tuple: Tokens in the same (kind, value, offset) form as `tokens`,
+                ending with an EOF token.
+
+        Raises:
+            ParseError: If an unexpected character is encountered in the source code
+                and no `errors` list is given.
+        """
+
+        lexer = cls.__new__(cls)
+        lexer.source = source
+        lexer.tokens = None
+        lexer.symbols = InternTable() if symbols is None else symbols
+        lexer.errors = errors
+
+        if isinstance(source, str):
+            lexer.lines = LineIndex(source, offset) if lines is None else lines
+            yield from lexer.scan(source, offset=offset)
+            offset += len(source)
+        elif isinstance(source, BUFFER_TYPES):
+            lexer.lines = LineIndex(source, offset) if lines is None else lines
+            yield from lexer.scan_bytes(source, offset)
+            offset += len(source)
+        else:
+            lexer.lines = lines = LineIndex('', offset) if lines is None else lines
+
+            # String literals may span lines, so a line ending inside an
+            # unterminated string is carried over and joined with the lines
+            # that follow. Only a line with a quote can end the string, so the
+            # carried text is scanned again only then, once per string.
+            pending = []
+            for line in source:
+                lines.extend(line)
+                if pending and '"' not in line:
+                    pending.append(line)
+                    continue
+                text = ''.join(pending) + line
+                rest = yield from lexer.scan(text, partial=True, offset=offset)
+                offset += len(text) - len(rest)
+                pending = [rest] if rest else []
+            text = ''.join(pending)
+            yield from lexer.scan(text, offset=offset)
+            offset += len(text)
+
+        yield (EOF, None, offset)  # End of file token
+
+
+    @classmethod
+    def token_stream(cls, source, symbols=None, errors=None):
+        """
+        Tokenizes source code into a compact TokenStream.
+
+        Args:
+            source (str, bytes or file): The source code, encoded source code, or an open text file.
+            symbols (InternTable): The table to intern names and literals in. Optional.
+            errors (list): A list to collect unexpected characters in (see iter_tokens()). Optional.
+
+        Returns:
+            TokenStream: The tokens, stored as parallel arrays, with the line index of the source.
+        """
+
+        lines = LineIndex(source) if isinstance(source, (str,) + BUFFER_TYPES) else LineIndex()
+        return TokenStream.from_tokens(cls.iter_tokens(source, lines, symbols, errors=errors), lines)
+
+
     def tokenize(self):
         """
         Tokenizes the source code into a list of tokens based on predefined specifications.
@@ -23,78 +222,144 @@ class CodeGoLexer:
         whitespace.
 
         Raises:
-            RuntimeError: If an unexpected character is encountered in the source code.
+            ParseError: If an unexpected character is encountered in the source code.
+        """
+
+        self.tokens.extend(self.scan(self.source))
+        self.tokens.append((EOF, None, len(self.source)))  # End of file token
+
+
+    def scan(self, text, partial=False, offset=0):
+        """
+        Yields the tokens found in a piece of source code.
+
+        Tokens record only their start offset. Lines are never counted here;
+        they are resolved from the offset through a LineIndex when needed.
+        Names and literals are interned in `self.symbols`, so a spelling seen
+        before is neither sliced nor converted again.
+
+        Args:
+            text (str): The source code to scan.
+            partial (bool): Whether more text follows. If so, scanning stops at an
+                unterminated string literal instead of raising an error.
+            offset (int): The offset of `text` in the whole source.
+
+        Yields:
+            tuple: Tokens as (kind, value, offset), where kind is one of the
+                integer token kinds from parser.tokens.
+
+        Returns:
+            str: The unscanned rest of the text when `partial` is set, otherwise ''.
+
+        Raises:
+            ParseError: If an unexpected character is encountered in the source code.
         """
 
-        token_specification = [
-            ('BASIC_TYPE', r'Numero|Desimal|Teksto|Tsek|Lista|Bagay'),  # Basic types
-            ('NUMERO',    r'\d+(\.\d+)?'),  # Numeric literals
-            ('TEKSTO',    r'"[^"]*"'),      # String literals
-            ('TSEK',   r'Tama|Mali'),     # Boolean literals
-            
-            # Conditional Statements
-            ('KUNG', r'Kung'),
-            ('KAPAG', r'Kapag'),
-            ('KASO', r'Kaso'),
-            ('HINTO', r'Hinto'),
-            
-            # Loop Statements
-            ('HABANG',    r'Habang'),
-            ('BAWAT',     r'Bawat'),
-            ('SA',        r'Sa'),
-            
-            # Function declaration keyword
-            ('GAWA', r'Gawa'),        
-            
-            ('IDENTIFIER', r'[a-zA-Z_][a-zA-Z0-9_]*'),  # Identifiers
-
-            ('NEWLINE',   r'\n'),            # New line
-            ('COMMENT',   r'#.*'),           # Comments
-            ('WHITESPACE', r'\s+'),          # Skip whitespace
-            ('DOT',       r'\.'),
-            ('PLUS',      r'\+'),            # Addition
-            ('MINUS',     r'-'),             # Subtraction
-            ('TIMES',     r'\*'),            # Multiplication
-            ('DIVIDE',    r'/'),             # Division
-            ('LPAREN',    r'\('),            # Left parenthesis
-            ('RPAREN',    r'\)'),            # Right parenthesis
-            ('LBRACE',    r'\{'),            # Left brace
-            ('RBRACE',    r'\}'),            # Right brace
-            ('LBRACKET',  r'\['),            # Left square bracket (for lists)
-            ('RBRACKET',  r'\]'),            # Right square bracket (for lists)
-            ('COMMA',     r','),             # Comma
-            ('SEMICOLON', r';'),             # Semicolon
-            ('COLON',     r':'),             # Colon
-            ('EQUALS',    r'='),             # Equals
-            ('GREATER',   r'>'),             # Greater than
-            ('LESS',      r'<'),             # Less than
-            ('GREATER_EQUAL', r'>='),        # Greater than or equal to
-            ('LESS_EQUAL', r'<='),           # Less than or equal to
-            ('ERROR',     r'.'),             # Any other character
-        ]
-
-        tok_regex = '|'.join(f'(?P<{pair[0]}>{pair[1]})' for pair in token_specification)
-        for mo in re.finditer(tok_regex, self.source):
-            kind = mo.lastgroup
-            value = mo.group()
-            if kind == 'NEWLINE':
-                # self.tokens.append(('NEWLINE', None, self.line_number)) 
-                self.line_number += 1
-            elif kind == 'NUMERO':
-                self.tokens.append(('NUMERO', float(value) if '.' in value else int(value), self.line_number))
-            elif kind == 'TEKSTO':
-                self.tokens.append(('TEKSTO', value[1:-1], self.line_number))  # Strip the quotes
-            elif kind == 'TSEK':
-                self.tokens.append(('TSEK', value, self.line_number))
-            elif kind == 'IDENTIFIER':
-                self.tokens.append(('IDENTIFIER', value, self.line_number))
-            elif kind == 'COMMENT':
-                continue  # Skip comments
-            elif kind == 'WHITESPACE':
-                continue  
-            elif kind == 'ERROR':
-                raise RuntimeError(f'Unexpected character: {value} on line {self.line_number}')
-            else:
-                self.tokens.append((kind, value, self.line_number))
-
-        self.tokens.append(('EOF', None, self.line_number))  # End of file token
+        keyword = KEYWORDS.get
+        group_kinds = GROUP_KINDS
+        group_texts = GROUP_TEXTS
+        spellings = self.symbols.spellings
+        interned = 0
+        try:
+            for mo in TOKEN_REGEX.finditer(text):
+                kind = group_kinds[mo.lastindex]
+                if kind == SKIP:
+                    continue  # Skip whitespace, new lines and comments
+                elif kind == IDENTIFIER:
+                    spelling = mo.group()
+                    value = spellings.get(spelling)
+                    if value is None:
+                        value = spellings[spelling] = spelling
+                    interned += 1
+                    yield (keyword(value, IDENTIFIER), value, offset + mo.start())
+                elif kind == NUMERO or kind == TEKSTO:
+                    spelling = mo.group()
+                    value = spellings.get(spelling)
+                    if value is None:
+                        value = spellings[spelling] = literal_value(kind, spelling)
+                    interned += 1
+                    yield (kind, value, offset + mo.start())
+                elif kind == ERROR:
+                    value = mo.group()
+                    if partial and value == '"':
+                        # The string literal continues in the text that follows
+                        return text[mo.start():]
+                    self.error(value, offset + mo.start(), offset + mo.end())
+                else:
+                    yield (kind, group_texts[mo.lastindex], offset + mo.start())
+        finally:
+            self.symbols.total += interned
+
+        return ''
+
+
+    def scan_bytes(self, data, offset=0):
+        """
+        Yields the tokens found in UTF-8 encoded source code.
+
+        The bytes are scanned in place, so a memory-mapped file is never copied
+        into a string. Only token values are decoded, and each distinct spelling
+        is decoded once: later occurrences share its interned value.
+
+        Args:
+            data (bytes-like): The encoded source code, e.g. an mmap.mmap.
+            offset (int): The offset of `data` in the whole source.
+
+        Yields:
+            tuple: Tokens as (kind, value, offset), where offset counts bytes.
+
+        Raises:
+            ParseError: If an unexpected character is encountered in the source code.
+        """
+
+        keyword = BYTES_KEYWORDS.get
+        group_kinds = GROUP_KINDS
+        group_texts = GROUP_TEXTS
+        spellings = self.symbols.spellings
+        encoded = self.symbols.encoded
+        interned = 0
+        try:
+            for mo in BYTES_TOKEN_REGEX.finditer(data):
+                index = mo.lastindex
+                kind = group_kinds[index]
+                if kind == SKIP:
+                    continue  # Skip whitespace, new lines and comments
+                value = group_texts[index]
+                if value is not None:
+                    yield (kind, value, offset + mo.start())  # Operators and punctuation need no decoding
+                    continue
+                elif kind == ERROR:
+                    start = mo.start()
+                    if data[start] & 0xC0 == 0x80:
+                        continue  # The rest of a multi-byte character already reported
+                    value = bytes(data[start:start + 4]).decode('utf-8', 'replace')[:1]
+                    self.error(value, offset + start, offset + start + (1 if value == '\ufffd' else len(value.encode())))
+                    continue
+
+                raw = mo.group()
+                value = encoded.get(raw)
+                if value is None:
+                    # Share the values of the same spelling in text sources
+                    spelling = raw.decode()
+                    value = spellings.get(spelling)
+                    if value is None:
+                        value = spellings[spelling] = spelling if kind == IDENTIFIER else literal_value(kind, spelling)
+                    encoded[raw] = value
+                interned += 1
+                if kind == IDENTIFIER:
+                    kind = keyword(raw, IDENTIFIER)
+                yield (kind, value, offset + mo.start())
+        finally:
+            self.symbols.total += interned
+
+
+    def error(self, character, start, end):
+        """
+        Reports an unexpected character, raising a ParseError or, when the lexer
+        collects its errors, appending one to them.
+        """
+        error = ParseError(UNEXPECTED_CHARACTER, f'Unexpected character: {character} on {self.lines.describe(start)}',
+                           (start, end))
+        if self.errors is None:
+            raise error
+        self.errors.append(error)
@@ -1,66 +1,99 @@
-def parse_list(parser):
+from .errors import EXPECTED_TOKEN, ParseError, token_span
+from .tokens import COLON, COMMA, IDENTIFIER, RBRACE, RBRACKET, TEKSTO
+
+# List and object literals, e.g. [1, [2, 3], {ulam: "Adobo", presyo: 100.50}],
+# are terms of CodeGoParser.resumable_expression(). Their items can be any
+# expression, including other literals, and an open literal is kept on the same
+# explicit stack as open parentheses and calls, so literals nest to any depth
+# without recursion. The functions here consume what comes between the items;
+# each of them either consumes a token or raises an error, so parsing always
+# advances, and a literal of n items is parsed in time linear in n.
+
+# Token kinds of object literal keys
+KEYS = frozenset((IDENTIFIER, TEKSTO))
+
+
+def object_follows(parser):
+    """
+    Tells an object literal from a block of statements, both of which start with
+    a LBRACE: an object is empty or starts with a key and a colon.
+
+    Args:
+        parser (CodeGoParser): The parser, at the LBRACE.
+
+    Returns:
+        bool: Whether the LBRACE opens an object literal.
+    """
+
+    parser.fill(3)
+    lookahead = parser.lookahead
+    if len(lookahead) < 2:
+        return False
+    kind = lookahead[1][0]
+    if kind == RBRACE:
+        return True
+    return kind in KEYS and len(lookahead) > 2 and lookahead[2][0] == COLON
+
+
+def list_item(parser, literal, item):
     """
-    Parses a list structure enclosed in brackets [].
+    Adds an item to a list literal and consumes the comma or bracket after it.
 
     Args:
-        parser (CodeGoParser): The parser instance used for parsing tokens.
+        parser (CodeGoParser): The parser, after the item.
+        literal (ListLiteral): The list being parsed.
+        item (Node): The item.
+
+    Returns:
+        bool: Whether the list was closed; otherwise another item follows.
+    """
+
+    literal.items.append(item)
+    if parser.current_token()[0] == COMMA:
+        parser.eat(COMMA)
+        if parser.current_token()[0] != RBRACKET:
+            return False  # A trailing comma is allowed
+    parser.eat(RBRACKET)
+    return True
+
+
+def object_key(parser):
+    """
+    Consumes the key of the next property of an object literal, and its colon.
+
+    Keys are names or string literals.
 
     Returns:
-        dict: A dictionary representing the parsed list, containing:
-            - 'type': 'list'
-            - 'items': A list of parsed items within the brackets
+        str: The key.
     """
-    
-    # Consume the opening bracket for the list
-    parser.eat('LBRACKET')
-
-    # Initialize an empty list to hold the items
-    items = []
-
-    while parser.current_token()[0] != 'RBRACKET':
-        if parser.current_token()[0] == 'LBRACE':
-            items.append(parse_object(parser))
-        elif parser.current_token()[0] in ('NUMERO', 'TEKSTO', 'TSEK', 'IDENTIFIER'):
-            # Consume the current token if it's a valid item
-            items.append(parser.eat(parser.current_token()[0]))
-
-        # Consume the comma if found
-        if parser.current_token()[0] == 'COMMA':
-            parser.eat('COMMA')
-    
-    # Consume the closing bracket for the list
-    parser.eat('RBRACKET')
-    return {'type': 'list', 'items': items}
-
-
-def parse_object(parser):
+
+    token = parser.current_token()
+    if token[0] not in KEYS:
+        raise ParseError(EXPECTED_TOKEN, f'Expected IDENTIFIER, got {parser.describe(token)}', token_span(token))
+    parser.eat(token[0])
+    parser.eat(COLON)
+    return token[1]
+
+
+def object_value(parser, literal, key, value):
     """
-    Parses an object structure enclosed in braces {}.
+    Adds a property to an object literal and consumes what follows it: a comma
+    and the next key, or the closing brace.
 
     Args:
-        parser (CodeGoParser): The parser instance used for parsing tokens.
+        parser (CodeGoParser): The parser, after the value.
+        literal (ObjectLiteral): The object being parsed.
+        key (str): The key of the property.
+        value (Node): The value of the property.
 
     Returns:
-        dict: A dictionary representing the parsed object, containing:
-            - 'type': 'object'
-            - 'properties': A dictionary of key-value pairs within the object
+        str: The key of the next property, or None if the object was closed.
     """
 
-    # Consume the opening brace for the object
-    parser.eat('LBRACE')
-    
-    # Initialize an empty dictionary to hold the properties
-    obj = {}
-
-    # Continue until the closing brace is found
-    while parser.current_token()[0] != 'RBRACE':
-        key = parser.eat('IDENTIFIER')
-        parser.eat('COLON')
-        value = parser.expression()
-        obj[key[1]] = value
-
-        # If there's a comma, consume it to continue to the next key-value pair
-        if parser.current_token()[0] == 'COMMA':
-            parser.eat('COMMA')
-    parser.eat('RBRACE')
-    return {'type': 'object', 'properties': obj}
\ No newline at end of file
+    literal.properties[key] = value
+    if parser.current_token()[0] == COMMA:
+        parser.eat(COMMA)
+        if parser.current_token()[0] != RBRACE:
+            return object_key(parser)  # A trailing comma is allowed
+    parser.eat(RBRACE)
+    return None
@@ -0,0 +1,359 @@
+from .tokens import IDENTIFIER, KIND_NAMES
+
+# Typed AST nodes produced by CodeGoParser.
+#
+# Every node uses __slots__ and records the source offset it starts at (see
+# parser.tokens.LineIndex for resolving it to a line and column). Later passes
+# dispatch on the node class instead of comparing 'type' strings, and to_dict()
+# converts a tree back to the dictionary form that print_ast() understands.
+
+
+def to_dict(value, lines=None):
+    """
+    Converts a node, or a list or dict of nodes, to its dictionary form.
+
+    Args:
+        value: A node, or a list or dict of nodes.
+        lines (LineIndex): The line index of the source, used to show line numbers
+            instead of offsets in leaf tuples. Optional.
+    """
+
+    # Converted with an explicit stack, so that deeply nested trees do not hit
+    # the recursion limit. Each entry is (value, container, key to store it under).
+    root = [None]
+    stack = [(value, root, 0)]
+    while stack:
+        value, container, key = stack.pop()
+        if isinstance(value, Node):
+            if value.is_leaf:
+                container[key] = value.to_dict(lines)
+                continue
+            items = value.dict_items()
+        elif isinstance(value, dict):
+            items = list(value.items())
+        elif isinstance(value, list):
+            result = container[key] = [None] * len(value)
+            stack.extend((item, result, i) for i, item in enumerate(value))
+            continue
+        else:
+            container[key] = value
+            continue
+
+        # Create the keys up front to keep their order
+        result = container[key] = dict.fromkeys(name for name, _ in items)
+        stack.extend((item, result, name) for name, item in items)
+    return root[0]
+
+
+class Node:
+    """ Base class of all AST nodes """
+
+    __slots__ = ('offset',)
+
+    # Name of the node in its dictionary form
+    type = None
+
+    # Names of the child fields, excluding the position; filled in per subclass
+    _fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = cls._fields + tuple(cls.__dict__.get('__slots__', ()))
+
+    def fields(self):
+        """ Returns the (name, value) pairs of the node, excluding its position """
+        return [(name, getattr(self, name)) for name in self._fields]
+
+    # Identifiers and literals are leaves, whose dictionary form is a token tuple
+    is_leaf = False
+
+    def dict_items(self):
+        """ Returns the (key, value) pairs of the node's dictionary form, without converting children """
+        return [('type', self.type)] + self.fields()
+
+    def to_dict(self, lines=None):
+        """ Converts the node to the dictionary form used by print_ast() """
+        return to_dict(self, lines)
+
+    def __eq__(self, other):
+        # Compared with an explicit stack, like to_dict()
+        stack = [(self, other)]
+        while stack:
+            a, b = stack.pop()
+            if isinstance(a, Node):
+                if type(a) is not type(b) or a.offset != b.offset:
+                    return False
+                stack.extend((getattr(a, name), getattr(b, name)) for name in a._fields)
+            elif isinstance(a, list):
+                if not isinstance(b, list) or len(a) != len(b):
+                    return False
+                stack.extend(zip(a, b))
+            elif isinstance(a, dict):
+                if not isinstance(b, dict) or a.keys() != b.keys():
+                    return False
+                stack.extend((a[key], b[key]) for key in a)
+            elif a != b:
+                return False
+        return True
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __reduce__(self):
+        # Pickle as a constructor call: much smaller and faster than the default
+        # state dictionary, which matters when trees are sent between processes
+        return (self.__class__, tuple([getattr(self, name) for name in self._fields]) + (self.offset,))
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={value!r}' for name, value in self.fields())
+        return f'{type(self).__name__}({fields})'
+
+
+# Statements
+
+class VarDeclaration(Node):
+    """ [basic_type] identifier = expression """
+
+    __slots__ = ('basic_type', 'identifier', 'expression')
+    type = 'var_declaration'
+
+    def __init__(self, basic_type, identifier, expression, offset=0):
+        self.basic_type = basic_type
+        self.identifier = identifier
+        self.expression = expression
+        self.offset = offset
+
+
+class Assignment(Node):
+    """ identifier = expression """
+
+    __slots__ = ('identifier', 'expression')
+    type = 'assignment'
+
+    def __init__(self, identifier, expression, offset=0):
+        self.identifier = identifier
+        self.expression = expression
+        self.offset = offset
+
+
+class ExpressionStatement(Node):
+    """ An expression used as a statement """
+
+    __slots__ = ('expression',)
+    type = 'expression'
+
+    def __init__(self, expression, offset=0):
+        self.expression = expression
+        self.offset = offset
+
+
+class Comment(Node):
+    """ # text """
+
+    __slots__ = ('text',)
+    type = 'comment'
+
+    def __init__(self, text, offset=0):
+        self.text = text
+        self.offset = offset
+
+
+class KungStatement(Node):
+    """ Kung (condition) { statements } """
+
+    __slots__ = ('condition', 'statements')
+    type = 'kung_statement'
+
+    def __init__(self, condition, statements, offset=0):
+        self.condition = condition
+        self.statements = statements
+        self.offset = offset
+
+
+class HabangStatement(Node):
+    """ Habang (condition) { statements } """
+
+    __slots__ = ('condition', 'statements')
+    type = 'habang_statement'
+
+    def __init__(self, condition, statements, offset=0):
+        self.condition = condition
+        self.statements = statements
+        self.offset = offset
+
+
+class BawatStatement(Node):
+    """ Bawat (iterator Sa iterable) { body } """
+
+    __slots__ = ('iterator', 'iterable', 'body')
+    type = 'bawat_statement'
+
+    def __init__(self, iterator, iterable, body, offset=0):
+        self.iterator = iterator
+        self.iterable = iterable
+        self.body = body
+        self.offset = offset
+
+
+class KapagStatement(Node):
+    """ Kapag (condition) { Kaso ... Hinto ... } """
+
+    __slots__ = ('condition', 'cases')
+    type = 'kapag_statement'
+
+    def __init__(self, condition, cases, offset=0):
+        self.condition = condition
+        self.cases = cases
+        self.offset = offset
+
+
+class KasoClause(Node):
+    """ Kaso case_expr: case_statements Hinto """
+
+    __slots__ = ('case_expr', 'case_statements')
+
+    def __init__(self, case_expr, case_statements, offset=0):
+        self.case_expr = case_expr
+        self.case_statements = case_statements
+        self.offset = offset
+
+    def dict_items(self):
+        return self.fields()
+
+
+class GawaDeclaration(Node):
+    """ Gawa name (parameters) { body } """
+
+    __slots__ = ('name', 'parameters', 'body')
+    type = 'gawa_declaration'
+
+    def __init__(self, name, parameters, body, offset=0):
+        self.name = name
+        self.parameters = parameters
+        self.body = body
+        self.offset = offset
+
+
+class Parameter(Node):
+    """ [basic_type] name, in a function declaration """
+
+    __slots__ = ('basic_type', 'name')
+
+    def __init__(self, basic_type, name, offset=0):
+        self.basic_type = basic_type
+        self.name = name
+        self.offset = offset
+
+    def dict_items(self):
+        return [('type', self.basic_type), ('name', self.name)]
+
+
+class FunctionInvocation(Node):
+    """
+    function_name(arguments)
+
+    function_name is the name of the function, or the callee expression when a
+    call is made on something other than a plain name (e.g. luto.ulam(x)).
+    """
+
+    __slots__ = ('function_name', 'arguments')
+    type = 'function_invocation'
+
+    def __init__(self, function_name, arguments, offset=0):
+        self.function_name = function_name
+        self.arguments = arguments
+        self.offset = offset
+
+
+# Expressions
+
+class BinaryOp(Node):
+    """ left operator right """
+
+    __slots__ = ('operator', 'left', 'right')
+    type = 'binary_op'
+
+    def __init__(self, operator, left, right, offset=0):
+        self.operator = operator
+        self.left = left
+        self.right = right
+        self.offset = offset
+
+
+class UnaryOp(Node):
+    """ operator operand """
+
+    __slots__ = ('operator', 'operand')
+    type = 'unary_op'
+
+    def __init__(self, operator, operand, offset=0):
+        self.operator = operator
+        self.operand = operand
+        self.offset = offset
+
+
+class PropertyAccess(Node):
+    """ object.property """
+
+    __slots__ = ('object', 'property')
+    type = 'property_access'
+
+    def __init__(self, object, property, offset=0):
+        self.object = object
+        self.property = property
+        self.offset = offset
+
+
+class ListLiteral(Node):
+    """ [items] """
+
+    __slots__ = ('items',)
+    type = 'list'
+
+    def __init__(self, items, offset=0):
+        self.items = items
+        self.offset = offset
+
+
+class ObjectLiteral(Node):
+    """ { key: value, ... } """
+
+    __slots__ = ('properties',)
+    type = 'object'
+
+    def __init__(self, properties, offset=0):
+        self.properties = properties
+        self.offset = offset
+
+
+class Identifier(Node):
+    """ A variable name """
+
+    __slots__ = ('name',)
+
+    def __init__(self, name, offset=0):
+        self.name = name
+        self.offset = offset
+
+    is_leaf = True
+
+    def to_dict(self, lines=None):
+        return (KIND_NAMES[IDENTIFIER], self.name, self.offset if lines is None else lines.line(self.offset))
+
+
+class Literal(Node):
+    """ A NUMERO, TEKSTO or TSEK literal """
+
+    __slots__ = ('kind', 'value')
+
+    def __init__(self, kind, value, offset=0):
+        self.kind = kind
+        self.value = value
+        self.offset = offset
+
+    is_leaf = True
+
+    def to_dict(self, lines=None):
+        return (KIND_NAMES[self.kind], self.value, self.offset if lines is None else lines.line(self.offset))
@@ -0,0 +1,553 @@
+import math
+
+from .compiler import OPERATORS
+from .errors import CompileError
+from .nodes import (
+    Assignment, BawatStatement, BinaryOp, ExpressionStatement, FunctionInvocation, GawaDeclaration,
+    HabangStatement, Identifier, KapagStatement, KungStatement, ListLiteral, Literal, Node, ObjectLiteral,
+    PropertyAccess, UnaryOp, VarDeclaration,
+)
+from .resolve import BUILTIN, GLOBAL, LOCAL, Resolver
+from .tokens import NUMERO, TEKSTO, TSEK
+from .typecheck import COMPARABLE, COMPARISONS, DECLARED_TYPES, NUMBERS, ONLY, TypeChecker
+from .vm import BINARY_FUNCTIONS, join_text
+
+# Optimization levels: none, constant folding and dead branches, and loop-invariant hoisting too
+LEVELS = (0, 1, 2)
+
+# Name of the pass that moves expressions out of loops, which removes no nodes
+HOISTING = 'loop-invariant hoisting'
+
+# Largest values folded into a literal, so that folding does not blow up the program:
+# the length of a Teksto and the number of bits of a Numero
+MAX_TEXT = 4096
+MAX_BITS = 128
+
+# Types whose arithmetic and comparisons never fail: those of Python ints, and
+# of floats, which overflow to infinity. Mixing them can fail, as a Numero may
+# be too large to convert to a float.
+_INTEGERS = ONLY['Numero']
+_FLOATS = ONLY['Desimal']
+
+# Types that a Teksto can be joined with without failing; a Numero may be too long to convert to text
+_JOINABLE = frozenset(('Teksto', 'Desimal', 'Tsek'))
+
+
+def parts(value):
+    """ Returns the parts of a node, list or dict that may hold nodes, or None for a leaf or any other value """
+    if isinstance(value, Node):
+        return None if value.is_leaf else [getattr(value, name) for name in value._fields]
+    if type(value) is list:
+        return value
+    if type(value) is dict:
+        return list(value.values())
+    return None
+
+
+def rebuild(value, replace):
+    """
+    Copies a syntax tree from the bottom up, sharing the parts that do not change.
+
+    Once the parts of a node or list are rebuilt, `replace(original, value)` is
+    called with the original and its copy (or the original itself if no part
+    changed), and returns what to put in its place. The original tree is not
+    modified. Rebuilt with an explicit stack, so deep trees do not hit the
+    recursion limit.
+    """
+
+    done = []
+    work = [(value, None)]
+    while work:
+        value, items = work.pop()
+        if items is None:
+            items = parts(value)
+            if items is None:
+                done.append(value)
+                continue
+            work.append((value, items))
+            work.extend((item, None) for item in reversed(items))
+            continue
+
+        start = len(done) - len(items)
+        new = done[start:]
+        del done[start:]
+        copy = value
+        if any(item is not old for item, old in zip(new, items)):
+            if type(value) is list:
+                copy = new
+            elif type(value) is dict:
+                copy = dict(zip(value, new))
+            else:
+                copy = object.__new__(type(value))
+                copy.offset = value.offset
+                for name, item in zip(value._fields, new):
+                    setattr(copy, name, item)
+        done.append(replace(value, copy))
+    return done[0]
+
+
+def count_nodes(value):
+    """ Returns the number of nodes in a node, or a list or dict of them """
+    count = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, Node):
+            count += 1
+        items = parts(value)
+        if items:
+            stack.extend(items)
+    return count
+
+
+def literal_value(node):
+    """ Returns the runtime value of a Literal """
+    return node.value == 'Tama' if node.kind == TSEK else node.value
+
+
+def make_literal(value, offset):
+    """ Returns a Literal of a runtime value, or None if it is not folded """
+    kind = type(value)
+    if kind is bool:
+        return Literal(TSEK, 'Tama' if value else 'Mali', offset)
+    if kind is str:
+        return Literal(TEKSTO, value, offset) if len(value) <= MAX_TEXT else None
+    if kind is int:
+        return Literal(NUMERO, value, offset) if value.bit_length() <= MAX_BITS else None
+    if kind is float:
+        return Literal(NUMERO, value, offset) if math.isfinite(value) else None
+    return None
+
+
+def evaluate(operator, left, right):
+    """
+    Runs a binary operator on two literal values the way parser.vm does, and
+    returns the result, or None if it fails or is too large to be worth folding.
+    """
+    if operator == '*':
+        # Checked before repeating, so that "x" * 1000000000 is not built
+        for text, count in ((left, right), (right, left)):
+            if type(text) is str and type(count) is not str and len(text) * count > MAX_TEXT:
+                return None
+    try:
+        return BINARY_FUNCTIONS[OPERATORS.index(operator)](left, right)
+    except TypeError:
+        if operator == '+' and (type(left) is str or type(right) is str):
+            return join_text(left, right)
+    except (ZeroDivisionError, OverflowError, ValueError):
+        pass
+    return None
+
+
+def never_fails(operator, left, right, divisor):
+    """
+    Whether a binary operator on values of two types can never fail at run
+    time; `divisor` is its right operand, which must be a literal other than
+    zero for a division.
+    """
+    if not left or not right:
+        return False
+    if operator == '/':
+        if type(divisor) is not Literal:
+            return False
+        value = literal_value(divisor)
+        if type(value) is str or not value or type(value) is int and value.bit_length() > MAX_BITS:
+            return False
+        return left <= _INTEGERS and type(value) is not float or left <= _FLOATS
+    if left <= _INTEGERS and right <= _INTEGERS or left <= _FLOATS and right <= _FLOATS:
+        return True
+    text = ONLY['Teksto']
+    if operator == '+':
+        return left == text and right <= _JOINABLE or right == text and left <= _JOINABLE or left == right == ONLY['Lista']
+    if operator in COMPARISONS:
+        # Numbers, Tama and Mali among them, compare exactly whatever their types
+        return left <= COMPARABLE and right <= COMPARABLE or left == right == text
+    # Repeating a Teksto or Lista fails if the Numero is too large
+    return False
+
+
+def declared_type(types):
+    """ Returns the type to declare a variable holding values of some types with, or None """
+    if not types:
+        return None
+    for name in ('Numero', 'Desimal', 'Teksto', 'Tsek', 'Lista'):
+        if types <= DECLARED_TYPES[name]:
+            return name
+    return None
+
+
+def operands(node):
+    """ Returns the expressions an expression is made of """
+    kind = type(node)
+    if kind is BinaryOp:
+        return [node.left, node.right]
+    if kind is UnaryOp:
+        return [node.operand]
+    if kind is PropertyAccess:
+        return [node.object]
+    if kind is FunctionInvocation:
+        items = list(node.arguments)
+        if type(node.function_name) is not str:
+            items.append(node.function_name)
+        return items
+    if kind is ListLiteral:
+        return list(node.items)
+    if kind is ObjectLiteral:
+        return list(node.properties.values())
+    return []
+
+
+def blocks(node):
+    """ Returns the blocks of statements of a statement """
+    kind = type(node)
+    if kind is KungStatement or kind is HabangStatement:
+        return [node.statements]
+    if kind is BawatStatement or kind is GawaDeclaration:
+        return [node.body]
+    if kind is KapagStatement:
+        return [case.case_statements for case in node.cases]
+    return []
+
+
+def expressions(node):
+    """ Returns the expressions a statement evaluates itself, not those of its blocks """
+    kind = type(node)
+    if kind is VarDeclaration or kind is Assignment:
+        return [node.expression] if node.expression is not None else []
+    if kind is ExpressionStatement:
+        return [node.expression]
+    if kind is FunctionInvocation:
+        return [node]
+    if kind is KungStatement or kind is HabangStatement:
+        return [node.condition]
+    if kind is KapagStatement:
+        return [node.condition] + [case.case_expr for case in node.cases]
+    return []
+
+
+class Optimizer:
+    """
+    Rewrites the syntax tree of a program into one that prints the same and
+    fails with the same errors, but runs less code.
+
+    The passes, in order, and the level that runs them:
+
+    1. Constant folding: a binary_op or unary_op on literals becomes the
+       literal it evaluates to, unless that fails, like 1 / 0, or gives a
+       very large value.
+    2. Dead branches: a Kung or Habang whose condition is a false literal is
+       dropped, and a Kung whose condition is a true one is replaced with its
+       body, unless that declares a variable, which must stay in its block.
+    3. Loop-invariant hoisting (level 2): an operation that every run of the
+       body of a Habang or Bawat evaluates, and whose operands cannot change
+       while the loop runs, is computed once, into a new variable declared
+       before the loop. One in a branch, such as the block of a Kung in the
+       loop, stays where it is. It is still computed when the loop runs no
+       times, so only operations that cannot fail are moved, by the types
+       parser.typecheck infers, and the loop fails where and when it did;
+       variables a Gawa may assign are only used if the loop calls none.
+
+    The program is checked as written first, so errors are reported as they
+    would be without optimizing, even in code a pass removes. A pass whose
+    result does not check, e.g. because types inferred without a dead branch
+    are narrower, is dropped. The input tree is not modified: changed nodes
+    are copied.
+
+    Usage:
+        statements = Optimizer(2, lines).optimize(CodeGoParser(tokens, lines).parse())
+    """
+
+    # The passes, each with the level that runs it and the method that runs it
+    PASSES = (
+        ('constant folding', 1, 'fold_constants'),
+        ('dead branches', 1, 'remove_dead_branches'),
+        (HOISTING, 2, 'hoist_invariants'),
+    )
+
+    def __init__(self, level=2, lines=None):
+        if level not in LEVELS:
+            raise ValueError(f'Unknown optimization level: {level}')
+        self.level = level
+
+        # Line index of the source, used to report line and column numbers in errors
+        self.lines = lines
+
+        # The number of nodes each pass removed, by its name, in the order they ran
+        self.removed = {}
+
+        # The nodes removed by the running pass
+        self.count = 0
+
+        # The number of expressions moved out of loops, which are not counted as removed
+        self.hoisted = 0
+
+        # Variables of the program and the types of its expressions, as of the last pass
+        self.resolution = None
+        self.typing = None
+
+        # Number of variables added by hoisting, which names the next one
+        self.added = 0
+
+
+    def optimize(self, statements):
+        """
+        Optimizes a program.
+
+        Args:
+            statements (list): The statements of the program, as returned by CodeGoParser.parse().
+
+        Returns:
+            list: The statements of the optimized program.
+
+        Raises:
+            CompileError: If the program uses an undeclared variable, or has a type error.
+        """
+
+        if self.level == 0:
+            return statements
+        self.check(statements)
+        for name, level, method in self.PASSES:
+            if level > self.level:
+                break
+            self.count = 0
+            result = getattr(self, method)(statements)
+            if result is not statements:
+                try:
+                    self.check(result)
+                except CompileError:
+                    self.check(statements)
+                    result = statements
+                    self.count = 0
+                    if name == HOISTING:
+                        self.hoisted = 0
+            statements = result
+            self.removed[name] = self.count
+        return statements
+
+
+    def check(self, statements):
+        """ Resolves the variables and checks the types of a program """
+        self.resolution = Resolver(self.lines).resolve(statements)
+        self.typing = TypeChecker(self.resolution, self.lines).check(statements)
+
+
+    # Constant folding
+
+    def fold_constants(self, statements):
+        return rebuild(statements, self.fold)
+
+
+    def fold(self, original, node):
+        """ Replaces an operation on literals with its value """
+        kind = type(node)
+        if kind is BinaryOp and type(node.left) is Literal and type(node.right) is Literal:
+            value = evaluate(node.operator, literal_value(node.left), literal_value(node.right))
+            folded = make_literal(value, node.offset) if value is not None else None
+            if folded is not None:
+                self.count += 2
+                return folded
+        elif kind is UnaryOp and type(node.operand) is Literal:
+            value = literal_value(node.operand)
+            folded = make_literal(-value, node.offset) if type(value) is int or type(value) is float else None
+            if folded is not None:
+                self.count += 1
+                return folded
+        return node
+
+
+    # Dead branches
+
+    def remove_dead_branches(self, statements):
+        return rebuild(statements, self.prune)
+
+
+    def prune(self, original, value):
+        """ Drops the Kung and Habang statements of a block whose conditions are literals """
+        if type(value) is not list:
+            return value
+        result = []
+        for statement in value:
+            kind = type(statement)
+            if (kind is KungStatement or kind is HabangStatement) and type(statement.condition) is Literal:
+                if not literal_value(statement.condition):
+                    self.count += count_nodes(statement)
+                    continue
+                if kind is KungStatement and not any(type(item) is VarDeclaration or type(item) is GawaDeclaration
+                                                     for item in statement.statements):
+                    # Its body runs in place, without the Kung and its condition
+                    self.count += 2
+                    result += statement.statements
+                    continue
+            result.append(statement)
+        if len(result) == len(value) and all(item is old for item, old in zip(result, value)):
+            return value
+        return result
+
+
+    # Loop-invariant hoisting
+
+    def hoist_invariants(self, statements):
+        resolution, typing = self.resolution, self.typing
+
+        # The loops of the program, outer ones first, with whether they are in a Gawa,
+        # and the global variables that a Gawa assigns
+        loops = []
+        assigned_by_gawa = set()
+        work = [(statement, False) for statement in reversed(statements)]
+        while work:
+            statement, in_gawa = work.pop()
+            kind = type(statement)
+            if kind is HabangStatement or kind is BawatStatement:
+                loops.append((statement, in_gawa))
+            elif kind is Assignment and in_gawa:
+                binding_kind, slot = resolution.binding(statement)
+                if binding_kind == GLOBAL:
+                    assigned_by_gawa.add(resolution.program.names[slot])
+            inner = in_gawa or kind is GawaDeclaration
+            for block in reversed(blocks(statement)):
+                work.extend((item, inner) for item in reversed(block))
+
+        # The expressions to move out of each loop, by id() of the loop, and the
+        # variable each of them is moved into, by id() of the expression
+        hoisted = {}
+        names = {}
+        for loop, in_gawa in loops:
+            for expression in self.invariants(loop, in_gawa, assigned_by_gawa, names):
+                name = names[id(expression)] = f'$inv{self.added}'
+                self.added += 1
+                kind = declared_type(typing.types[id(expression)])
+                hoisted.setdefault(id(loop), []).append((kind, name, expression))
+        if not hoisted:
+            return statements
+
+        values = {}
+
+        def replace(original, value):
+            name = names.get(id(original))
+            if name is not None:
+                values[id(original)] = value
+                self.hoisted += 1
+                return Identifier(name, original.offset)
+            if type(original) is not list or not any(id(item) in hoisted for item in original):
+                return value
+            result = []
+            for item, new in zip(original, value):
+                for kind, name, expression in hoisted.get(id(item), ()):
+                    result.append(VarDeclaration(kind, name, values[id(expression)], item.offset))
+                result.append(new)
+            return result
+
+        return rebuild(statements, replace)
+
+
+    def invariants(self, loop, in_gawa, assigned_by_gawa, names):
+        """
+        Returns the largest expressions in a loop that can be computed once
+        before it, skipping those already moved out of an outer loop (in `names`).
+        Only expressions that every run of its body evaluates are returned:
+        those of its condition and of the statements of its body, with the
+        conditions of the statements nested in it, but not their blocks.
+        """
+
+        resolution, typing = self.resolution, self.typing
+
+        # The declarations made or assigned in the loop, by id(), and the expressions its statements evaluate
+        changed = set()
+        roots = []
+        work = [loop]
+        while work:
+            statement = work.pop()
+            kind = type(statement)
+            if kind is GawaDeclaration:
+                changed.add(id(statement))
+                continue
+            if kind is VarDeclaration:
+                changed.add(id(statement))
+            elif kind is Assignment:
+                changed.update(id(declaration) for declaration in resolution.declarations_of(statement))
+            elif kind is BawatStatement:
+                changed.add(id(resolution.declarations[id(statement)][1]))
+            roots += expressions(statement)
+            for block in blocks(statement):
+                work.extend(block)
+
+        # The expressions evaluated every time the body runs. Of the Kaso values
+        # of a Kapag, only the first is sure to be compared.
+        always = expressions(loop)
+        for statement in blocks(loop)[0]:
+            if type(statement) is KapagStatement:
+                always += [statement.condition] + [case.case_expr for case in statement.cases[:1]]
+            else:
+                always += expressions(statement)
+
+        # The expressions of the loop, each before its operands, stopping at those already
+        # moved, and whether it calls a Gawa, which may assign global variables
+        nodes = []
+        stack = list(reversed(roots))
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            if id(node) not in names:
+                stack.extend(reversed(operands(node)))
+        calls = any(type(node) is FunctionInvocation and id(node) not in names
+                    and (type(node.function_name) is not str or resolution.binding(node)[0] != BUILTIN)
+                    for node in nodes)
+
+        # Whether each expression gives the same value, without failing, every
+        # time the loop runs it, by id(), found from the bottom up
+        types = typing.types
+        invariant = {}
+        for node in reversed(nodes):
+            kind = type(node)
+            if id(node) in names or kind is Literal:
+                # Moved into a variable before an outer loop, which this loop does not assign
+                result = True
+            elif kind is Identifier:
+                binding_kind, _ = resolution.binding(node)
+                result = (binding_kind == LOCAL and id(resolution.declarations[id(node)]) not in changed
+                          and not (calls and not in_gawa and node.name in assigned_by_gawa))
+            elif kind is BinaryOp:
+                result = (invariant[id(node.left)] and invariant[id(node.right)]
+                          and never_fails(node.operator, types.get(id(node.left)), types.get(id(node.right)),
+                                          node.right))
+            elif kind is UnaryOp:
+                operand = types.get(id(node.operand))
+                result = invariant[id(node.operand)] and bool(operand) and operand <= NUMBERS
+            else:
+                result = False
+            invariant[id(node)] = result
+
+        # The largest invariant operations, found from the top down
+        found = []
+        stack = list(reversed(always))
+        while stack:
+            node = stack.pop()
+            if id(node) in names:
+                continue
+            kind = type(node)
+            if ((kind is BinaryOp or kind is UnaryOp) and invariant[id(node)]
+                    and declared_type(types.get(id(node))) is not None):
+                found.append(node)
+                continue
+            stack.extend(reversed(operands(node)))
+        return found
+
+
+def optimize(statements, level=2, lines=None):
+    """
+    Optimizes a program.
+
+    Args:
+        statements (list): The statements, as returned by CodeGoParser.parse().
+        level (int): The optimization level, one of LEVELS.
+        lines (LineIndex): The line index of the source, for error messages. Optional.
+
+    Returns:
+        tuple: The statements of the optimized program, and the number of nodes
+            each pass removed, by its name.
+
+    Raises:
+        CompileError: If the program uses an undeclared variable, or has a type error.
+    """
+    optimizer = Optimizer(level, lines)
+    return optimizer.optimize(statements), optimizer.removed
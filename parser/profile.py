@@ -0,0 +1,164 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from types import GeneratorType
+
+
+class Profiler:
+    """
+    Collects per-phase timings and grammar rule statistics for one compilation.
+
+    Phases (e.g. read, tokenize, parse, emit) are timed with `phase()`, which
+    records wall time, CPU time and, if enabled, the peak memory allocated during
+    the phase. `instrument()` wraps the grammar rules of a CodeGoParser so that
+    every call is counted and timed. Nothing is wrapped or traced unless a
+    Profiler is used, so compilation without one pays no overhead.
+
+    Example:
+        profiler = Profiler()
+        with profiler.phase('parse'):
+            ast = profiler.instrument(CodeGoParser(tokens)).parse()
+        print(profiler.report())
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+
+        # Phase name -> [wall seconds, CPU seconds, peak bytes or None], in order.
+        # Phases entered more than once are added up.
+        self.phases = {}
+
+        # Rule name -> [calls, cumulative wall seconds]
+        self.rules = {}
+
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the enclosed block as a compilation phase.
+
+        Entering the same phase again adds to its times and keeps the highest peak.
+
+        Args:
+            name (str): The phase name.
+        """
+
+        tracing = self.memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.memory:
+            tracemalloc.reset_peak()
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            peak = tracemalloc.get_traced_memory()[1] if self.memory else None
+            if tracing:
+                tracemalloc.stop()
+
+            stats = self.phases.setdefault(name, [0.0, 0.0, None])
+            stats[0] += wall
+            stats[1] += cpu
+            if peak is not None:
+                stats[2] = max(stats[2] or 0, peak)
+
+
+    def instrument(self, parser):
+        """
+        Wraps every grammar rule of a parser to count calls and time them.
+
+        Times are cumulative: a rule's time includes the rules it calls, except
+        for the statements inside the blocks of block statements, which the
+        parser runs separately.
+
+        Args:
+            parser (CodeGoParser): The parser to instrument.
+
+        Returns:
+            CodeGoParser: The same parser.
+        """
+
+        parser.rules = {name: self.wrap(name, rule) for name, rule in parser.rules.items()}
+        return parser
+
+
+    def wrap(self, name, rule):
+        """ Returns `rule` wrapped to record its calls under `name` """
+        stats = self.rules.setdefault(name, [0, 0.0])
+        clock = time.perf_counter
+
+        def timed(parser, *args):
+            start = clock()
+            try:
+                result = rule(parser, *args)
+            finally:
+                stats[0] += 1
+                stats[1] += clock() - start
+            if type(result) is GeneratorType:
+                return timed_steps(result)
+            return result
+
+        def timed_steps(generator):
+            # Block statements run in steps between their blocks (see
+            # CodeGoParser.statements), so only the steps themselves are timed
+            value = None
+            while True:
+                start = clock()
+                try:
+                    request = generator.send(value)
+                except StopIteration as stop:
+                    stats[1] += clock() - start
+                    return stop.value
+                stats[1] += clock() - start
+                value = yield request
+
+        return timed
+
+
+    def to_dict(self):
+        """ Returns the collected statistics as a JSON-serializable dictionary """
+        return {
+            'phases': [
+                {'name': name, 'wall_seconds': wall, 'cpu_seconds': cpu, 'peak_bytes': peak}
+                for name, (wall, cpu, peak) in self.phases.items()
+            ],
+            'rules': {
+                name: {'calls': calls, 'cumulative_seconds': seconds}
+                for name, (calls, seconds) in sorted(self.rules.items(), key=lambda item: -item[1][1])
+                if calls
+            },
+        }
+
+
+    def report(self, format='table'):
+        """
+        Formats the collected statistics.
+
+        Args:
+            format (str): 'table' for a text table or 'json'.
+
+        Returns:
+            str: The report.
+        """
+
+        data = self.to_dict()
+        if format == 'json':
+            return json.dumps(data, indent=2)
+
+        lines = ['Profile:', f"{'phase':<12} {'wall ms':>10} {'cpu ms':>10} {'peak KB':>10}"]
+        for phase in data['phases']:
+            peak = '-' if phase['peak_bytes'] is None else f"{phase['peak_bytes'] / 1024:,.0f}"
+            lines.append(f"{phase['name']:<12} {phase['wall_seconds'] * 1000:>10,.2f} "
+                         f"{phase['cpu_seconds'] * 1000:>10,.2f} {peak:>10}")
+
+        if data['rules']:
+            lines.append('')
+            lines.append(f"{'rule':<22} {'calls':>10} {'cumulative ms':>14}")
+            for name, rule in data['rules'].items():
+                lines.append(f"{name:<22} {rule['calls']:>10,} {rule['cumulative_seconds'] * 1000:>14,.2f}")
+        return '\n'.join(lines)
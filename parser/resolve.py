@@ -0,0 +1,353 @@
+from .errors import CompileError
+from .nodes import (
+    Assignment, BawatStatement, BinaryOp, ExpressionStatement, FunctionInvocation, GawaDeclaration,
+    HabangStatement, Identifier, KapagStatement, KungStatement, ListLiteral, ObjectLiteral, PropertyAccess,
+    UnaryOp, VarDeclaration,
+)
+
+# Where a resolved name lives: a slot of the running function (or, at the top
+# level, of the program), a slot of the program, or among the built-in functions
+LOCAL, GLOBAL, BUILTIN = range(3)
+
+# Names of the built-in functions
+BUILTINS = frozenset(('print',))
+
+# Kinds of work items of Resolver.resolve()
+_STATEMENT, _EXPRESSION, _DECLARE, _ENTER_BLOCK, _LEAVE_BLOCK, _ENTER_GAWA, _LEAVE_GAWA = range(7)
+
+
+class Scope:
+    """
+    The variables of a Gawa, or of the program: one slot per name, numbered in
+    the order of their first declaration, parameters first.
+
+    Attributes:
+        names (list): The name of each slot.
+        slots (dict): The slot of each name.
+        globals_used (set): The global variables a Gawa uses.
+    """
+
+    __slots__ = ('names', 'slots', 'globals_used')
+
+    def __init__(self):
+        self.names = []
+        self.slots = {}
+        self.globals_used = set()
+
+
+    def slot(self, name):
+        """ Returns the slot of a name, adding one if needed """
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = self.slots[name] = len(self.names)
+            self.names.append(name)
+        return slot
+
+
+    def __len__(self):
+        return len(self.names)
+
+
+class Resolution:
+    """
+    Where every name in a program refers to, as found by Resolver.
+
+    Attributes:
+        program (Scope): The global variables; the top level of the program runs
+            with these as its local slots.
+        scopes (dict): The Scope of each GawaDeclaration, by id().
+        bindings (dict): The (kind, slot) of the name of each Identifier,
+            Assignment, VarDeclaration, GawaDeclaration and FunctionInvocation
+            calling a name, by id(); kind is LOCAL, GLOBAL or BUILTIN, and the slot
+            of a BUILTIN is its name. A BawatStatement has a pair of them: that of
+            its iterable, then that of its iterator.
+        declarations (dict): The declaration a LOCAL name refers to, by id() of
+            the node using it, or None for a GLOBAL or BUILTIN name; a pair for a
+            BawatStatement, like bindings. A declaration is a VarDeclaration, a
+            Parameter, a GawaDeclaration, or the BawatStatement of an iterator.
+        globals (dict): The declarations of each global variable, by name; a
+            GLOBAL name may refer to any of them.
+    """
+
+    __slots__ = ('program', 'scopes', 'bindings', 'declarations', 'globals')
+
+    def __init__(self, program, scopes, bindings, declarations, globals_):
+        self.program = program
+        self.scopes = scopes
+        self.bindings = bindings
+        self.declarations = declarations
+        self.globals = globals_
+
+
+    def binding(self, node):
+        """ Returns the (kind, slot) of the name of a node """
+        return self.bindings[id(node)]
+
+
+    def scope(self, node):
+        """ Returns the Scope of a GawaDeclaration """
+        return self.scopes[id(node)]
+
+
+    def declarations_of(self, node):
+        """ Returns the declarations the name of a node may refer to, in a list; empty for a built-in """
+        kind, slot = self.bindings[id(node)]
+        if kind == BUILTIN:
+            return []
+        if kind == GLOBAL:
+            return self.globals[self.program.names[slot]]
+        return [self.declarations[id(node)]]
+
+
+class Resolver:
+    """
+    Resolves every variable of a program to a slot, in one pass over its
+    syntax tree, and reports undeclared and redeclared variables.
+
+    A program has one scope for its global variables and one per Gawa; each
+    name declared in a scope gets one slot, so running code keeps its
+    variables in flat lists instead of dicts. A variable can be used after
+    its declaration, in the same block or a block inside it; a Bawat
+    iterator, inside the loop. Declaring a variable again where it can be
+    used is an error, but blocks that do not contain each other can declare
+    the same name, which shares its slot. A Gawa sees its parameters and
+    local variables and every global variable of the program, as it may run
+    after any of them is declared; VM and Python code check at run time that
+    a global variable used by a Gawa has been declared.
+
+    Usage:
+        resolution = Resolver(lines).resolve(CodeGoParser(tokens, lines).parse())
+    """
+
+    def __init__(self, lines=None):
+        # Line index of the source, used to report line and column numbers in errors
+        self.lines = lines
+
+        self.program = Scope()
+        self.scopes = {}
+        self.bindings = {}
+        self.declarations = {}
+        self.globals = {}
+
+        # The scope being resolved, None at the top level, and the scopes it is nested in
+        self.scope = None
+        self.outer_scopes = []
+
+        # The declaration of each variable that can be used at this point of
+        # the current scope, and the names declared in each open block
+        self.visible = {}
+        self.blocks = []
+        self.outer_visible = []
+
+
+    def resolve(self, statements):
+        """
+        Resolves the variables of a program.
+
+        Args:
+            statements (list): The statements of the program, as returned by CodeGoParser.parse().
+
+        Returns:
+            Resolution: Where each name refers to.
+
+        Raises:
+            CompileError: If a variable is used where it is not declared, or declared twice.
+        """
+
+        self.declare_globals(statements)
+        work = [(_STATEMENT, statement) for statement in reversed(statements)]
+        while work:
+            item = work.pop()
+            kind = item[0]
+            if kind == _STATEMENT:
+                work.extend(reversed(self.statement(item[1])))
+            elif kind == _EXPRESSION:
+                work.extend(self.expression(item[1]))
+            elif kind == _DECLARE:
+                self.declare(item[1], item[2], item[3])
+            elif kind == _ENTER_BLOCK:
+                self.blocks.append([])
+            elif kind == _LEAVE_BLOCK:
+                for name in self.blocks.pop():
+                    del self.visible[name]
+            elif kind == _ENTER_GAWA:
+                self.enter_gawa(item[1])
+            else:
+                self.scope = self.outer_scopes.pop()
+                self.visible, self.blocks = self.outer_visible.pop()
+        return Resolution(self.program, self.scopes, self.bindings, self.declarations, self.globals)
+
+
+    def declare_globals(self, statements):
+        """ Gives a slot to every variable declared at the top level, in blocks or not, but not in a Gawa """
+        work = list(reversed(statements))
+        while work:
+            statement = work.pop()
+            kind = type(statement)
+            if kind is VarDeclaration:
+                self.declare_global(statement, statement.identifier)
+            elif kind is GawaDeclaration:
+                self.declare_global(statement, statement.name)
+            elif kind is BawatStatement:
+                # Counted even if the loop reuses a variable: a GLOBAL name may refer to more than it does
+                self.declare_global(statement, statement.iterator)
+                work.extend(reversed(statement.body))
+            elif kind is KungStatement or kind is HabangStatement:
+                work.extend(reversed(statement.statements))
+            elif kind is KapagStatement:
+                for case in reversed(statement.cases):
+                    work.extend(reversed(case.case_statements))
+
+
+    def declare_global(self, node, name):
+        self.program.slot(name)
+        self.globals.setdefault(name, []).append(node)
+
+
+    def error(self, message, name, offset):
+        """ Returns a CompileError about a name """
+        return CompileError(f'{message}: {name} {self.where(offset)}')
+
+
+    def where(self, offset):
+        return f'on {self.lines.describe(offset)}' if self.lines is not None else f'at offset {offset}'
+
+
+    def current(self):
+        """ Returns the scope that declarations go to """
+        return self.program if self.scope is None else self.scope
+
+
+    def declare(self, node, name, offset):
+        """ Declares a variable in the current block, binding the node to its slot """
+        previous = self.visible.get(name)
+        if previous is not None:
+            raise CompileError(f'Redeclared variable: {name} {self.where(offset)}, '
+                               f'already declared {self.where(previous.offset)}')
+        self.visible[name] = node
+        if self.blocks:
+            self.blocks[-1].append(name)
+        self.bindings[id(node)] = (LOCAL, self.current().slot(name))
+
+
+    def lookup(self, name, offset):
+        """ Returns the (kind, slot) of a variable used at an offset, and its declaration if it is LOCAL """
+        declaration = self.visible.get(name)
+        if declaration is not None:
+            return (LOCAL, self.current().slots[name]), declaration
+        if self.scope is not None and name in self.program.slots:
+            self.scope.globals_used.add(name)
+            return (GLOBAL, self.program.slots[name]), None
+        if name in BUILTINS:
+            return (BUILTIN, name), None
+        raise self.error('Undeclared variable', name, offset)
+
+
+    def use(self, node, name):
+        """ Binds the name a node uses """
+        self.bindings[id(node)], self.declarations[id(node)] = self.lookup(name, node.offset)
+
+
+    def enter_gawa(self, node):
+        """ Starts the scope of a Gawa, with its parameters declared """
+        scope = self.scopes[id(node)] = Scope()
+        self.outer_scopes.append(self.scope)
+        self.outer_visible.append((self.visible, self.blocks))
+        self.scope = scope
+        self.visible = {}
+        self.blocks = []
+        for parameter in node.parameters:
+            self.declare(parameter, parameter.name, parameter.offset)
+
+
+    def block(self, statements):
+        """ Returns the work items of a block of statements """
+        return ([(_ENTER_BLOCK,)]
+                + [(_STATEMENT, statement) for statement in statements]
+                + [(_LEAVE_BLOCK,)])
+
+
+    def statement(self, node):
+        """ Resolves what a statement uses now, and returns the work items of the rest, in order """
+        kind = type(node)
+        if kind is VarDeclaration:
+            # The value is resolved before the variable exists: Numero x = x + 1 uses an outer x
+            items = [(_EXPRESSION, node.expression)] if node.expression is not None else []
+            return items + [(_DECLARE, node, node.identifier, node.offset)]
+        if kind is Assignment:
+            self.use(node, node.identifier)
+            return [(_EXPRESSION, node.expression)]
+        if kind is ExpressionStatement:
+            return [(_EXPRESSION, node.expression)]
+        if kind is FunctionInvocation:
+            return [(_EXPRESSION, node)]
+        if kind is KungStatement or kind is HabangStatement:
+            return [(_EXPRESSION, node.condition)] + self.block(node.statements)
+        if kind is BawatStatement:
+            iterable, declaration = self.lookup(node.iterable, node.offset)
+            iterator = self.visible.get(node.iterator)
+            if iterator is not None:
+                # An existing variable is reused as the iterator
+                self.bindings[id(node)] = (iterable, (LOCAL, self.current().slots[node.iterator]))
+                self.declarations[id(node)] = (declaration, iterator)
+                return self.block(node.body)
+            self.blocks.append([node.iterator])
+            self.visible[node.iterator] = node
+            self.bindings[id(node)] = (iterable, (LOCAL, self.current().slot(node.iterator)))
+            self.declarations[id(node)] = (declaration, node)
+            return self.block(node.body) + [(_LEAVE_BLOCK,)]
+        if kind is KapagStatement:
+            items = [(_EXPRESSION, node.condition)]
+            for case in node.cases:
+                items += [(_EXPRESSION, case.case_expr)] + self.block(case.case_statements)
+            return items
+        if kind is GawaDeclaration:
+            # The name is declared after the body: a Gawa only calls itself through a global variable
+            return ([(_ENTER_GAWA, node)]
+                    + [(_STATEMENT, statement) for statement in node.body]
+                    + [(_LEAVE_GAWA,), (_DECLARE, node, node.name, node.offset)])
+        return []
+
+
+    def expression(self, node):
+        """ Resolves the names an expression uses now, and returns the work items of its operands """
+        kind = type(node)
+        if kind is Identifier:
+            self.use(node, node.name)
+            return []
+        if kind is BinaryOp:
+            return [(_EXPRESSION, node.left), (_EXPRESSION, node.right)]
+        if kind is UnaryOp:
+            return [(_EXPRESSION, node.operand)]
+        if kind is PropertyAccess:
+            return [(_EXPRESSION, node.object)]
+        if kind is FunctionInvocation:
+            items = [(_EXPRESSION, argument) for argument in node.arguments]
+            if type(node.function_name) is str:
+                self.use(node, node.function_name)
+            else:
+                items.append((_EXPRESSION, node.function_name))
+            return items
+        if kind is ListLiteral:
+            return [(_EXPRESSION, item) for item in node.items]
+        if kind is ObjectLiteral:
+            return [(_EXPRESSION, value) for value in node.properties.values()]
+        # A literal, or a block used as a value, which the compilers report
+        return []
+
+
+def resolve(statements, lines=None):
+    """
+    Resolves the variables of a program to slots.
+
+    Args:
+        statements (list): The statements, as returned by CodeGoParser.parse().
+        lines (LineIndex): The line index of the source, for error messages. Optional.
+
+    Returns:
+        Resolution: Where each name refers to.
+
+    Raises:
+        CompileError: If a variable is used where it is not declared, or declared twice.
+    """
+    return Resolver(lines).resolve(statements)
@@ -0,0 +1,724 @@
+import gc
+import io
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, chain, groupby, islice, repeat
+from operator import attrgetter, itemgetter
+
+from .nodes import (
+    Assignment, BawatStatement, BinaryOp, Comment, ExpressionStatement, FunctionInvocation, GawaDeclaration,
+    HabangStatement, Identifier, KapagStatement, KasoClause, KungStatement, ListLiteral, Literal, ObjectLiteral,
+    Parameter, PropertyAccess, UnaryOp, VarDeclaration,
+)
+
+# Compact binary form of syntax trees.
+#
+# A file is the header (MAGIC and a VERSION byte), then blocks of top-level
+# statements, each starting with a BLOCK tag, then an END tag. Every value in
+# a block is referred to by a number, its id:
+#
+#   - The scalars of the file (None, booleans, strings, ints and floats) form a
+#     table, which each block extends with the scalars it is the first to use.
+#     Ids 0, 1 and 2 are None, True and False, and every scalar is stored once.
+#   - The nodes, lists and dicts of the block come next, in groups of values of
+#     the same kind and height (the longest path from them down to a scalar),
+#     lowest first. A value only refers to scalars and to values of earlier
+#     groups, so each group can be built at once from those before it.
+#
+# A block is laid out as:
+#
+#   BLOCK
+#   column      the kind of each of its new scalars: string, int, big int or float
+#   column      the lengths of its new strings, in characters
+#   varint      the length of the new strings in UTF-8, then the strings
+#   column      its new ints that fit in 64 bits, signed
+#   varint      the number of its other new ints, then each as a zigzag varint
+#   varint      the number of its new floats, then each as a little-endian double
+#   column      the tag of each group: NODE + the code of its class, LIST or DICT
+#   column      the number of values in each group
+#   column      the offsets of the nodes, group after group
+#   column      the lengths of the lists and dicts, group after group
+#   column      ids, group after group: for a group of nodes, those of their
+#               first fields, then those of their second fields, and so on in
+#               _fields order; for lists, those of their items; for dicts,
+#               those of their keys, then those of their values
+#   column      the ids of the statements of the block
+#
+# The new scalars are added to the table in the order of the kinds column,
+# each taken from the next of its kind. A column is a byte
+# giving the size of its numbers (1, 2, 4 or 8), a varint count and the
+# numbers as little-endian ints, so it is read with a single array.frombytes().
+# Each group is then built with map() over slices of the columns, which runs
+# the node constructors without a Python loop per value; that is what makes
+# loading faster than parsing the source again or loading JSON.
+
+MAGIC = b'CGAST'
+
+# Incremented whenever the encoding or NODE_CLASSES change
+VERSION = 2
+
+END = 0
+BLOCK = 1
+LIST = 2
+DICT = 3
+NODE = 32
+
+# Node classes by code; new classes are only ever added at the end
+NODE_CLASSES = (
+    VarDeclaration, Assignment, ExpressionStatement, Comment, KungStatement, HabangStatement, BawatStatement,
+    KapagStatement, KasoClause, GawaDeclaration, Parameter, FunctionInvocation, BinaryOp, UnaryOp,
+    PropertyAccess, ListLiteral, ObjectLiteral, Identifier, Literal,
+)
+NODE_CODES = {cls: NODE + code for code, cls in enumerate(NODE_CLASSES)}
+
+# Number of fields of each node tag
+_ARITY = tuple(len(cls._fields) for cls in NODE_CLASSES)
+
+# Tags of the values that are not scalars, by class
+_TAGS = {**NODE_CODES, list: LIST, dict: DICT}
+
+# Getters of the fields of each node class and then its offset
+_GETTERS = {cls: attrgetter(*cls._fields, 'offset') for cls in NODE_CLASSES}
+
+# The scalars every table starts with
+PRESET_SCALARS = (None, True, False)
+
+# Events yielded by walk()
+NODE_EVENT = 0
+LIST_EVENT = 1
+DICT_EVENT = 2
+VALUE_EVENT = 3
+
+# The writer passes its output to the file in chunks of at least this many bytes
+CHUNK_SIZE = 1 << 16
+
+# A block is ended once its statements hold at least this many nodes, lists and
+# dicts, which bounds the memory walk() needs for the columns of a block
+BLOCK_SIZE = 1 << 11
+
+_DOUBLE = struct.Struct('<d')
+
+# Array type codes of unsigned and signed ints by their size in bytes
+_UNSIGNED = {array(code).itemsize: code for code in 'QLIHB'}
+_SIGNED = {array(code).itemsize: code for code in 'qlihb'}
+_SIZES = (1, 2, 4, 8)
+_SWAP = sys.byteorder == 'big'
+
+# Kinds of scalars in the kinds column of a block: strings, ints that fit in 64 bits, other ints, floats
+_STRING, _INT, _BIG_INT, _FLOAT = range(4)
+_INT_LIMIT = 1 << 63
+
+
+class ASTWriter:
+    """
+    Writes syntax trees in the binary form, one top-level statement at a time.
+
+    Statements are collected into a block, which is encoded once it holds
+    BLOCK_SIZE nodes, lists and dicts, or when the writer is closed.
+
+    Usage:
+        with open('program.cgast', 'wb') as file:
+            writer = ASTWriter(file)
+            for statement in parser.iter_statements():
+                writer.write(statement)
+            writer.close()
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = bytearray(MAGIC)
+        self.buffer.append(VERSION)
+
+        # The id of every string, int and float written so far, by its value,
+        # or for a float by its packed bytes, so that 1 and 1.0 or 0.0 and -0.0
+        # are kept apart. A scalar takes the next id of the table when it is
+        # first found, and is kept in new_scalars until its block is ended.
+        self.scalars = {}
+        self.table_size = len(PRESET_SCALARS)
+        self.new_scalars = []
+
+        # The unfinished block: the tag, offset (None for a list or dict),
+        # height and part references of each of its nodes, lists and dicts, by
+        # its position, parents before their parts; and the references to its
+        # statements. A scalar is referred to by its id, and a node, list or
+        # dict by -1 - its position.
+        self.tags = []
+        self.offsets = []
+        self.heights = []
+        self.references = []
+        self.statements = []
+
+
+    def write(self, value):
+        """
+        Writes a top-level statement.
+
+        Args:
+            value: A node, or any value found in a syntax tree.
+
+        Raises:
+            TypeError: If the value contains something that is not part of a syntax tree.
+        """
+
+        container_tags = _TAGS
+        getters = _GETTERS
+        scalars = self.scalars
+        scalar = self.scalar
+        tags = self.tags
+        offsets = self.offsets
+        all_references = self.references
+        first = len(tags)
+
+        if value.__class__ not in container_tags:
+            self.statements.append(scalar(value))
+            return
+
+        # Each node, list or dict is given its position when it is popped,
+        # which it then puts in the references of its parent
+        parents = []
+        stack = [(value, None, 0, -1)]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            value, parent, slot, parent_position = pop()
+            position = len(tags)
+            if parent is not None:
+                parent[slot] = -1 - position
+            parents.append(parent_position)
+
+            cls = value.__class__
+            tag = container_tags[cls]
+            tags.append(tag)
+            if tag >= NODE:
+                parts = getters[cls](value)
+                offsets.append(parts[-1])
+                parts = parts[:-1]
+            else:
+                offsets.append(None)
+                parts = value if tag == LIST else [part for item in value.items() for part in item]
+
+            references = []
+            all_references.append(references)
+            for part in parts:
+                cls = part.__class__
+                if cls is str or cls is int:
+                    reference = scalars.get(part)
+                    if reference is None:
+                        reference = scalar(part)
+                elif cls in container_tags:
+                    push((part, references, len(references), position - first))
+                    reference = 0
+                else:
+                    reference = scalar(part)
+                references.append(reference)
+
+        # Parts come after their parents, so going backwards every height is
+        # final before it is passed on
+        heights = [1] * len(parents)
+        for index in range(len(parents) - 1, 0, -1):
+            parent = parents[index]
+            if heights[index] >= heights[parent]:
+                heights[parent] = heights[index] + 1
+        self.heights += heights
+
+        self.statements.append(-1 - first)
+        if len(tags) >= BLOCK_SIZE:
+            self.end_block()
+        if len(self.buffer) >= CHUNK_SIZE:
+            self.flush()
+
+
+    def scalar(self, value):
+        """ Returns the id of a scalar, adding it to the block if it is new """
+        cls = value.__class__
+        if cls is bool or value is None:
+            return PRESET_SCALARS.index(value)
+        if cls is str:
+            kind = _STRING
+        elif cls is int:
+            kind = _INT if -_INT_LIMIT <= value < _INT_LIMIT else _BIG_INT
+        elif cls is float:
+            kind = _FLOAT
+            value = _DOUBLE.pack(value)
+        else:
+            raise TypeError(f'Cannot serialize {cls.__name__} in a syntax tree')
+        index = self.scalars.get(value)
+        if index is None:
+            index = self.scalars[value] = self.table_size
+            self.table_size += 1
+            self.new_scalars.append((kind, value))
+        return index
+
+
+    def end_block(self):
+        """ Encodes the statements written since the last block """
+        if not self.statements:
+            return
+        out = self.buffer
+
+        # The new scalars, in the order of their ids
+        new = self.new_scalars
+        out.append(BLOCK)
+        _write_column(out, [kind for kind, _ in new])
+        strings = [value for kind, value in new if kind == _STRING]
+        _write_column(out, [len(value) for value in strings])
+        data = ''.join(strings).encode('utf-8', 'surrogatepass')
+        _write_varint(out, len(data))
+        out += data
+        _write_column(out, [value for kind, value in new if kind == _INT], _SIGNED)
+        numbers = [value for kind, value in new if kind == _BIG_INT]
+        _write_varint(out, len(numbers))
+        for value in numbers:
+            _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+        numbers = [value for kind, value in new if kind == _FLOAT]
+        _write_varint(out, len(numbers))
+        out += b''.join(numbers)
+
+        # The nodes, lists and dicts in the order of their groups, and their
+        # ids backwards, so that a reference -1 - position indexes its id
+        keys = [height << 8 | tag for height, tag in zip(self.heights, self.tags)]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        ids = [0] * len(order)
+        for position, index in enumerate(order, self.table_size):
+            ids[index] = position
+        ids.reverse()
+
+        all_references = self.references
+        group_tags = []
+        sizes = []
+        offsets = []
+        lengths = []
+        parts_ids = []
+        for key, indices in groupby(order, keys.__getitem__):
+            tag = key & 0xFF
+            indices = list(indices)
+            members = list(map(all_references.__getitem__, indices))
+            group_tags.append(tag)
+            sizes.append(len(members))
+            if tag >= NODE:
+                offsets += map(self.offsets.__getitem__, indices)
+                for field in range(_ARITY[tag - NODE]):
+                    parts_ids += map(itemgetter(field), members)
+            elif tag == LIST:
+                lengths += map(len, members)
+                parts_ids += chain.from_iterable(members)
+            else:
+                lengths += [len(parts) // 2 for parts in members]
+                parts_ids += chain.from_iterable(map(itemgetter(slice(0, None, 2)), members))
+                parts_ids += chain.from_iterable(map(itemgetter(slice(1, None, 2)), members))
+        _write_column(out, group_tags)
+        _write_column(out, sizes)
+        _write_column(out, offsets)
+        _write_column(out, lengths)
+        _write_column(out, [ids[reference] if reference < 0 else reference for reference in parts_ids])
+        _write_column(out, [ids[reference] if reference < 0 else reference for reference in self.statements])
+
+        self.new_scalars = []
+        self.tags = []
+        self.offsets = []
+        self.heights = []
+        self.references = []
+        self.statements = []
+
+
+    def flush(self):
+        """ Passes the buffered output to the file """
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer = bytearray()
+
+
+    def close(self):
+        """ Ends the statements and flushes the output; the file itself is left open """
+        self.end_block()
+        self.buffer.append(END)
+        self.flush()
+
+
+def _write_varint(out, number):
+    """ Appends an unsigned integer in 7-bit groups, least significant first """
+    while number > 0x7f:
+        out.append(number & 0x7f | 0x80)
+        number >>= 7
+    out.append(number)
+
+
+def _write_column(out, numbers, typecodes=_UNSIGNED):
+    """ Appends a column of integers, in the smallest size that holds them all """
+    size = 1
+    if numbers:
+        if typecodes is _SIGNED:
+            largest = max(max(numbers), -1 - min(numbers)) * 2
+        else:
+            largest = max(numbers)
+        size = next(size for size in _SIZES if largest < 1 << size * 8)
+    column = array(typecodes[size], numbers)
+    if _SWAP:
+        column.byteswap()
+    out.append(size)
+    _write_varint(out, len(numbers))
+    out += column.tobytes()
+
+
+def dump(ast, file):
+    """
+    Writes a syntax tree to a binary file.
+
+    Args:
+        ast (list): The parsed statements.
+        file: A file opened for writing in binary mode.
+    """
+
+    writer = ASTWriter(file)
+    for statement in ast:
+        writer.write(statement)
+    writer.close()
+
+
+def dumps(ast):
+    """
+    Encodes a syntax tree.
+
+    Args:
+        ast (list): The parsed statements.
+
+    Returns:
+        bytes: The binary form of the tree.
+    """
+
+    file = io.BytesIO()
+    dump(ast, file)
+    return file.getvalue()
+
+
+# What decoding truncated or corrupt data can raise, besides ValueError: reading past
+# the end, a size, id or node code out of range, a node built with the wrong values or a
+# node used as a dict key, or a double cut short
+_DECODING_ERRORS = (IndexError, KeyError, TypeError, AttributeError, struct.error)
+_INVALID = 'Truncated or invalid CodeGo syntax tree'
+
+
+class _Block:
+    """ The columns of a block of a binary syntax tree, read by _Reader.block() """
+
+    __slots__ = ('scalars', 'tags', 'sizes', 'offsets', 'lengths', 'ids', 'statements')
+
+    def __init__(self, scalars, tags, sizes, offsets, lengths, ids, statements):
+        # The size of the scalar table with the scalars of the block, which is the first id of its groups
+        self.scalars = scalars
+        self.tags = tags
+        self.sizes = sizes
+        self.offsets = offsets
+        self.lengths = lengths
+        self.ids = ids
+        self.statements = statements
+
+
+    def groups(self):
+        """
+        Yields (tag, first id, size, offsets start, lengths start, ids start) for
+        each group, checking that its ids only refer to earlier values
+
+        Raises:
+            ValueError: If a group refers to itself or a later value, or the columns do not add up.
+        """
+
+        ids = self.ids
+        lengths = self.lengths
+        first = self.scalars
+        offset = length = position = 0
+        for tag, size in zip(self.tags, self.sizes):
+            if not size:
+                raise ValueError(_INVALID)
+            if tag >= NODE:
+                end = position + _ARITY[tag - NODE] * size
+                next_offset, next_length = offset + size, length
+            elif tag == LIST or tag == DICT:
+                end = position + sum(lengths[length:length + size]) * (tag - LIST + 1)
+                next_offset, next_length = offset, length + size
+            else:
+                raise ValueError(f'Invalid tag {tag} in syntax tree')
+            if end > position and max(ids[position:end]) >= first:
+                raise ValueError(_INVALID)
+            yield tag, first, size, offset, length, position
+            first += size
+            offset, length, position = next_offset, next_length, end
+
+        if (len(self.tags) != len(self.sizes) or offset != len(self.offsets) or length != len(lengths)
+                or position != len(ids) or self.statements and max(self.statements) >= first):
+            raise ValueError(_INVALID)
+
+
+class _Reader:
+    """ Decodes the blocks of a binary syntax tree one at a time """
+
+    def __init__(self, data):
+        if bytes(data[:len(MAGIC)]) != MAGIC:
+            raise ValueError('Not a CodeGo syntax tree')
+        if len(data) <= len(MAGIC) or data[len(MAGIC)] != VERSION:
+            raise ValueError('Unsupported CodeGo syntax tree version')
+        self.data = data
+        self.pos = len(MAGIC) + 1
+
+        # The scalar table, followed while a block is built by the values of the block
+        self.values = list(PRESET_SCALARS)
+
+
+    def column(self, typecodes=_UNSIGNED):
+        """ Reads a column """
+        data, pos = self.data, self.pos
+        size = data[pos]
+        column = array(typecodes[size])
+        count, pos = _read_varint(data, pos + 1)
+        end = pos + count * size
+        if end > len(data):
+            raise ValueError(_INVALID)
+        column.frombytes(data[pos:end])
+        if _SWAP:
+            column.byteswap()
+        self.pos = end
+        return column
+
+
+    def block(self):
+        """
+        Reads the next block, adding its new scalars to the table.
+
+        Returns:
+            _Block: Its columns, or None at the end of the data.
+        """
+
+        data = self.data
+        values = self.values
+        tag = data[self.pos]
+        if tag == END:
+            return None
+        if tag != BLOCK:
+            raise ValueError(f'Invalid tag {tag} in syntax tree')
+        self.pos += 1
+
+        kinds = self.column()
+        lengths = self.column()
+        size, pos = _read_varint(data, self.pos)
+        if pos + size > len(data):
+            raise ValueError(_INVALID)
+        text = str(data[pos:pos + size], 'utf-8', 'surrogatepass')
+        if sum(lengths) != len(text):
+            raise ValueError(_INVALID)
+        strings = map(text.__getitem__, map(slice, accumulate(lengths, initial=0), accumulate(lengths)))
+        self.pos = pos + size
+
+        ints = self.column(_SIGNED)
+        count, pos = _read_varint(data, self.pos)
+        big_ints = []
+        for _ in range(count):
+            number, pos = _read_varint(data, pos)
+            big_ints.append(~(number >> 1) if number & 1 else number >> 1)
+        count, pos = _read_varint(data, pos)
+        if pos + count * 8 > len(data):
+            raise ValueError(_INVALID)
+        floats = array('d')
+        floats.frombytes(data[pos:pos + count * 8])
+        if _SWAP:
+            floats.byteswap()
+        self.pos = pos + count * 8
+
+        # Each kind is taken in turn, as the kinds column says
+        if len(lengths) + len(ints) + len(big_ints) + len(floats) != len(kinds):
+            raise ValueError(_INVALID)
+        start = len(values)
+        values += map(next, map((strings, iter(ints), iter(big_ints), iter(floats)).__getitem__, kinds))
+        if len(values) - start != len(kinds):
+            raise ValueError(_INVALID)
+
+        column = self.column
+        return _Block(len(values), column(), column(), column(), column(), column(), column())
+
+
+    def statements(self):
+        """ Yields the top-level statements, building a block of them at a time """
+        values = self.values
+        get = values.__getitem__
+        try:
+            while True:
+                block = self.block()
+                if block is None:
+                    return
+                offsets, lengths, ids = block.offsets, block.lengths, block.ids
+                for tag, _, size, offset, length, position in block.groups():
+                    if tag >= NODE:
+                        # A column of ids per field, then the offsets, which come last in
+                        # the arguments of a node class
+                        end = position + _ARITY[tag - NODE] * size
+                        fields = [map(get, ids[start:start + size]) for start in range(position, end, size)]
+                        values += map(NODE_CLASSES[tag - NODE], *fields, offsets[offset:offset + size])
+                        continue
+                    # Each list or dict takes the next items of the group
+                    counts = lengths[length:length + size]
+                    total = sum(counts)
+                    items = map(get, ids[position:position + total])
+                    if tag == LIST:
+                        values += map(list, map(islice, repeat(items), counts))
+                    else:
+                        keys, items = items, map(get, ids[position + total:position + total * 2])
+                        values += map(dict, map(zip, map(islice, repeat(keys), counts),
+                                                map(islice, repeat(items), counts)))
+                statements = list(map(get, block.statements))
+                del values[block.scalars:]
+                yield from statements
+        except _DECODING_ERRORS:
+            raise ValueError(_INVALID) from None
+
+
+    def events(self):
+        """ Yields walk() events for every value, without building any node """
+        values = self.values
+        try:
+            while True:
+                block = self.block()
+                if block is None:
+                    return
+                groups = list(block.groups())
+                firsts = [group[1] for group in groups]
+                offsets, ids = block.offsets, block.ids
+
+                # The number of list items and dict keys before each list or dict
+                items = array('q', accumulate(block.lengths, initial=0))
+
+                stack = list(reversed(block.statements))
+                while stack:
+                    value = stack.pop()
+                    if value < block.scalars:
+                        yield (VALUE_EVENT, values[value], None)
+                        continue
+                    tag, first, size, offset, length, position = groups[bisect_right(firsts, value) - 1]
+                    index = value - first
+                    if tag >= NODE:
+                        yield (NODE_EVENT, NODE_CLASSES[tag - NODE], offsets[offset + index])
+                        start = position + index
+                        stack.extend(ids[start + field * size] for field in reversed(range(_ARITY[tag - NODE])))
+                        continue
+
+                    # The items of the list or dict follow those of the ones before it in its group
+                    count = items[length + index + 1] - items[length + index]
+                    start = position + items[length + index] - items[length]
+                    if tag == LIST:
+                        yield (LIST_EVENT, count, None)
+                        stack.extend(reversed(ids[start:start + count]))
+                    else:
+                        yield (DICT_EVENT, count, None)
+                        total = items[length + size] - items[length]
+                        for item in reversed(range(start, start + count)):
+                            stack.append(ids[item + total])
+                            stack.append(ids[item])
+        except _DECODING_ERRORS:
+            raise ValueError(_INVALID) from None
+
+
+def _read_varint(data, pos):
+    """ Returns the unsigned integer starting at `pos` and the position after it """
+    byte = data[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    number = byte & 0x7f
+    shift = 7
+    while True:
+        pos += 1
+        byte = data[pos]
+        number |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return number, pos + 1
+        shift += 7
+
+
+def iter_loads(data):
+    """
+    Decodes a syntax tree one top-level statement at a time.
+
+    Args:
+        data (bytes-like): The binary form, e.g. a memory-mapped file.
+
+    Yields:
+        Node: The statements, each built only when it is reached.
+
+    Raises:
+        ValueError: If the data is not a syntax tree of this version, or is truncated or corrupt.
+    """
+
+    return _Reader(data).statements()
+
+
+def loads(data):
+    """
+    Decodes a syntax tree.
+
+    Args:
+        data (bytes-like): The binary form.
+
+    Returns:
+        list: The statements, equal to those that were written.
+
+    Raises:
+        ValueError: If the data is not a syntax tree of this version, or is truncated or corrupt.
+    """
+
+    # The new nodes cannot form reference cycles, so the cyclic garbage collector,
+    # which would otherwise run over and over while they are created, is paused
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return list(_Reader(data).statements())
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def load(file):
+    """
+    Reads a syntax tree from a file opened in binary mode.
+
+    Returns:
+        list: The statements.
+
+    Raises:
+        ValueError: If the file does not contain a syntax tree of this version, or is truncated or corrupt.
+    """
+
+    return loads(file.read())
+
+
+def walk(data):
+    """
+    Walks a syntax tree in its binary form without building it.
+
+    Values are visited in the order they were written: a node is followed by
+    the values of its fields (in the order of the class's _fields), a list by
+    its items, and a dict by its keys and values, alternating. No part of the
+    tree is kept, so memory use stays small however large the tree is, for
+    tools that only look for a few nodes. It is slower than loads(), which
+    builds each group of nodes at once, while an event is made for every value.
+
+    Example, listing every function declared in a program:
+
+        events = walk(data)
+        for event, value, offset in events:
+            if event == NODE_EVENT and value is GawaDeclaration:
+                print(next(events)[1], 'at offset', offset)
+
+    Args:
+        data (bytes-like): The binary form.
+
+    Yields:
+        tuple: (event, value, offset), one of
+            (NODE_EVENT, node class, offset of the node),
+            (LIST_EVENT, number of items, None),
+            (DICT_EVENT, number of keys, None) or
+            (VALUE_EVENT, a string, number, boolean or None, None).
+
+    Raises:
+        ValueError: If the data is not a syntax tree of this version, or is truncated or corrupt.
+    """
+
+    return _Reader(data).events()
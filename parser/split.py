@@ -0,0 +1,188 @@
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from . import CodeGoParser
+from .emit import BufferedWriter, write_json, write_ndjson, write_pretty, write_tokens
+from .errors import EMPTY_FILE, ParseError
+from .lexer import CodeGoLexer
+from .tokens import EOF, InternTable, LineIndex, TokenStream
+
+# Parts are never made smaller than this, so that the per-process overhead stays small
+MIN_PART_SIZE = 256 * 1024
+
+# Parts per worker process, so that a slow part does not leave the others idle
+PARTS_PER_JOB = 4
+
+# Keywords that can only start a statement. A line starting with one of them
+# (without indentation) is where the source is split, if it is at brace depth
+# 0 outside strings; parse_parts() verifies that it was.
+_BOUNDARY = r'^(?:Gawa|Kung|Habang|Bawat|Kapag|Numero|Desimal|Teksto|Tsek|Lista|Bagay)\b'
+BOUNDARY_REGEX = re.compile(_BOUNDARY, re.MULTILINE)
+BYTES_BOUNDARY_REGEX = re.compile(_BOUNDARY.encode(), re.MULTILINE)
+
+# Names and literals interned by this worker process
+_symbols = InternTable()
+
+
+def split_points(source, parts):
+    """
+    Finds offsets at which a source can likely be split into top-level statements.
+
+    The source is cut into `parts` roughly equal pieces, and each cut is moved
+    forward to the next line that starts with a statement keyword. This is only
+    a guess, since such a line may still be inside a block or a string literal;
+    parse_parts() detects that and falls back to a sequential parse.
+
+    Args:
+        source (str or bytes-like): The source code.
+        parts (int): The number of parts wanted.
+
+    Returns:
+        list: The offsets where parts start, beginning with 0.
+    """
+
+    regex = BOUNDARY_REGEX if isinstance(source, str) else BYTES_BOUNDARY_REGEX
+    points = [0]
+    for i in range(1, parts):
+        match = regex.search(source, max(points[-1] + 1, len(source) * i // parts))
+        if match is None:
+            break
+        points.append(match.start())
+    return points
+
+
+def parse_part(text, offset, line, last, tokens=False, tree=None, keep=False):
+    """
+    Lexes and parses one part of a split source.
+
+    Runs in a worker process. Output is rendered here, in parallel, and sent back
+    as text, which is much cheaper to send between processes than syntax trees.
+
+    Args:
+        text (str or bytes): The part of the source.
+        offset (int): The offset of the part in the source.
+        line (int): The line number the part starts on.
+        last (bool): Whether this is the last part, the only one ending in an EOF token.
+        tokens (bool): Whether to render the tokens, as write_tokens() does.
+        tree (str): How to render the statements: 'pretty', 'json', 'ndjson' or None.
+        keep (bool): Whether to send the statements back.
+
+    Returns:
+        tuple: (number of statements, statements or None, rendered tokens or None,
+            rendered statements or None), or None if the part did not parse by itself.
+    """
+
+    lines = LineIndex(text, offset, line)
+    try:
+        token_source = CodeGoLexer.iter_tokens(text, lines, _symbols, offset)
+        if tokens:
+            token_source = stream = TokenStream.from_tokens(token_source, lines)
+
+        parser = CodeGoParser(token_source, lines)
+        statements = list(parser.iter_statements())
+    except Exception:
+        return None
+
+    rendered_tokens = None
+    if tokens:
+        buffer = io.StringIO()
+        out = BufferedWriter(buffer)
+        write_tokens(stream if last else (token for token in stream if token[0] != EOF), out, lines)
+        out.flush()
+        rendered_tokens = buffer.getvalue()
+
+    rendered_tree = None
+    if tree:
+        buffer = io.StringIO()
+        out = BufferedWriter(buffer)
+        if tree == 'pretty':
+            write_pretty(statements, out, lines)
+        elif tree == 'json':
+            for i, statement in enumerate(statements):
+                if i:
+                    out.write(', ')
+                write_json(statement, out, lines)
+        else:
+            write_ndjson(statements, out, lines)
+        out.flush()
+        rendered_tree = buffer.getvalue()
+
+    return (len(statements), statements if keep else None, rendered_tokens, rendered_tree)
+
+
+def parse_parts(source, jobs=None, tokens=False, tree=None, keep=False):
+    """
+    Lexes and parses a large source in parallel, split at top-level statements.
+
+    Every part is lexed and parsed in a pool of worker processes. The split is
+    only trusted if every part parses completely by itself: a part that starts
+    inside a block or a string literal leaves the part before it unfinished, so
+    a wrong guess is always detected, and None is returned so that the caller
+    can parse the source sequentially instead (which also reports errors exactly
+    as usual). When every part parses, the results in order are exactly those
+    of a sequential parse, with the same offsets and line numbers.
+
+    Args:
+        source (str or bytes-like): The source code.
+        jobs (int): Number of worker processes, defaults to the number of CPUs.
+        tokens (bool), tree (str), keep (bool): What each part sends back; see parse_part().
+
+    Returns:
+        list: The parse_part() result of every part, in order, or None if the
+            source could not be split or a part did not parse.
+    """
+
+    jobs = jobs or os.cpu_count() or 1
+    parts = min(jobs * PARTS_PER_JOB, len(source) // MIN_PART_SIZE)
+    points = split_points(source, parts) if parts > 1 else [0]
+    if len(points) < 2:
+        return None
+
+    newline = '\n' if isinstance(source, str) else b'\n'
+    points.append(len(source))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = []
+        line = 1
+        for start, end in zip(points, points[1:]):
+            # Sliced, since an mmap.mmap can only be sent to the workers as bytes
+            text = source[start:end]
+            futures.append(executor.submit(parse_part, text, start, line, end == len(source), tokens, tree, keep))
+            line += text.count(newline)
+
+        results = []
+        for future in futures:
+            result = future.result()
+            if result is None:
+                for pending in futures:
+                    pending.cancel()
+                return None
+            results.append(result)
+    return results
+
+
+def parse_split(source, jobs=None):
+    """
+    Parses a source like CodeGoParser.parse(), in parallel when it is large enough.
+
+    Args:
+        source (str or bytes-like): The source code.
+        jobs (int): Number of worker processes, defaults to the number of CPUs.
+
+    Returns:
+        list: The parsed statements.
+
+    Raises:
+        RuntimeError: If the syntax is invalid or no statements are found in the input.
+    """
+
+    results = parse_parts(source, jobs, keep=True)
+    if results is None:
+        lines = LineIndex(source)
+        return CodeGoParser(CodeGoLexer.iter_tokens(source, lines), lines).parse()
+
+    statements = [statement for result in results for statement in result[1]]
+    if not statements:
+        raise ParseError(EMPTY_FILE, 'File is empty. There is nothing to parse.', (0, 0))
+    return statements
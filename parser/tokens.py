@@ -0,0 +1,341 @@
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+# Token kinds. The lexer and the parser compare these small integers instead of
+# strings; KIND_NAMES maps them back to names for messages and display.
+KIND_NAMES = (
+    'EOF',
+    'BASIC_TYPE',
+    'NUMERO',
+    'TEKSTO',
+    'TSEK',
+    'KUNG',
+    'KAPAG',
+    'KASO',
+    'HINTO',
+    'HABANG',
+    'BAWAT',
+    'SA',
+    'GAWA',
+    'IDENTIFIER',
+    'NEWLINE',
+    'COMMENT',
+    'DOT',
+    'LPAREN',
+    'RPAREN',
+    'LBRACE',
+    'RBRACE',
+    'LBRACKET',
+    'RBRACKET',
+    'COMMA',
+    'SEMICOLON',
+    'COLON',
+    'GREATER_EQUAL',
+    'LESS_EQUAL',
+    'EQUALS',
+    'GREATER',
+    'LESS',
+    'PLUS',
+    'MINUS',
+    'TIMES',
+    'DIVIDE',
+)
+
+(
+    EOF,
+    BASIC_TYPE,
+    NUMERO,
+    TEKSTO,
+    TSEK,
+    KUNG,
+    KAPAG,
+    KASO,
+    HINTO,
+    HABANG,
+    BAWAT,
+    SA,
+    GAWA,
+    IDENTIFIER,
+    NEWLINE,
+    COMMENT,
+    DOT,
+    LPAREN,
+    RPAREN,
+    LBRACE,
+    RBRACE,
+    LBRACKET,
+    RBRACKET,
+    COMMA,
+    SEMICOLON,
+    COLON,
+    GREATER_EQUAL,
+    LESS_EQUAL,
+    EQUALS,
+    GREATER,
+    LESS,
+    PLUS,
+    MINUS,
+    TIMES,
+    DIVIDE,
+) = range(len(KIND_NAMES))
+
+# Token kind by name
+KINDS = {name: kind for kind, name in enumerate(KIND_NAMES)}
+
+# Buffers are indexed for LineIndex in pieces of this many bytes
+INDEX_CHUNK_SIZE = 1 << 20
+
+
+def token_repr(token, lines=None):
+    """
+    Formats a token as ('KIND', value, line) for messages and display.
+
+    Tokens record their start offset; with a LineIndex of their source the
+    offset is shown as a line number, otherwise the offset itself is shown.
+    """
+    kind, value, offset = token
+    return repr((KIND_NAMES[kind], value, offset if lines is None else lines.line(offset)))
+
+
+class InternTable:
+    """
+    Interns token values, so that every distinct name or literal is stored once.
+
+    The lexer looks values up by their spelling in the source (e.g. presyo, 12.50
+    or "Adobo"), so repeated literals are not even converted again, and every
+    occurrence of a name shares one string object. Names can therefore be compared
+    by identity. A table can be shared by the lexers of many files, as `check`
+    does for all the files of a worker process.
+
+    Example:
+        table = InternTable()
+        for source in sources:
+            tokens = CodeGoLexer.token_stream(source, table)
+        print(table.stats())
+    """
+
+    __slots__ = ('spellings', 'encoded', 'total')
+
+    def __init__(self):
+        # Value by spelling, for text sources; value by encoded spelling, for byte sources
+        self.spellings = {}
+        self.encoded = {}
+
+        # Values looked up, including repeats
+        self.total = 0
+
+
+    def __len__(self):
+        """ Returns the number of distinct values """
+        return len(self.spellings)
+
+
+    def stats(self):
+        """ Returns a one-line summary of distinct versus total values """
+        unique = len(self.spellings)
+        reuse = 1 - unique / self.total if self.total else 0
+        return f'Symbols: {unique:,} unique of {self.total:,} total ({reuse:.0%} reused)'
+
+
+class LineIndex:
+    """
+    Resolves source offsets to line and column numbers.
+
+    The source may be text, or bytes or a memory-mapped file, in which case
+    offsets and columns count bytes.
+
+    Tokens and nodes record only the offset at which they start, so lexing and
+    parsing never count lines. When a line number is needed (for a message or
+    for display), it is found by binary search in the offsets at which lines
+    start. The index is built on the first lookup, so sources that are never
+    asked about cost nothing. Text added a line at a time with extend() is
+    indexed as it comes instead, so that none of it has to be kept.
+
+    Example:
+        lines = LineIndex(source_code)
+        line, column = lines.position(token[2])
+    """
+
+    __slots__ = ('pending', 'starts', 'length', 'first_line')
+
+    def __init__(self, text='', offset=0, line=1):
+        """
+        Args:
+            text: The source text, or more commonly its first part (see extend()).
+            offset (int): The offset of the text in a larger source, when it is a
+                part of one that starts at the beginning of a line.
+            line (int): The line number of that offset.
+        """
+
+        # Text not indexed yet, and offsets of the line starts indexed so far
+        self.pending = [text] if text else []
+        self.starts = array('q', (offset,))
+        self.length = offset
+        self.first_line = line
+
+
+    def extend(self, text):
+        """
+        Adds text that follows the text given so far, e.g. the next line read from a file.
+
+        Its line starts are indexed at once and the text is not kept, so
+        reading a file a line at a time never holds more than one line of it.
+
+        Args:
+            text (str): The text to add.
+        """
+        if self.pending:
+            self.index()
+        self.add_starts(text.split('\n'))
+
+
+    def index(self):
+        """ Adds the line starts of the text given since the last lookup """
+        for text in self.pending:
+            if isinstance(text, str):
+                self.add_starts(text.split('\n'))
+            elif isinstance(text, bytes):
+                self.add_starts(text.split(b'\n'))
+            else:
+                # A memory-mapped file or other buffer, indexed a chunk at a time
+                # so that it is never copied whole
+                for start in range(0, len(text), INDEX_CHUNK_SIZE):
+                    self.add_starts(bytes(text[start:start + INDEX_CHUNK_SIZE]).split(b'\n'))
+        self.pending = []
+
+
+    def add_starts(self, parts):
+        """ Adds the line starts of a piece of text split at its new lines """
+        starts = accumulate((len(part) + 1 for part in parts), initial=self.length)
+        next(starts)
+        self.starts.extend(starts)
+        self.length = self.starts.pop() - 1  # The end of the text is not the start of a line
+
+
+    def line(self, offset):
+        """ Returns the 1-based line number of an offset """
+        if self.pending:
+            self.index()
+        return bisect_right(self.starts, offset) + self.first_line - 1
+
+
+    def position(self, offset):
+        """
+        Resolves an offset to its line and column.
+
+        Args:
+            offset (int): An offset in the source text.
+
+        Returns:
+            tuple: The 1-based (line, column).
+        """
+        line = self.line(offset)
+        return (line, offset - self.starts[line - self.first_line] + 1)
+
+
+    def offset(self, line, column):
+        """
+        Converts a line and column back to an offset; the inverse of position().
+
+        Args:
+            line (int): The 1-based line number.
+            column (int): The 1-based column.
+
+        Returns:
+            int: The offset.
+
+        Raises:
+            IndexError: If the line is not in the text.
+        """
+        if self.pending:
+            self.index()
+        if not self.first_line <= line < self.first_line + len(self.starts):
+            raise IndexError(f'Line {line} is not in the text')
+        return self.starts[line - self.first_line] + column - 1
+
+
+    def describe(self, offset):
+        """ Returns 'line N, column M' for an offset, as used in messages """
+        return 'line %d, column %d' % self.position(offset)
+
+
+class TokenStream:
+    """
+    A compact, array-backed sequence of tokens (struct-of-arrays).
+
+    Instead of one tuple per token, kinds are stored as bytes and start offsets as
+    unsigned ints in parallel arrays. Token values are interned in a side table, so
+    every token costs a handful of bytes and repeated names and literals are stored
+    once. CodeGoParser accepts a TokenStream wherever it accepts a token list.
+    """
+
+    __slots__ = ('kinds', 'offsets', 'value_ids', 'values', 'value_index', 'lines')
+
+    def __init__(self, lines=None):
+        self.kinds = array('B')
+        self.offsets = array('I')
+        self.value_ids = array('I')
+
+        # Interned values; id 0 is reserved for tokens without a value
+        self.values = [None]
+        self.value_index = {}
+
+        # LineIndex of the source, if known
+        self.lines = lines
+
+
+    @classmethod
+    def from_tokens(cls, tokens, lines=None):
+        """
+        Builds a stream from (kind, value, offset) tokens, e.g. CodeGoLexer.iter_tokens().
+
+        Args:
+            tokens (iterable): The tokens to store.
+            lines (LineIndex): The line index of the tokens' source, if known.
+
+        Returns:
+            TokenStream: The populated stream.
+        """
+        stream = cls(lines)
+        append = stream.append
+        for kind, value, offset in tokens:
+            append(kind, value, offset)
+        return stream
+
+
+    def append(self, kind, value, offset):
+        """
+        Adds a token to the end of the stream, interning its value.
+
+        Args:
+            kind (int): The token kind.
+            value: The token value, or None.
+            offset (int): The start offset of the token.
+        """
+        if value is None:
+            value_id = 0
+        else:
+            # Key on the type too, so that 1, 1.0 and True stay distinct
+            key = (value.__class__, value)
+            value_id = self.value_index.get(key)
+            if value_id is None:
+                value_id = self.value_index[key] = len(self.values)
+                self.values.append(value)
+        self.kinds.append(kind)
+        self.offsets.append(offset)
+        self.value_ids.append(value_id)
+
+
+    def __len__(self):
+        return len(self.kinds)
+
+
+    def __getitem__(self, index):
+        return (self.kinds[index], self.values[self.value_ids[index]], self.offsets[index])
+
+
+    def __iter__(self):
+        values = self.values
+        for kind, value_id, offset in zip(self.kinds, self.value_ids, self.offsets):
+            yield (kind, values[value_id], offset)
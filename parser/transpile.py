@@ -0,0 +1,753 @@
+import ast
+import operator
+import re
+
+from .compiler import DEFAULT_VALUES, CompileError
+from .nodes import (
+    Assignment, BawatStatement, BinaryOp, Comment, ExpressionStatement, FunctionInvocation, GawaDeclaration,
+    HabangStatement, Identifier, KapagStatement, KungStatement, ListLiteral, Literal, Node, ObjectLiteral,
+    PropertyAccess, UnaryOp, VarDeclaration,
+)
+from .resolve import BUILTIN, GLOBAL, Resolver
+from .tokens import TSEK
+from .typecheck import TypeChecker
+from .vm import VM, ExecutionError, divide, format_value, not_a_number, type_name, values_equal
+
+# File name of the generated code objects, which tells their frames apart in tracebacks
+FILENAME = '<codego>'
+
+# Python operators of the CodeGo binary operators, for values that cannot be
+# a Tsek; / is parser.vm.divide()
+BINARY_OPERATORS = {
+    '+': ast.Add,
+    '-': ast.Sub,
+    '*': ast.Mult,
+}
+COMPARE_OPERATORS = {
+    '>': ast.Gt,
+    '<': ast.Lt,
+    '>=': ast.GtE,
+    '<=': ast.LtE,
+}
+
+# Prefix of every name the Python code has that is not the name of a CodeGo
+# variable: the runtime helpers, the Text constants and renamed variables (see
+# python_name()). A CodeGo variable whose name starts with it is renamed too,
+# so that it cannot clash with them.
+PREFIX = '_cg_'
+
+# Names of the runtime helpers in the globals of a program
+ITERATE = PREFIX + 'iterate'
+DIVIDE = PREFIX + 'divide'
+EQUAL = PREFIX + 'equal'
+NEGATE = PREFIX + 'negate'
+# + - * of values that may be a Tsek, by operator
+ARITHMETIC = {
+    '+': PREFIX + 'add',
+    '-': PREFIX + 'subtract',
+    '*': PREFIX + 'multiply',
+}
+KAPAG_VALUE = PREFIX + 'kapag'
+NAMED = PREFIX + 'named'
+
+# Prefix of the local variables of a Gawa that have the name of a global variable it uses
+LOCAL_PREFIX = PREFIX + 'local_'
+
+# CodeGo identifiers that Python cannot bind
+UNBINDABLE = frozenset(('None', 'True', 'False', '__debug__'))
+
+# CodeGo names of the Python types named in TypeError messages
+PYTHON_TYPE_NAMES = {
+    'int': 'Numero',
+    'float': 'Desimal',
+    'str': 'Teksto',
+    'Text': 'Teksto',
+    'bool': 'Tsek',
+    'list': 'Lista',
+    'dict': 'Bagay',
+    'NoneType': 'Wala',
+    'function': 'Gawa',
+}
+
+# TypeError messages of Python operators, with the types of the two operands
+_OPERAND_TYPES = (
+    re.compile(r"for [^:]+: '(\w+)' and '(\w+)'"),
+    re.compile(r"between instances of '(\w+)' and '(\w+)'"),
+    re.compile(r'can only concatenate (\w+) \(not "(\w+)"\)'),
+    re.compile(r"()can't multiply sequence by non-int of type '(\w+)'"),
+)
+
+# TypeError messages about a single value: an operand, an object or a callee
+_VALUE_TYPE = re.compile(r"'(\w+)' object|unary -: '(\w+)'|^(\w+) indices")
+_STRING_INDICES = 'string'
+
+# The first quoted name in an error message
+_QUOTED = re.compile(r"'(\w+)'")
+
+# TypeError messages of calls with the wrong number of arguments
+_TAKES = re.compile(r'takes (\d+) positional')
+_MISSING_ARGUMENTS = re.compile(r'missing (\d+) required')
+
+# Kinds of work items of Transpiler.transpile()
+_STATEMENT, _EXPRESSION, _BUILD = range(3)
+
+
+class Text(str):
+    """
+    A Teksto value of a program run by the Python backend.
+
+    Adding a Text and any other value joins their printed forms, as the VM
+    does, so + can stay Python's own operator where neither value can be a
+    Tsek: numbers add at full speed, and only additions involving a Text run
+    the methods below. Every string a
+    program can make (literals, keys, results of + and *, the characters
+    Bawat goes through) is a Text.
+    """
+
+    __slots__ = ()
+
+    def __add__(self, other):
+        return Text(str.__add__(self, format_value(other)))
+
+    def __radd__(self, other):
+        return Text(str.__add__(format_value(other), self))
+
+    def __mul__(self, other):
+        if type(other) is not int:
+            raise TypeError(f"unsupported operand type(s) for *: 'Text' and '{type(other).__name__}'")
+        return Text(str.__mul__(self, other))
+
+    def __rmul__(self, other):
+        if type(other) is not int:
+            raise TypeError(f"unsupported operand type(s) for *: '{type(other).__name__}' and 'Text'")
+        return Text(str.__mul__(self, other))
+
+
+def arithmetic(function, symbol):
+    """
+    Returns the operator `symbol` for values that may be a Tsek, which Python
+    would take as the number 1 or 0: it raises TypeError for a Tsek, unless
+    the other value is a Text that joins it.
+    """
+    def run(left, right):
+        if type(left) is bool and not isinstance(right, str) or type(right) is bool and not isinstance(left, str):
+            raise not_a_number(symbol, left, right)
+        return function(left, right)
+    return run
+
+
+def negate(value):
+    """ The - of a value that may be a Tsek """
+    if type(value) is bool:
+        raise TypeError("bad operand type for unary -: 'bool'")
+    return -value
+
+
+# The helpers of ARITHMETIC, by name
+ARITHMETIC_FUNCTIONS = {
+    ARITHMETIC['+']: arithmetic(operator.add, '+'),
+    ARITHMETIC['-']: arithmetic(operator.sub, '-'),
+    ARITHMETIC['*']: arithmetic(operator.mul, '*'),
+}
+
+
+def named(name):
+    """ Returns a decorator giving a Gawa the name it has in CodeGo, where its Python name differs """
+    def decorate(function):
+        function.__name__ = name
+        return function
+    return decorate
+
+
+def iterate(value):
+    """ What Bawat goes through: a copy of a Lista, the keys of a Bagay or the characters of a Teksto """
+    kind = type(value)
+    if kind is list or kind is dict:
+        return list(value)
+    if isinstance(value, str):
+        return [Text(character) for character in value]
+    raise ExecutionError(f'Cannot loop over a {type_name(value)} value')
+
+
+class PythonProgram:
+    """
+    A CodeGo program compiled to a Python code object by Transpiler.
+
+    The code object is made once and can be run any number of times; each run
+    starts with fresh global variables.
+
+    Attributes:
+        code: The Python code object of the program.
+        tree (ast.Module): The Python syntax tree it was compiled from.
+        nodes (list): The CodeGo node of each line number of the code object.
+        constants (dict): The global names of the Text constants of the program.
+        lines (LineIndex): The line index of the source, for error messages, or None.
+    """
+
+    __slots__ = ('code', 'tree', 'nodes', 'constants', 'lines')
+
+    def __init__(self, code, tree, nodes, constants, lines=None):
+        self.code = code
+        self.tree = tree
+        self.nodes = nodes
+        self.constants = constants
+        self.lines = lines
+
+
+    def source(self):
+        """ Returns the Python source of the program; runtime helpers and constants are named with PREFIX """
+        return ast.unparse(self.tree)
+
+
+    def run(self, out=None):
+        """
+        Runs the program.
+
+        Args:
+            out: The stream print() writes to; standard output by default.
+
+        Raises:
+            ExecutionError: If the program fails, with the line and column of the failing
+                expression in the message when the program has a line index.
+        """
+
+        # The built-in functions, print() among them, are those of the VM
+        namespace = {
+            '__builtins__': VM(out).builtins,
+            ITERATE: iterate,
+            DIVIDE: divide,
+            EQUAL: values_equal,
+            NEGATE: negate,
+            NAMED: named,
+        }
+        namespace.update(ARITHMETIC_FUNCTIONS)
+        namespace.update(self.constants)
+        try:
+            exec(self.code, namespace)
+        except (TypeError, NameError, KeyError, ZeroDivisionError, OverflowError, ValueError, RecursionError,
+                ExecutionError) as e:
+            raise self.error(e) from None
+
+
+    def error(self, exception):
+        """ Returns an ExecutionError like the VM's for an exception raised by the program """
+
+        # The innermost frame of the program, whose line number is that of the failing node
+        node = None
+        traceback = exception.__traceback__
+        while traceback is not None:
+            if traceback.tb_frame.f_code.co_filename == FILENAME:
+                node = self.nodes[traceback.tb_lineno - 1]
+            traceback = traceback.tb_next
+        if node is None:
+            raise exception
+
+        kind = type(exception)
+        if kind is ExecutionError:
+            message = str(exception)
+        elif issubclass(kind, NameError):
+            # UnboundLocalError does not set the name, only the message
+            name = exception.name or _QUOTED.search(str(exception)).group(1)
+            message = f'Undeclared variable: {codego_name(name)}'
+        elif kind is ZeroDivisionError:
+            message = 'Division by zero'
+        elif kind is OverflowError or kind is ValueError and type(node) is FunctionInvocation:
+            # print() raises ValueError for a Numero too long to convert to text
+            message = 'Number too large'
+        elif kind is RecursionError:
+            message = 'Gawa calls are nested too deeply for the Python backend'
+        elif kind is KeyError and type(node) is PropertyAccess:
+            message = f'The object has no property {node.property}'
+        elif kind is TypeError:
+            message = self.type_error_message(str(exception), node)
+            if message is None:
+                raise exception
+        else:
+            raise exception
+
+        where = f' on {self.lines.describe(node.offset)}' if self.lines is not None else ''
+        return ExecutionError(f'{message}{where}', node.offset)
+
+
+    def type_error_message(self, text, node):
+        """ Returns the message of the VM for a TypeError raised by a node, or None if it has none """
+        kind = type(node)
+        if kind is BinaryOp:
+            for pattern in _OPERAND_TYPES:
+                match = pattern.search(text)
+                if match:
+                    # A sequence multiplied by a non-int does not tell its own type
+                    left = python_type_name(match.group(1) or 'list')
+                    return f'Cannot apply {node.operator} to {left} and {python_type_name(match.group(2))}'
+            return None
+
+        if kind is FunctionInvocation:
+            takes = _TAKES.search(text)
+            missing = _MISSING_ARGUMENTS.search(text)
+            if takes or missing:
+                given = len(node.arguments)
+                expected = int(takes.group(1)) if takes else given + int(missing.group(1))
+                name = codego_name(text.split('(', 1)[0].rsplit('.', 1)[-1])
+                return f'{name}() takes {expected} argument(s), got {given}'
+
+        match = _VALUE_TYPE.search(text)
+        if match is None:
+            return None
+        value_type = match.group(1) or match.group(2) or match.group(3)
+        value_type = python_type_name('str' if value_type == _STRING_INDICES else value_type)
+        if kind is UnaryOp:
+            return f'Cannot apply - to a {value_type} value'
+        if kind is PropertyAccess:
+            return f'A {value_type} value has no property {node.property}'
+        if kind is FunctionInvocation:
+            return f'A {value_type} value cannot be called'
+        return None
+
+
+def python_type_name(name):
+    """ Returns the CodeGo name of a Python type named in an error message """
+    return PYTHON_TYPE_NAMES.get(name, name)
+
+
+def python_name(name):
+    """
+    Returns the Python name of a CodeGo variable.
+
+    A name Python cannot bind, or that starts with PREFIX, gets PREFIX in front
+    of it, and the $ that starts the variables added by parser.optimize is
+    replaced with PREFIX, so every name is a valid Python identifier that no
+    other one is turned into.
+    """
+    if name in UNBINDABLE or name.startswith(PREFIX):
+        return PREFIX + name
+    if name.startswith('$'):
+        return PREFIX + name[1:]
+    return name
+
+
+def codego_name(name):
+    """ Returns the CodeGo name of a variable from its Python name, as python_name() and the Transpiler make it """
+    if name.startswith(LOCAL_PREFIX):
+        name = name[len(LOCAL_PREFIX):]
+    if not name.startswith(PREFIX):
+        return name
+    name = name[len(PREFIX):]
+    return name if name in UNBINDABLE or name.startswith(PREFIX) else '$' + name
+
+
+class Transpiler:
+    """
+    Lowers syntax trees from CodeGoParser to a Python syntax tree, which is
+    compiled to a single Python code object.
+
+    Gawa becomes def, Habang while, Bawat for, Kung if and Kapag a chain of
+    if/elif over its value, so loops run as CPython bytecode with no work per
+    CodeGo node. The semantics are those of parser.vm: Teksto values are Text,
+    / goes through parser.vm.divide(), + - * and unary - through helpers that
+    reject a Tsek (see arithmetic()), Kaso values are compared with
+    parser.vm.values_equal() unless they are literals, and variables are those
+    found by parser.resolve, so the errors it reports are the same as the VM's.
+    A Gawa declares the global variables it uses with a global statement; its
+    local variables that have the name of one of them get LOCAL_PREFIX.
+    Where parser.typecheck knows the types of the operands, and `specialize`
+    is true, / runs as // or /, + - * and unary - as Python's own operators,
+    and Kaso values are compared with == directly.
+
+    The line number of every Python node is the position of its CodeGo node
+    in PythonProgram.nodes, which is how errors are traced back to the source.
+    Like parser.compiler.Compiler, the tree is built with an explicit stack of
+    work items instead of recursion. CPython's own compiler does recurse, and
+    allows at most 20 nested loops, so programs nested deeper than that do not
+    compile with this backend.
+
+    Usage:
+        program = Transpiler(lines).transpile(CodeGoParser(tokens, lines).parse())
+        program.run()
+    """
+
+    def __init__(self, lines=None, specialize=True):
+        # Line index of the source, used to report line and column numbers in errors
+        self.lines = lines
+
+        # Whether to run operators specialized for the types of their operands
+        self.specialize = specialize
+
+        # The CodeGo node of each line number, and the line number of each node by id
+        self.nodes = []
+        self.node_lines = {}
+
+        # The global name of each Text constant, by value
+        self.constants = {}
+
+        # The variables found by parser.resolve.Resolver, their types, found by
+        # parser.typecheck.TypeChecker, and the scope of each Gawa being lowered,
+        # the innermost last
+        self.resolution = None
+        self.typing = None
+        self.scopes = []
+
+        self.statement_rules = {
+            VarDeclaration: self.var_declaration,
+            Assignment: self.assignment,
+            ExpressionStatement: self.expression_statement,
+            FunctionInvocation: self.invocation_statement,
+            Comment: self.comment,
+            KungStatement: self.kung_statement,
+            HabangStatement: self.habang_statement,
+            BawatStatement: self.bawat_statement,
+            KapagStatement: self.kapag_statement,
+            GawaDeclaration: self.gawa_declaration,
+        }
+        self.expression_rules = {
+            Identifier: self.identifier,
+            Literal: self.literal,
+            BinaryOp: self.binary_op,
+            UnaryOp: self.unary_op,
+            PropertyAccess: self.property_access,
+            FunctionInvocation: self.function_invocation,
+            ListLiteral: self.list_literal,
+            ObjectLiteral: self.object_literal,
+        }
+
+
+    def transpile(self, statements):
+        """
+        Compiles a program to Python.
+
+        Args:
+            statements (list): The statements of the program, as returned by CodeGoParser.parse().
+
+        Returns:
+            PythonProgram: The compiled program.
+
+        Raises:
+            CompileError: If the program cannot be compiled.
+        """
+
+        self.resolution = Resolver(self.lines).resolve(statements)
+        self.typing = TypeChecker(self.resolution, self.lines).check(statements)
+
+        # Each work item leaves one value: a Python expression for an expression,
+        # and a list of Python statements for a statement or a block
+        values = []
+        work = self.block(statements)[::-1]
+        while work:
+            item = work.pop()
+            kind = item[0]
+            if kind == _BUILD:
+                count, build = item[1], item[2]
+                if count:
+                    arguments = values[-count:]
+                    del values[-count:]
+                    values.append(build(*arguments))
+                else:
+                    values.append(build())
+            elif kind == _EXPRESSION:
+                node = item[1]
+                rule = self.expression_rules.get(type(node))
+                if rule is None:
+                    raise self.error(node, 'cannot be used as a value')
+                work.extend(reversed(rule(node)))
+            else:
+                node = item[1]
+                rule = self.statement_rules.get(type(node))
+                if rule is None:
+                    raise self.error(node, 'cannot be used as a statement')
+                work.extend(reversed(rule(node)))
+
+        tree = ast.Module(body=values.pop(), type_ignores=[])
+        try:
+            code = compile(tree, FILENAME, 'exec')
+        except (RecursionError, SyntaxError, MemoryError):
+            raise CompileError('The program is nested too deeply for the Python backend') from None
+        constants = {name: Text(value) for value, name in self.constants.items()}
+        return PythonProgram(code, tree, self.nodes, constants, self.lines)
+
+
+    def error(self, node, message):
+        """ Returns a CompileError about a node """
+        if not isinstance(node, Node):
+            return CompileError(f'A block of statements {message}')
+        where = f'on {self.lines.describe(node.offset)}' if self.lines is not None else f'at offset {node.offset}'
+        return CompileError(f'{type(node).__name__} {message} {where}')
+
+
+    def at(self, python_node, node):
+        """ Gives a Python node the line number of the CodeGo node it was made from """
+        line = self.node_lines.get(id(node))
+        if line is None:
+            self.nodes.append(node)
+            line = self.node_lines[id(node)] = len(self.nodes)
+        python_node.lineno = python_node.end_lineno = line
+        python_node.col_offset = python_node.end_col_offset = 0
+        return python_node
+
+
+    def name(self, name, node, context=ast.Load):
+        return self.at(ast.Name(id=name, ctx=context()), node)
+
+
+    def operator(self, node, default):
+        """ Returns the operator a BinaryOp, UnaryOp or KasoClause runs, specialized if it can be """
+        return self.typing.operator(node, default) if self.specialize else default
+
+
+    def variable(self, binding, node, context=ast.Load):
+        """ Returns a Python name for a variable, given its (kind, slot) from parser.resolve """
+        kind, slot = binding
+        if kind == BUILTIN:
+            return self.name(slot, node, context)
+        if kind == GLOBAL or not self.scopes:
+            return self.name(python_name(self.resolution.program.names[slot]), node, context)
+        scope = self.scopes[-1]
+        name = scope.names[slot]
+        if name in scope.globals_used:
+            return self.name(LOCAL_PREFIX + python_name(name), node, context)
+        return self.name(python_name(name), node, context)
+
+
+    def text(self, value, node):
+        """ Returns a Python expression for a Text constant """
+        name = self.constants.get(value)
+        if name is None:
+            name = self.constants[value] = f'{PREFIX}text{len(self.constants)}'
+        return self.name(name, node)
+
+
+    # Statements. Each rule returns the work items that build its list of Python statements.
+
+    def block(self, statements):
+        """ Returns the work items of a list of statements, which build a list of Python statements """
+        def build(*blocks):
+            return [statement for block in blocks for statement in block]
+        return [(_STATEMENT, statement) for statement in statements] + [(_BUILD, len(statements), build)]
+
+
+    def body(self, statements, node):
+        """ Returns the statements of a Python block, which cannot be empty """
+        return statements or [self.at(ast.Pass(), node)]
+
+
+    def var_declaration(self, node):
+        def build(value):
+            target = self.variable(self.resolution.binding(node), node, ast.Store)
+            return [self.at(ast.Assign(targets=[target], value=value), node)]
+
+        if node.expression is not None:
+            return [(_EXPRESSION, node.expression), (_BUILD, 1, build)]
+        if node.basic_type == 'Lista':
+            value = self.at(ast.List(elts=[], ctx=ast.Load()), node)
+        elif node.basic_type == 'Bagay':
+            value = self.at(ast.Dict(keys=[], values=[]), node)
+        elif node.basic_type == 'Teksto':
+            value = self.text(DEFAULT_VALUES['Teksto'], node)
+        else:
+            value = self.at(ast.Constant(DEFAULT_VALUES[node.basic_type]), node)
+        return [(_BUILD, 0, lambda: build(value))]
+
+
+    def assignment(self, node):
+        def build(value):
+            target = self.variable(self.resolution.binding(node), node, ast.Store)
+            return [self.at(ast.Assign(targets=[target], value=value), node)]
+        return [(_EXPRESSION, node.expression), (_BUILD, 1, build)]
+
+
+    def expression_statement(self, node):
+        return [(_EXPRESSION, node.expression), (_BUILD, 1, lambda value: [self.at(ast.Expr(value), node)])]
+
+
+    def invocation_statement(self, node):
+        return [(_EXPRESSION, node), (_BUILD, 1, lambda value: [self.at(ast.Expr(value), node)])]
+
+
+    def comment(self, node):
+        return [(_BUILD, 0, list)]
+
+
+    def kung_statement(self, node):
+        def build(test, statements):
+            return [self.at(ast.If(test=test, body=self.body(statements, node), orelse=[]), node)]
+        return [(_EXPRESSION, node.condition)] + self.block(node.statements) + [(_BUILD, 2, build)]
+
+
+    def habang_statement(self, node):
+        def build(test, statements):
+            return [self.at(ast.While(test=test, body=self.body(statements, node), orelse=[]), node)]
+        return [(_EXPRESSION, node.condition)] + self.block(node.statements) + [(_BUILD, 2, build)]
+
+
+    def bawat_statement(self, node):
+        def build(statements):
+            iterable, iterator = self.resolution.binding(node)
+            iterable = self.at(ast.Call(func=self.name(ITERATE, node), args=[self.variable(iterable, node)],
+                                        keywords=[]), node)
+            return [self.at(ast.For(target=self.variable(iterator, node, ast.Store), iter=iterable,
+                                    body=self.body(statements, node), orelse=[]), node)]
+        return self.block(node.body) + [(_BUILD, 1, build)]
+
+
+    def kapag_statement(self, node):
+        # The value is kept in a variable while it is compared with each case,
+        # and the cases become an if/elif chain; Hinto ends every case.
+        def build(value, *cases):
+            # cases holds the value and the statements of each case in turn; the chain is built from the end
+            chain = []
+            for case, test, statements in reversed(list(zip(node.cases, cases[::2], cases[1::2]))):
+                test = self.case_test(case, test)
+                chain = [self.at(ast.If(test=test, body=self.body(statements, case), orelse=chain), case)]
+            store = self.at(ast.Assign(targets=[self.name(KAPAG_VALUE, node, ast.Store)], value=value), node)
+            return [store] + chain
+
+        items = [(_EXPRESSION, node.condition)]
+        for case in node.cases:
+            items += [(_EXPRESSION, case.case_expr)] + self.block(case.case_statements)
+        return items + [(_BUILD, 1 + 2 * len(node.cases), build)]
+
+
+    def case_test(self, case, expression):
+        """ Returns the test of a Kaso: whether the Kapag value equals its value, by parser.vm.values_equal() """
+        value = self.name(KAPAG_VALUE, case)
+        literal = case.case_expr
+        if self.operator(case, '==') == 'plain ==':
+            # Neither side can be a Tsek unless both are
+            return self.at(ast.Compare(left=value, ops=[ast.Eq()], comparators=[expression]), case)
+        if type(literal) is Literal and literal.kind == TSEK:
+            # Tama and Mali only equal themselves
+            return self.at(ast.Compare(left=value, ops=[ast.Is()], comparators=[expression]), case)
+        if type(literal) is Literal and literal.value in (0, 1):
+            # Mali == 0 and Tama == 1 in Python, but not in CodeGo
+            equal = self.at(ast.Compare(left=value, ops=[ast.Eq()], comparators=[expression]), case)
+            boolean = self.at(ast.Constant(literal.value == 1), case)
+            other = self.at(ast.Compare(left=self.name(KAPAG_VALUE, case), ops=[ast.IsNot()], comparators=[boolean]),
+                            case)
+            return self.at(ast.BoolOp(op=ast.And(), values=[equal, other]), case)
+        if type(literal) is Literal:
+            # Teksto values and numbers other than 0 and 1 equal no Tsek value
+            return self.at(ast.Compare(left=value, ops=[ast.Eq()], comparators=[expression]), case)
+        return self.at(ast.Call(func=self.name(EQUAL, case), args=[value, expression], keywords=[]), case)
+
+
+    def gawa_declaration(self, node):
+        # The scope is current while the body is built, then the function is
+        # stored in the scope around it
+        def build(statements):
+            if scope.globals_used:
+                statements = [self.at(ast.Global(names=sorted(map(python_name, scope.globals_used))), node)] + statements
+            parameters = [self.at(ast.arg(arg=self.variable(self.resolution.binding(parameter), parameter).id),
+                                  parameter)
+                          for parameter in node.parameters]
+            self.scopes.pop()
+            name = self.variable(self.resolution.binding(node), node, ast.Store).id
+            arguments = ast.arguments(posonlyargs=[], args=parameters, kwonlyargs=[], kw_defaults=[], defaults=[])
+            decorators = []
+            if name != node.name:
+                # Printed as <Gawa name>, like the VM prints it
+                decorators.append(self.at(ast.Call(func=self.name(NAMED, node), args=[
+                    self.at(ast.Constant(node.name), node)], keywords=[]), node))
+            return [self.at(ast.FunctionDef(name=name, args=arguments, body=self.body(statements, node),
+                                            decorator_list=decorators, returns=None), node)]
+
+        scope = self.resolution.scope(node)
+        self.scopes.append(scope)
+        return self.block(node.body) + [(_BUILD, 1, build)]
+
+
+    # Expressions. Each rule returns the work items that build its Python expression.
+
+    def identifier(self, node):
+        return [(_BUILD, 0, lambda: self.variable(self.resolution.binding(node), node))]
+
+
+    def literal(self, node):
+        if node.kind == TSEK:
+            value = self.at(ast.Constant(node.value == 'Tama'), node)
+        elif isinstance(node.value, str):
+            value = self.text(node.value, node)
+        else:
+            value = self.at(ast.Constant(node.value), node)
+        return [(_BUILD, 0, lambda: value)]
+
+
+    def binary_op(self, node):
+        operator = self.operator(node, node.operator)
+        if operator == 'Numero /' or operator == 'Desimal /':
+            python_operator = ast.FloorDiv if operator == 'Numero /' else ast.Div
+            def build(left, right):
+                return self.at(ast.BinOp(left=left, op=python_operator(), right=right), node)
+        elif operator in COMPARE_OPERATORS:
+            def build(left, right):
+                return self.at(ast.Compare(left=left, ops=[COMPARE_OPERATORS[operator]()], comparators=[right]), node)
+        elif operator == '/' or operator in ARITHMETIC:
+            # Either may be a Tsek, which the Python operator would take as a number
+            helper = DIVIDE if operator == '/' else ARITHMETIC[operator]
+            def build(left, right):
+                return self.at(ast.Call(func=self.name(helper, node), args=[left, right], keywords=[]), node)
+        else:
+            # Text joins a Teksto with anything by itself
+            python_operator = BINARY_OPERATORS[operator.split()[-1]]
+            def build(left, right):
+                return self.at(ast.BinOp(left=left, op=python_operator(), right=right), node)
+        return [(_EXPRESSION, node.left), (_EXPRESSION, node.right), (_BUILD, 2, build)]
+
+
+    def unary_op(self, node):
+        if self.operator(node, '-') == 'plain -':
+            def build(operand):
+                return self.at(ast.UnaryOp(op=ast.USub(), operand=operand), node)
+        else:
+            def build(operand):
+                return self.at(ast.Call(func=self.name(NEGATE, node), args=[operand], keywords=[]), node)
+        return [(_EXPRESSION, node.operand), (_BUILD, 1, build)]
+
+
+    def property_access(self, node):
+        def build(value):
+            return self.at(ast.Subscript(value=value, slice=self.at(ast.Constant(node.property), node),
+                                         ctx=ast.Load()), node)
+        return [(_EXPRESSION, node.object), (_BUILD, 1, build)]
+
+
+    def function_invocation(self, node):
+        def build(function, *arguments):
+            return self.at(ast.Call(func=function, args=list(arguments), keywords=[]), node)
+
+        callee = node.function_name
+        if type(callee) is str:
+            items = [(_BUILD, 0, lambda: self.variable(self.resolution.binding(node), node))]
+        else:
+            items = [(_EXPRESSION, callee)]
+        items += [(_EXPRESSION, argument) for argument in node.arguments]
+        return items + [(_BUILD, 1 + len(node.arguments), build)]
+
+
+    def list_literal(self, node):
+        def build(*items):
+            return self.at(ast.List(elts=list(items), ctx=ast.Load()), node)
+        return [(_EXPRESSION, item) for item in node.items] + [(_BUILD, len(node.items), build)]
+
+
+    def object_literal(self, node):
+        def build(*values):
+            return self.at(ast.Dict(keys=[self.text(key, node) for key in node.properties], values=list(values)),
+                           node)
+        return [(_EXPRESSION, value) for value in node.properties.values()] + [(_BUILD, len(node.properties), build)]
+
+
+def transpile(statements, lines=None, specialize=True):
+    """
+    Compiles the statements of a program to a Python code object.
+
+    Args:
+        statements (list): The statements, as returned by CodeGoParser.parse().
+        lines (LineIndex): The line index of the source, for error messages. Optional.
+        specialize (bool): Whether to run operators specialized for the types of their
+            operands, where parser.typecheck knows them. True by default.
+
+    Returns:
+        PythonProgram: The compiled program.
+
+    Raises:
+        CompileError: If the program cannot be compiled.
+    """
+    return Transpiler(lines, specialize).transpile(statements)
@@ -0,0 +1,480 @@
+from types import MappingProxyType
+
+from .errors import CompileError
+from .nodes import (
+    Assignment, BawatStatement, BinaryOp, Comment, ExpressionStatement, FunctionInvocation, GawaDeclaration,
+    HabangStatement, Identifier, KapagStatement, KungStatement, ListLiteral, Literal, ObjectLiteral, Parameter,
+    PropertyAccess, UnaryOp, VarDeclaration,
+)
+from .resolve import BUILTIN, GLOBAL
+from .tokens import TSEK
+
+# The types of runtime values, in the order messages name them. A type is the
+# frozenset of those a value may have; ANY is that of a value nothing is known
+# about, such as a property or an item of a Lista.
+TYPES = ('Numero', 'Desimal', 'Teksto', 'Tsek', 'Lista', 'Bagay', 'Gawa', 'Wala')
+ANY = frozenset(TYPES)
+NONE = frozenset()
+
+# Types of numbers, which arithmetic takes. A Tsek is not one: Tama + 1 is an error.
+NUMBERS = frozenset(('Numero', 'Desimal'))
+
+# Types that comparisons treat as numbers; there Tama and Mali count as 1 and 0
+COMPARABLE = NUMBERS | frozenset(('Tsek',))
+
+COMPARISONS = frozenset(('>', '<', '>=', '<='))
+
+# The values a variable of each declared type may be given. A Desimal also
+# takes a Numero, which it keeps as it is, so the two divide differently.
+DECLARED_TYPES = MappingProxyType({
+    'Numero': frozenset(('Numero',)),
+    'Desimal': frozenset(('Numero', 'Desimal')),
+    'Teksto': frozenset(('Teksto',)),
+    'Tsek': frozenset(('Tsek',)),
+    'Lista': frozenset(('Lista',)),
+    'Bagay': frozenset(('Bagay',)),
+})
+
+# The type of values known to have one type, by its name
+ONLY = MappingProxyType({name: frozenset((name,)) for name in TYPES})
+
+# Kinds of work items of TypeChecker.visit()
+_STATEMENT, _EXPRESSION, _COMBINE, _FINISH = range(4)
+
+
+def operand_type(operator, left, right):
+    """
+    Returns the type of the result of a binary operator on values of two
+    types, as run by parser.vm, or None if it fails.
+    """
+    if operator == '+':
+        # Adding a Teksto and anything else joins them as text
+        if left == 'Teksto' or right == 'Teksto':
+            return 'Teksto'
+        if left == 'Lista' and right == 'Lista':
+            return 'Lista'
+    elif operator == '*':
+        # A Teksto or Lista repeated a number of times
+        if left in ('Teksto', 'Lista') and right == 'Numero':
+            return left
+        if right in ('Teksto', 'Lista') and left == 'Numero':
+            return right
+    elif operator in COMPARISONS:
+        if left in COMPARABLE and right in COMPARABLE or left == right and left in ('Teksto', 'Lista'):
+            return 'Tsek'
+        return None
+    elif operator == '/':
+        if left in NUMBERS and right in NUMBERS:
+            return 'Numero' if left == right == 'Numero' else 'Desimal'
+        return None
+    if left in NUMBERS and right in NUMBERS:
+        return 'Desimal' if left == 'Desimal' or right == 'Desimal' else 'Numero'
+    return None
+
+
+def first(types):
+    """ Returns the first of a set of types in the order of TYPES """
+    for name in TYPES:
+        if name in types:
+            return name
+    return None
+
+
+def specialize(operator, left, right):
+    """
+    Returns the operator to run a binary operator with, given the types of its
+    operands: one of the specialized operators of parser.compiler.OPERATORS
+    when the types allow it, or the operator itself.
+    """
+    if not left or not right:
+        return operator
+    if operator == '/' and left <= NUMBERS and right <= NUMBERS:
+        if left == right == ONLY['Numero']:
+            return 'Numero /'
+        if 'Numero' not in left or 'Numero' not in right:
+            return 'Desimal /'
+    elif operator == '+' and (left == ONLY['Teksto']) != (right == ONLY['Teksto']):
+        # Joined as text without trying to add first; two Teksto values are added as they are
+        return 'Teksto +'
+    elif operator == '==':
+        # Tsek values only equal Tsek values, which == alone does not know
+        if 'Tsek' not in left and 'Tsek' not in right or left == right == ONLY['Tsek']:
+            return 'plain =='
+    elif operator in ('+', '-', '*') and 'Tsek' not in left and 'Tsek' not in right:
+        # Python's own operator, which would take a Tsek as a number
+        return 'plain ' + operator
+    return operator
+
+
+class Typing:
+    """
+    What TypeChecker found about a program.
+
+    Attributes:
+        types (dict): The type of each expression, by id().
+        operators (dict): The operator to run each BinaryOp, and the == of each
+            KasoClause, with, by id(); see specialize(). A UnaryOp whose
+            operand cannot be a Tsek runs 'plain -'.
+    """
+
+    __slots__ = ('types', 'operators')
+
+    def __init__(self, types, operators):
+        self.types = types
+        self.operators = operators
+
+
+    def operator(self, node, default):
+        """ Returns the operator to run a BinaryOp, UnaryOp or KasoClause with """
+        return self.operators.get(id(node), default)
+
+
+class TypeChecker:
+    """
+    Infers the types of the variables and expressions of a program, reports
+    the type errors it is sure of, and chooses specialized operators where the
+    types of the operands are known.
+
+    The declared type of a variable limits what it can be given: giving it a
+    value that can only have other types, like Numero a = "x", is an error,
+    and so is an operator, call, property or Bawat that fails whatever the
+    types of its operands. The type of a variable is then every type of the
+    values it is given, found by going over the program again until no type
+    grows, so a loop is seen with the types its variables have after it.
+    A value nothing is known about, like a property, can have any type. A
+    parameter has the types of the arguments of every call of its Gawa,
+    unless the Gawa is used as a value, which can then be called anywhere.
+
+    A type is only used to choose operators when it holds for every value
+    that can reach the expression, so specialized code needs no check.
+
+    Usage:
+        typing = TypeChecker(resolution, lines).check(statements)
+    """
+
+    def __init__(self, resolution, lines=None):
+        # The variables found by parser.resolve.Resolver
+        self.resolution = resolution
+
+        # Line index of the source, used to report line and column numbers in errors
+        self.lines = lines
+
+        # The type of each variable by id() of its declaration, and of each expression by id()
+        self.variables = {}
+        self.types = {}
+        self.operators = {}
+
+        # The Gawa declarations used as values, and the declarations assigned
+        # other than by themselves, by id()
+        self.escaped = set()
+        self.assigned = set()
+
+        # Whether a pass has grown a type, and whether this pass reports errors
+        self.changed = False
+        self.checking = False
+
+        # The type and first failing pair of types of each (operator, left type, right type)
+        self.binary_types = {}
+
+
+    def check(self, statements):
+        """
+        Checks the types of a program.
+
+        Args:
+            statements (list): The statements of the program, as returned by CodeGoParser.parse().
+
+        Returns:
+            Typing: The types of its expressions and the operators to run them with.
+
+        Raises:
+            CompileError: If a value has a type it cannot have, or an operation always fails.
+        """
+
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            self.visit(statements)
+        self.checking = True
+        self.visit(statements)
+        return Typing(self.types, self.operators)
+
+
+    def visit(self, statements):
+        """ Goes over the program once, growing the types of its variables """
+        work = [(_STATEMENT, statement) for statement in reversed(statements)]
+        while work:
+            kind, node = work.pop()
+            if kind == _STATEMENT:
+                work.extend(reversed(self.statement(node)))
+            elif kind == _EXPRESSION:
+                work.append((_COMBINE, node))
+                work.extend(self.operands(node))
+            elif kind == _COMBINE:
+                self.types[id(node)] = self.combine(node)
+            else:
+                self.finish(node)
+
+
+    def error(self, message, node):
+        where = f'on {self.lines.describe(node.offset)}' if self.lines is not None else f'at offset {node.offset}'
+        return CompileError(f'{message} {where}')
+
+
+    def variable_type(self, declarations):
+        """ Returns the type of a variable that may be any of some declarations """
+        result = NONE
+        for declaration in declarations:
+            result |= self.variables.get(id(declaration), NONE)
+        return result
+
+
+    def name_type(self, binding, declaration):
+        """ Returns the type of a name, given its (kind, slot) and declaration from parser.resolve """
+        kind, slot = binding
+        if kind == BUILTIN:
+            return ONLY['Gawa']
+        if kind == GLOBAL:
+            return self.variable_type(self.resolution.globals[self.resolution.program.names[slot]])
+        return self.variables.get(id(declaration), NONE)
+
+
+    def store(self, declarations, value, node, verb='assign', where='', check=True):
+        """
+        Gives a value of a type to a variable that may be any of some
+        declarations, checking that each of them can take it if `check` is true
+        """
+        for declaration in declarations:
+            kind = type(declaration)
+            if kind is VarDeclaration or kind is Parameter:
+                declared = declaration.basic_type
+            else:
+                declared = 'Gawa' if kind is GawaDeclaration else None
+            if check and self.checking and declared is not None and value:
+                allowed = DECLARED_TYPES.get(declared, frozenset((declared,)))
+                if not value & allowed:
+                    name = declaration.identifier if kind is VarDeclaration else declaration.name
+                    raise self.error(f'Cannot {verb} a {first(value - allowed)} value to {declared} {name}{where}',
+                                     node)
+            current = self.variables.get(id(declaration), NONE)
+            if not value <= current:
+                self.variables[id(declaration)] = current | value
+                self.changed = True
+
+
+    def note(self, found, declaration):
+        """ Adds a declaration to the set of escaped or assigned ones """
+        if id(declaration) not in found:
+            found.add(id(declaration))
+            self.changed = True
+
+
+    # Statements. Each rule types what it can now and returns the work items of the rest, in order.
+
+    def statement(self, node):
+        kind = type(node)
+        if kind is VarDeclaration or kind is Assignment:
+            if node.expression is None:
+                return [(_FINISH, node)]
+            return [(_EXPRESSION, node.expression), (_FINISH, node)]
+        if kind is ExpressionStatement:
+            return [(_EXPRESSION, node.expression)]
+        if kind is FunctionInvocation:
+            return [(_EXPRESSION, node)]
+        if kind is KungStatement or kind is HabangStatement:
+            return [(_EXPRESSION, node.condition)] + [(_STATEMENT, statement) for statement in node.statements]
+        if kind is BawatStatement:
+            self.bawat_statement(node)
+            return [(_STATEMENT, statement) for statement in node.body]
+        if kind is KapagStatement:
+            items = [(_EXPRESSION, node.condition)] + [(_EXPRESSION, case.case_expr) for case in node.cases]
+            items.append((_FINISH, node))
+            for case in node.cases:
+                items += [(_STATEMENT, statement) for statement in case.case_statements]
+            return items
+        if kind is GawaDeclaration:
+            self.store([node], ONLY['Gawa'], node)
+            if id(node) in self.escaped:
+                # It may be called from anywhere, with anything
+                for parameter in node.parameters:
+                    self.store([parameter], ANY, parameter)
+            return [(_STATEMENT, statement) for statement in node.body]
+        if kind is Comment:
+            return []
+        # Left to the compilers to report
+        return []
+
+
+    def finish(self, node):
+        """ Types a statement after its expressions """
+        kind = type(node)
+        if kind is VarDeclaration:
+            value = self.types[id(node.expression)] if node.expression is not None else ONLY[node.basic_type]
+            self.store([node], value, node)
+        elif kind is Assignment:
+            declarations = self.resolution.declarations_of(node)
+            for declaration in declarations:
+                self.note(self.assigned, declaration)
+            self.store(declarations, self.types[id(node.expression)], node)
+        elif kind is KapagStatement and self.checking:
+            value = self.types[id(node.condition)]
+            for case in node.cases:
+                self.operators[id(case)] = specialize('==', value, self.types[id(case.case_expr)])
+
+
+    def bawat_statement(self, node):
+        iterable_binding, _ = self.resolution.binding(node)
+        iterable, iterator = self.resolution.declarations[id(node)]
+        iterable = self.name_type(iterable_binding, iterable)
+        items = NONE
+        if 'Lista' in iterable:
+            items = ANY
+        elif 'Bagay' in iterable or 'Teksto' in iterable:
+            # The keys of a Bagay and the characters of a Teksto are Teksto values
+            items = ONLY['Teksto']
+        elif iterable and self.checking:
+            raise self.error(f'Cannot loop over a {first(iterable)} value', node)
+        if iterator is not node:
+            self.note(self.assigned, iterator)
+        self.store([iterator], items, node)
+
+
+    # Expressions. operands() returns the work items of the operands of an
+    # expression, and combine() its type once they have theirs.
+
+    def operands(self, node):
+        kind = type(node)
+        if kind is BinaryOp:
+            return [(_EXPRESSION, node.right), (_EXPRESSION, node.left)]
+        if kind is UnaryOp:
+            return [(_EXPRESSION, node.operand)]
+        if kind is PropertyAccess:
+            return [(_EXPRESSION, node.object)]
+        if kind is FunctionInvocation:
+            items = [(_EXPRESSION, argument) for argument in reversed(node.arguments)]
+            if type(node.function_name) is not str:
+                items.append((_EXPRESSION, node.function_name))
+            return items
+        if kind is ListLiteral:
+            return [(_EXPRESSION, item) for item in reversed(node.items)]
+        if kind is ObjectLiteral:
+            return [(_EXPRESSION, value) for value in reversed(list(node.properties.values()))]
+        return []
+
+
+    def combine(self, node):
+        kind = type(node)
+        if kind is Identifier:
+            for declaration in self.resolution.declarations_of(node):
+                if type(declaration) is GawaDeclaration:
+                    self.note(self.escaped, declaration)
+            return self.name_type(self.resolution.binding(node), self.resolution.declarations[id(node)])
+        if kind is Literal:
+            if node.kind == TSEK:
+                return ONLY['Tsek']
+            return ONLY[{int: 'Numero', float: 'Desimal'}.get(type(node.value), 'Teksto')]
+        if kind is BinaryOp:
+            return self.binary_op(node)
+        if kind is UnaryOp:
+            return self.unary_op(node)
+        if kind is PropertyAccess:
+            value = self.types[id(node.object)]
+            if 'Bagay' in value:
+                return ANY
+            if value and self.checking:
+                raise self.error(f'A {first(value)} value has no property {node.property}', node)
+            return NONE
+        if kind is FunctionInvocation:
+            return self.function_invocation(node)
+        if kind is ListLiteral:
+            return ONLY['Lista']
+        if kind is ObjectLiteral:
+            return ONLY['Bagay']
+        # A block used as a value, which the compilers report
+        return ANY
+
+
+    def binary_op(self, node):
+        left, right = self.types[id(node.left)], self.types[id(node.right)]
+        operator = node.operator
+        key = (operator, left, right)
+        found = self.binary_types.get(key)
+        if found is None:
+            result, failure = set(), None
+            for left_type in TYPES:
+                if left_type in left:
+                    for right_type in TYPES:
+                        if right_type in right:
+                            value = operand_type(operator, left_type, right_type)
+                            if value is not None:
+                                result.add(value)
+                            elif failure is None:
+                                failure = (left_type, right_type)
+            found = self.binary_types[key] = (frozenset(result), failure)
+        result, failure = found
+        if self.checking:
+            if not result and failure is not None:
+                raise self.error(f'Cannot apply {operator} to {failure[0]} and {failure[1]}', node)
+            self.operators[id(node)] = specialize(operator, left, right)
+        return result
+
+
+    def unary_op(self, node):
+        value = self.types[id(node.operand)]
+        result = value & NUMBERS
+        if value and not result and self.checking:
+            raise self.error(f'Cannot apply - to a {first(value)} value', node)
+        if self.checking and 'Tsek' not in value:
+            self.operators[id(node)] = 'plain -'
+        return result
+
+
+    def function_invocation(self, node):
+        callee = node.function_name
+        arguments = [self.types[id(argument)] for argument in node.arguments]
+        if type(callee) is not str:
+            function = self.types[id(callee)]
+        else:
+            function = self.name_type(self.resolution.binding(node), self.resolution.declarations[id(node)])
+            declarations = self.resolution.declarations_of(node)
+            for declaration in declarations:
+                if type(declaration) is GawaDeclaration:
+                    self.call(node, declaration, arguments, len(declarations) == 1)
+        if function and 'Gawa' not in function and self.checking:
+            raise self.error(f'A {first(function)} value cannot be called', node)
+        # Neither Gawa nor print() returns a value
+        return ONLY['Wala']
+
+
+    def call(self, node, declaration, arguments, certain):
+        """
+        Passes the arguments of a call to the parameters of a Gawa it may call;
+        `certain` is whether the call can only be to that Gawa, if it is not assigned.
+        """
+        parameters = declaration.parameters
+        certain = certain and id(declaration) not in self.assigned
+        if len(parameters) != len(arguments):
+            if certain and self.checking:
+                raise self.error(f'{declaration.name}() takes {len(parameters)} argument(s), '
+                                 f'got {len(arguments)}', node)
+            return
+        for parameter, argument in zip(parameters, arguments):
+            self.store([parameter], argument, node, 'pass', f' of {declaration.name}()', certain)
+
+
+def check_types(statements, resolution, lines=None):
+    """
+    Checks the types of a program.
+
+    Args:
+        statements (list): The statements, as returned by CodeGoParser.parse().
+        resolution (Resolution): Its variables, as found by parser.resolve.resolve().
+        lines (LineIndex): The line index of the source, for error messages. Optional.
+
+    Returns:
+        Typing: The types of its expressions and the operators to run them with.
+
+    Raises:
+        CompileError: If a value has a type it cannot have, or an operation always fails.
+    """
+    return TypeChecker(resolution, lines).check(statements)
@@ -1,44 +1,38 @@
-from .lista import parse_list
+from .nodes import VarDeclaration
+from .tokens import BASIC_TYPE, EQUALS, IDENTIFIER
 
 def var_declaration(parser):
     """
     Parses a variable declaration statement from the token stream.
 
     A variable declaration consists of a basic type, an identifier, and an optional 
-    assignment of a value or expression. This function handles both direct value assignments 
-    and initializations of lists.
+    assignment of a value or expression, which can also be a list or object literal.
+
+    The expression is parsed with CodeGoParser.resumable_expression(), so this is
+    a generator like the block statements (see kung_statement).
 
     Args:
         parser (Parser): The parser instance to read from the token stream.
 
     Returns:
-        dict: A parsed representation of the variable declaration, including:
-              - 'type': The type of declaration ('var_declaration').
+        VarDeclaration: A parsed representation of the variable declaration, including:
               - 'basic_type': The data type of the variable (e.g., 'Numero', 'Desimal', etc.).
               - 'identifier': The name of the variable being declared.
               - 'expression': The assigned value or expression, if any (None if not assigned).
     """
     
     # Expect and consume a BASIC_TYPE token
-    basic_type = parser.eat('BASIC_TYPE')
+    basic_type = parser.eat(BASIC_TYPE)
     
     # Expect and consume an IDENTIFIER token
-    identifier = parser.eat('IDENTIFIER')
+    identifier = parser.eat(IDENTIFIER)
     
     # Initialize the expression to None
     expression = None
     
     # Check if the next token is an equals sign, indicating an assignment
-    if parser.current_token()[0] == 'EQUALS':
-        parser.eat('EQUALS')
-        if basic_type[1] == 'Lista' and parser.current_token()[0] == 'LBRACKET':
-            expression = parse_list(parser)
-        else:
-            expression = parser.expression()
+    if parser.current_token()[0] == EQUALS:
+        parser.eat(EQUALS)
+        expression = yield from parser.resumable_expression()
 
-    return {
-        'type': 'var_declaration',
-        'basic_type': basic_type[1],
-        'identifier': identifier[1],
-        'expression': expression
-    }
\ No newline at end of file
+    return VarDeclaration(basic_type[1], identifier[1], expression, basic_type[2])
\ No newline at end of file
@@ -0,0 +1,548 @@
+import operator
+import sys
+from types import FunctionType, MethodType
+
+from .compiler import (
+    BINARY, BINARY_CONST, BINARY_LOCAL, BRANCH_CONST, BRANCH_LOCAL, BUILD_LIST, BUILD_OBJECT, CALL, CONSTANT_OPCODES,
+    FOR_ITER, GET_ITER, GET_PROPERTY, JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE, JUMP_OPCODES, LOAD_CONST, LOAD_GLOBAL,
+    LOAD_LOCAL, NAME_OPCODES, NEGATE, OPERATORS, POP, STORE_GLOBAL, STORE_LOCAL, UPDATE_CONST, UPDATE_LOCAL, Function,
+    compile_program,
+)
+
+# CodeGo names of the types of runtime values, for messages
+TYPE_NAMES = {
+    int: 'Numero',
+    float: 'Desimal',
+    str: 'Teksto',
+    bool: 'Tsek',
+    list: 'Lista',
+    dict: 'Bagay',
+    type(None): 'Wala',
+    Function: 'Gawa',
+    FunctionType: 'Gawa',
+    MethodType: 'Gawa',
+}
+
+# Stands for a variable that is not in a scope
+_MISSING = object()
+
+
+class ExecutionError(RuntimeError):
+    """
+    An error raised by a running program, e.g. an undeclared variable or a
+    division by zero.
+
+    Attributes:
+        offset (int): The source offset of the instruction that failed.
+    """
+
+    def __init__(self, message, offset=None):
+        super().__init__(message)
+        self.offset = offset
+
+
+def type_name(value):
+    """ Returns the CodeGo name of the type of a value """
+    return TYPE_NAMES.get(type(value), type(value).__name__)
+
+
+def format_value(value):
+    """
+    Formats a value the way print() shows it.
+
+    Strings are shown as they are at the top level and quoted inside lists and
+    objects, booleans as Tama and Mali, and None as Wala. Nested lists and
+    objects are formatted with an explicit stack, so their depth is unlimited.
+    Subclasses of str, such as parser.transpile.Text, are shown like strings.
+    """
+
+    if isinstance(value, str):
+        return value
+    parts = []
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+        if kind is _Text:
+            # Closing brackets and separators are pushed as _Text, values as themselves
+            parts.append(value.text)
+        elif isinstance(value, str):
+            parts.append('"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"')
+        elif kind is bool:
+            parts.append('Tama' if value else 'Mali')
+        elif value is None:
+            parts.append('Wala')
+        elif kind is list:
+            parts.append('[')
+            stack.append(_CLOSE_LIST)
+            for index in range(len(value) - 1, -1, -1):
+                stack.append(value[index])
+                if index:
+                    stack.append(_SEPARATOR)
+        elif kind is dict:
+            parts.append('{')
+            stack.append(_CLOSE_OBJECT)
+            items = list(value.items())
+            for index in range(len(items) - 1, -1, -1):
+                key, item = items[index]
+                stack.append(item)
+                stack.append(_Text(f'{key}: '))
+                if index:
+                    stack.append(_SEPARATOR)
+        elif kind is FunctionType or kind is MethodType:
+            # A Gawa run by parser.transpile or a built-in such as VM.print, shown
+            # like a parser.compiler.Function
+            parts.append(f'<Gawa {value.__name__}>')
+        else:
+            parts.append(str(value))
+    return ''.join(parts)
+
+
+class _Text:
+    """ Literal text in the stack of format_value() """
+
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+
+_SEPARATOR = _Text(', ')
+_CLOSE_LIST = _Text(']')
+_CLOSE_OBJECT = _Text('}')
+
+
+def values_equal(left, right):
+    """ Whether two values are equal, for Kapag; Tsek values only equal Tsek values """
+    if (type(left) is bool) != (type(right) is bool):
+        return False
+    return left == right
+
+
+def divide(left, right):
+    """ The / operator: dividing a Numero by a Numero rounds down to a Numero """
+    if type(left) is int and type(right) is int:
+        return left // right
+    if type(left) is bool or type(right) is bool:
+        raise not_a_number('/', left, right)
+    return left / right
+
+
+def not_a_number(symbol, left, right):
+    """ Returns the TypeError of an arithmetic operator given a Tsek, worded like Python's own """
+    return TypeError(f"unsupported operand type(s) for {symbol}: '{type(left).__name__}' and "
+                     f"'{type(right).__name__}'")
+
+
+def arithmetic(function, symbol):
+    """
+    Returns the operator `symbol`, which runs `function` unless either value
+    is a Tsek, which Python would take as the number 1 or 0. It then raises
+    TypeError, after which + still joins a Tsek with a Teksto.
+    """
+    def run(left, right):
+        if type(left) is bool or type(right) is bool:
+            raise not_a_number(symbol, left, right)
+        return function(left, right)
+    return run
+
+
+def join_text(left, right):
+    """ The + operator when one side is known to be a Teksto and the other not """
+    return format_value(left) + format_value(right)
+
+
+# Fused opcodes that also run the instruction after their BINARY; errors of the
+# operator are reported at the BINARY, like those of an unfused one
+_PAST_BINARY = frozenset((UPDATE_CONST, UPDATE_LOCAL, BRANCH_CONST, BRANCH_LOCAL))
+
+
+# Functions of the binary operators, in the order of parser.compiler.OPERATORS
+BINARY_FUNCTIONS = (
+    arithmetic(operator.add, '+'),
+    arithmetic(operator.sub, '-'),
+    arithmetic(operator.mul, '*'),
+    divide,
+    operator.gt,
+    operator.lt,
+    operator.ge,
+    operator.le,
+    values_equal,
+    operator.floordiv,
+    operator.truediv,
+    join_text,
+    operator.eq,
+    operator.add,
+    operator.sub,
+    operator.mul,
+)
+
+
+# Operators of the binary operator functions, for messages
+OPERATOR_OF = {function: symbol.split()[-1] for function, symbol in zip(BINARY_FUNCTIONS, OPERATORS)}
+
+
+def link(code):
+    """
+    Prepares the instructions of a code for the dispatch loop: a list of
+    (opcode, argument) pairs, with the argument replaced by what it refers to,
+    so that it is decoded once rather than every time the instruction runs.
+
+    Returns:
+        list: An (opcode, argument) pair per instruction. The argument is a slot,
+            name, constant, operator function or the index of the instruction to
+            jump to; (operator function, constant or slot) for BINARY_CONST and
+            BINARY_LOCAL, (slot, operator function, constant or slot) for
+            UPDATE_CONST and UPDATE_LOCAL, (operator function, constant or slot,
+            jump target, whether to jump if the result is true) for BRANCH_CONST and
+            BRANCH_LOCAL, and (slot, jump target) for FOR_ITER.
+    """
+
+    ops = code.ops
+    constants = code.constants
+    names = code.names
+    instructions = []
+    for position in range(0, len(ops), 2):
+        opcode, argument = ops[position], ops[position + 1]
+        if opcode == BINARY_CONST or opcode == BINARY_LOCAL:
+            operand = constants[argument] if opcode == BINARY_CONST else argument
+            argument = (BINARY_FUNCTIONS[ops[position + 3]], operand)
+        elif opcode == UPDATE_CONST or opcode == UPDATE_LOCAL:
+            operand = constants[ops[position + 3]] if opcode == UPDATE_CONST else ops[position + 3]
+            argument = (argument, BINARY_FUNCTIONS[ops[position + 5]], operand)
+        elif opcode == BRANCH_CONST or opcode == BRANCH_LOCAL:
+            operand = constants[argument] if opcode == BRANCH_CONST else argument
+            argument = (BINARY_FUNCTIONS[ops[position + 3]], operand, ops[position + 5] // 2,
+                        ops[position + 4] == JUMP_IF_TRUE)
+        elif opcode == FOR_ITER:
+            argument = (argument, ops[position + 3] // 2)
+        elif opcode in NAME_OPCODES:
+            argument = names[argument]
+        elif opcode in CONSTANT_OPCODES:
+            argument = constants[argument]
+        elif opcode in JUMP_OPCODES:
+            argument //= 2
+        elif opcode == BINARY:
+            argument = BINARY_FUNCTIONS[argument]
+        instructions.append((opcode, argument))
+    return instructions
+
+
+class VM:
+    """
+    Runs bytecode compiled by parser.compiler.
+
+    The interpreter is a single dispatch loop over the instructions of the
+    current function, with the value stack, variables and instruction pointer
+    in local variables. Calls to Gawa functions push a frame on an explicit
+    stack instead of recursing in Python, so the depth of CodeGo calls is not
+    limited by Python's recursion limit.
+
+    Variables are slots found by parser.resolve: the scope of the running
+    function is a list with one item per local variable, and the program runs
+    with the list of global variables as its scope. Only the global variables
+    read by a Gawa are checked at run time, as it may be called before they
+    are declared; everything else was checked by the resolver.
+
+    Usage:
+        VM(out=sys.stdout, lines=lines).run(compile_program(ast, lines))
+    """
+
+    def __init__(self, out=None, lines=None):
+        # Stream that print() writes to
+        self.out = sys.stdout if out is None else out
+
+        # Line index of the source, used to report line and column numbers in errors
+        self.lines = lines
+
+        # The global variables of the running program, by slot
+        self.globals = []
+
+        self.builtins = {
+            'print': self.print,
+        }
+
+
+    def print(self, *values):
+        """ Built-in print(): writes its arguments without separators and a newline """
+        self.out.write(''.join([format_value(value) for value in values]) + '\n')
+
+
+    def run(self, program):
+        """
+        Runs a compiled program.
+
+        Args:
+            program (Code): The program, as returned by parser.compiler.compile_program().
+
+        Raises:
+            ExecutionError: If the program fails, with the line and column of the failing
+                instruction in the message when the VM has a line index.
+        """
+
+        globals_ = self.globals = [_MISSING] * len(program.slots)
+        global_names = program.slots
+        builtins = self.builtins
+
+        # The opcodes as local variables, which the dispatch loop compares faster than globals
+        _LOAD_LOCAL = LOAD_LOCAL
+        _LOAD_CONST = LOAD_CONST
+        _BINARY_CONST = BINARY_CONST
+        _BINARY_LOCAL = BINARY_LOCAL
+        _STORE_LOCAL = STORE_LOCAL
+        _UPDATE_CONST = UPDATE_CONST
+        _UPDATE_LOCAL = UPDATE_LOCAL
+        _BRANCH_CONST = BRANCH_CONST
+        _BRANCH_LOCAL = BRANCH_LOCAL
+        _BINARY = BINARY
+        _FOR_ITER = FOR_ITER
+        _LOAD_GLOBAL = LOAD_GLOBAL
+        _JUMP = JUMP
+        _POP = POP
+        _CALL = CALL
+        _GET_PROPERTY = GET_PROPERTY
+        _JUMP_IF_TRUE = JUMP_IF_TRUE
+        _JUMP_IF_FALSE = JUMP_IF_FALSE
+        _NEGATE = NEGATE
+        _GET_ITER = GET_ITER
+        _BUILD_LIST = BUILD_LIST
+        _BUILD_OBJECT = BUILD_OBJECT
+        _STORE_GLOBAL = STORE_GLOBAL
+
+        # Frames of the calling functions: (code, instructions, pc, scope, stack)
+        frames = []
+
+        # The linked instructions of each code run so far
+        linked = {}
+
+        code = program
+        instructions = linked[program] = link(program)
+        scope = globals_
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        op = arg = left = right = None
+
+        while True:
+            try:
+                while True:
+                    op, arg = instructions[pc]
+                    pc += 1
+
+                    # Each comparison costs about as much as a simple instruction, so
+                    # opcodes are found in groups of four by their number instead of
+                    # one at a time; they are numbered by how often they run.
+                    if op < 8:
+                        if op < 4:
+                            if op == _LOAD_LOCAL:
+                                push(scope[arg])
+                            elif op == _LOAD_CONST:
+                                push(arg)
+                            elif op == _BINARY_CONST:
+                                function, right = arg
+                                pc += 1
+                                stack[-1] = function(stack[-1], right)
+                            else:
+                                function, right = arg
+                                pc += 1
+                                right = scope[right]
+                                stack[-1] = function(stack[-1], right)
+                        elif op == _STORE_LOCAL:
+                            scope[arg] = pop()
+                        elif op == _BRANCH_CONST:
+                            function, right, target, when = arg
+                            pc += 2
+                            left = pop()
+                            if function(left, right):
+                                if when:
+                                    pc = target
+                            elif not when:
+                                pc = target
+                        else:
+                            slot, function, right = arg
+                            pc += 3
+                            if op == _UPDATE_LOCAL:
+                                right = scope[right]
+                            left = scope[slot]
+                            scope[slot] = function(left, right)
+                    elif op < 16:
+                        if op < 12:
+                            if op == _BRANCH_LOCAL:
+                                function, right, target, when = arg
+                                pc += 2
+                                right = scope[right]
+                                left = pop()
+                                if function(left, right):
+                                    if when:
+                                        pc = target
+                                elif not when:
+                                    pc = target
+                            elif op == _BINARY:
+                                right = pop()
+                                stack[-1] = arg(stack[-1], right)
+                            elif op == _FOR_ITER:
+                                value = next(stack[-1], _MISSING)
+                                if value is _MISSING:
+                                    pop()
+                                    pc += 1
+                                else:
+                                    scope[arg[0]] = value
+                                    pc = arg[1]
+                            else:
+                                value = globals_[arg]
+                                if value is _MISSING:
+                                    raise ExecutionError(f'Undeclared variable: {global_names[arg]}')
+                                push(value)
+                        elif op == _JUMP:
+                            pc = arg
+                        elif op == _POP:
+                            pop()
+                        elif op == _CALL:
+                            function = stack[-arg - 1]
+                            if type(function) is Function:
+                                parameters = function.parameters
+                                if len(parameters) != arg:
+                                    raise ExecutionError(f'{function.name}() takes {len(parameters)} '
+                                                         f'argument(s), got {arg}')
+                                function_scope = stack[len(stack) - arg:] + function.padding
+                                del stack[-arg - 1:]
+                                frames.append((code, instructions, pc, scope, stack))
+                                code = function.code
+                                instructions = linked.get(code)
+                                if instructions is None:
+                                    instructions = linked[code] = link(code)
+                                scope = function_scope
+                                stack = []
+                                push = stack.append
+                                pop = stack.pop
+                                pc = 0
+                            elif callable(function):
+                                arguments = stack[-arg:] if arg else []
+                                del stack[-arg - 1:]
+                                push(function(*arguments))
+                            else:
+                                raise ExecutionError(f'A {type_name(function)} value cannot be called')
+                        else:
+                            if not frames:
+                                return
+                            code, instructions, pc, scope, stack = frames.pop()
+                            push = stack.append
+                            pop = stack.pop
+                            push(None)
+                    elif op < 20:
+                        if op == _GET_PROPERTY:
+                            stack[-1] = stack[-1][arg]
+                        elif op == _JUMP_IF_TRUE:
+                            if pop():
+                                pc = arg
+                        elif op == _JUMP_IF_FALSE:
+                            if not pop():
+                                pc = arg
+                        else:
+                            push(stack[-1])
+                    elif op == _NEGATE:
+                        if type(stack[-1]) is bool:
+                            raise TypeError("bad operand type for unary -: 'bool'")
+                        stack[-1] = -stack[-1]
+                    elif op == _GET_ITER:
+                        value = stack[-1]
+                        if type(value) is list or type(value) is dict:
+                            stack[-1] = iter(list(value))
+                        elif type(value) is str:
+                            stack[-1] = iter(value)
+                        else:
+                            raise ExecutionError(f'Cannot loop over a {type_name(value)} value')
+                    elif op == _BUILD_LIST:
+                        if arg:
+                            value = stack[-arg:]
+                            del stack[-arg:]
+                        else:
+                            value = []
+                        push(value)
+                    elif op == _BUILD_OBJECT:
+                        if arg:
+                            value = dict(zip(arg, stack[-len(arg):]))
+                            del stack[-len(arg):]
+                        else:
+                            value = {}
+                        push(value)
+                    elif op == _STORE_GLOBAL:
+                        globals_[arg] = pop()
+                    else:
+                        push(builtins[arg])
+            except TypeError:
+                # Raised by an operator given values of the wrong types, or by a
+                # property of a value that is not a Bagay. Adding a Teksto and
+                # another value concatenates them, and running goes on.
+                if op == _GET_PROPERTY:
+                    message = f'A {type_name(stack[-1])} value has no property {arg}'
+                    raise self.error(message, code, pc) from None
+                if op == _NEGATE:
+                    raise self.error(f'Cannot apply - to a {type_name(stack[-1])} value', code, pc) from None
+                if op == _BINARY:
+                    function, left = arg, stack[-1]
+                elif op == _BINARY_CONST or op == _BINARY_LOCAL:
+                    function, left = arg[0], stack[-1]
+                elif op == _UPDATE_CONST or op == _UPDATE_LOCAL:
+                    function = arg[1]
+                elif op == _BRANCH_CONST or op == _BRANCH_LOCAL:
+                    function = arg[0]
+                else:
+                    raise
+                operator = OPERATOR_OF[function]
+                if operator != '+' or (type(left) is not str and type(right) is not str):
+                    if op in _PAST_BINARY:
+                        pc -= 1
+                    raise self.error(f'Cannot apply {operator} to {type_name(left)} and {type_name(right)}',
+                                     code, pc) from None
+                value = format_value(left) + format_value(right)
+                if op == _UPDATE_CONST or op == _UPDATE_LOCAL:
+                    scope[arg[0]] = value
+                elif op == _BRANCH_CONST or op == _BRANCH_LOCAL:
+                    if bool(value) == arg[3]:
+                        pc = arg[2]
+                else:
+                    stack[-1] = value
+            except KeyError:
+                if op != _GET_PROPERTY:
+                    raise
+                raise self.error(f'The object has no property {arg}', code, pc) from None
+            except ExecutionError as e:
+                raise self.error(str(e), code, pc, e.offset) from None
+            except ZeroDivisionError:
+                raise self.error('Division by zero', code, pc - (op in _PAST_BINARY)) from None
+            except OverflowError:
+                raise self.error('Number too large', code, pc - (op in _PAST_BINARY)) from None
+            except ValueError:
+                # Raised by print() for a Numero too long to convert to text
+                if op != _CALL:
+                    raise
+                raise self.error('Number too large', code, pc) from None
+
+
+    def error(self, message, code, pc, offset=None):
+        """
+        Returns an ExecutionError about the instruction before `pc` in `code`, or
+        about the source `offset` if one is given
+        """
+        if offset is None:
+            offset = code.offsets[pc - 1] if pc else 0
+        where = f' on {self.lines.describe(offset)}' if self.lines is not None else ''
+        return ExecutionError(f'{message}{where}', offset)
+
+
+def run_program(statements, out=None, lines=None):
+    """
+    Compiles and runs the statements of a program.
+
+    Args:
+        statements (list): The statements, as returned by CodeGoParser.parse().
+        out: The stream print() writes to; standard output by default.
+        lines (LineIndex): The line index of the source, for error messages. Optional.
+
+    Raises:
+        CompileError: If the program cannot be compiled.
+        ExecutionError: If the program fails while running.
+    """
+    VM(out, lines).run(compile_program(statements, lines))
@@ -0,0 +1,296 @@
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import sys
+import time
+
+from .batch import discover
+from .incremental import Document
+
+# Seconds without further changes before a burst of changes is checked
+DEFAULT_DEBOUNCE = 0.05
+
+# Seconds between scans of the watched files when inotify is not available
+DEFAULT_INTERVAL = 0.5
+
+# inotify event masks (see inotify(7))
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+# struct inotify_event, followed by a name of `len` bytes
+_EVENT = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """
+    Reports changed .cg files as the kernel notices them, using Linux inotify.
+
+    Every directory under the watched paths is watched, including directories
+    created later, so waiting costs nothing while no file changes, and a change
+    is reported without looking at any other file.
+    """
+
+    def __init__(self, paths):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.add_watch = libc.inotify_add_watch
+        self.add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+
+        # Watch descriptor -> (directory, whether it is in a watched directory tree), and
+        # the files named explicitly, watched through their directory, by normalized path.
+        # Files are reported by the paths discover() gives them: as named, or joined to
+        # the directory os.walk() found them in.
+        self.directories = {}
+        self.files = {}
+        for path in paths:
+            if os.path.isdir(path):
+                self.watch_tree(path)
+            else:
+                self.files[os.path.normpath(path)] = path
+                self.watch(os.path.dirname(path) or '.', False)
+
+
+    def watch(self, directory, tree=True):
+        """ Starts watching a single directory, of a watched directory tree or of named files """
+        wd = self.add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'Cannot watch {directory}: {os.strerror(ctypes.get_errno())}')
+        # A directory watched twice has one descriptor; a tree keeps the path os.walk() gave it
+        previous = self.directories.get(wd)
+        if previous is not None and previous[1] and not tree:
+            return
+        self.directories[wd] = (directory, tree)
+
+
+    def watch_tree(self, root):
+        """ Starts watching a directory and all directories under it """
+        for directory, _, _ in os.walk(root):
+            self.watch(directory)
+
+
+    def wait(self, timeout=None):
+        """
+        Waits for changes.
+
+        Args:
+            timeout (float): Seconds to wait at most, or None to wait until a change.
+
+        Returns:
+            set: Paths of the .cg files that changed, were created or removed, or
+                None if events were lost and every file has to be checked.
+        """
+
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+
+        data = os.read(self.fd, 1 << 16)
+        changed = set()
+        position = 0
+        while position < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, position)
+            position += _EVENT.size
+            name = os.fsdecode(data[position:position + length].rstrip(b'\0'))
+            position += length
+
+            if mask & IN_Q_OVERFLOW:
+                return None
+            entry = self.directories.get(wd)
+            if entry is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.directories[wd]
+                continue
+
+            directory, tree = entry
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                # Files written into a new directory before it is watched are found by discover()
+                if mask & (IN_CREATE | IN_MOVED_TO) and tree:
+                    self.watch_tree(path)
+                    changed.update(discover([path]))
+            elif name.endswith('.cg'):
+                if tree:
+                    changed.add(path)
+                named = self.files.get(os.path.normpath(path))
+                if named is not None:
+                    changed.add(named)
+        return changed
+
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Reports changed .cg files by comparing their modification times and sizes
+    every `interval` seconds, where inotify is not available.
+    """
+
+    def __init__(self, paths, interval=DEFAULT_INTERVAL):
+        self.paths = paths
+        self.interval = interval
+        self.stats = self.scan()
+
+
+    def scan(self):
+        """ Returns (modification time, size) of every watched file """
+        stats = {}
+        for filename in discover(self.paths):
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            stats[filename] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+
+    def wait(self, timeout=None):
+        """ Waits for changes like InotifyWatcher.wait() """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval if deadline is None else max(0, min(self.interval, deadline - time.monotonic())))
+            stats = self.scan()
+            changed = {path for path in stats.keys() | self.stats.keys() if stats.get(path) != self.stats.get(path)}
+            self.stats = stats
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+
+    def close(self):
+        pass
+
+
+class Workspace:
+    """
+    The watched files, each kept parsed in memory between changes.
+
+    A file is only parsed again when the hash of its content changes, and then
+    only the statements that differ from the previous version are parsed again
+    (see parser.incremental.Document).
+    """
+
+    def __init__(self):
+        # Path -> (content hash, Document)
+        self.files = {}
+
+
+    def check(self, filename):
+        """
+        Checks a file that may have changed.
+
+        Returns:
+            str: The message to print about the file, or None if its content did
+                not change since it was last checked.
+        """
+
+        try:
+            with open(filename, 'r') as file:
+                source_code = file.read()
+        except FileNotFoundError:
+            if self.files.pop(filename, None) is None:
+                return None
+            return f'{filename}: removed'
+        except (OSError, UnicodeDecodeError) as e:
+            self.files.pop(filename, None)
+            return f'{filename}: {e}'
+
+        digest = hashlib.sha256(source_code.encode('utf-8', 'surrogatepass')).digest()
+        entry = self.files.get(filename)
+        if entry is not None and entry[0] == digest:
+            return None
+
+        if entry is None:
+            document = Document(source_code)
+        else:
+            document = entry[1]
+            document.update(source_code)
+        self.files[filename] = (digest, document)
+
+        error = document.syntax_error()
+        if error is not None:
+            return f'{filename}: Invalid Syntax: {error}'
+        return f'{filename}: Valid Syntax!'
+
+
+def watch_paths(paths, debounce=DEFAULT_DEBOUNCE, interval=DEFAULT_INTERVAL, poll=False, out=sys.stdout):
+    """
+    Validates the .cg files under the given paths, then again whenever they change.
+
+    Runs until interrupted. A line is printed for every file on start, and
+    afterwards for every file whose content changed, once a burst of changes
+    has been quiet for `debounce` seconds.
+
+    Args:
+        paths (list): Files and directories to watch; directories are watched recursively.
+        debounce (float): Seconds to wait for more changes before checking.
+        interval (float): Seconds between scans when polling.
+        poll (bool): Whether to poll even where inotify is available.
+        out: The stream to print to.
+    """
+
+    workspace = Workspace()
+    watcher = None
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            watcher = InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            watcher = None  # e.g. the limit of watches was reached; poll instead
+    if watcher is None:
+        watcher = PollingWatcher(paths, interval)
+
+    try:
+        filenames = discover(paths)
+        invalid = sum(report(workspace, filenames, out))
+        print(f'\nWatching {len(filenames)} file(s), {invalid} invalid, '
+              f'using {"inotify" if isinstance(watcher, InotifyWatcher) else "polling"}. '
+              f'Press Ctrl+C to stop.', file=out, flush=True)
+
+        while True:
+            changed = watcher.wait()
+            while changed is not None:
+                more = watcher.wait(debounce)
+                if more is None:
+                    # Events were lost during the burst
+                    changed = None
+                    break
+                if not more:
+                    break
+                changed |= more
+
+            start = time.perf_counter()
+            if changed is None:
+                # Events were lost, so every file is checked; unchanged ones by hash only
+                changed = set(discover(paths)) | workspace.files.keys()
+            if not changed:
+                continue
+            invalid = sum(report(workspace, sorted(changed), out))
+            print(f'-- {time.strftime("%H:%M:%S")} checked {len(changed)} file(s) in '
+                  f'{(time.perf_counter() - start) * 1000:.1f} ms, {invalid} invalid', file=out, flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+def report(workspace, filenames, out):
+    """ Checks files and prints a line for each changed one, yielding whether each is invalid """
+    for filename in filenames:
+        message = workspace.check(filename)
+        if message is not None:
+            print(message, file=out, flush=True)
+        entry = workspace.files.get(filename)
+        yield entry is not None and entry[1].syntax_error() is not None
@@ -0,0 +1,93 @@
+"""
+Differential tests of the execution backends: every program must print the
+same output and fail with the same error on the bytecode VM (parser.vm) and
+compiled to Python (parser.transpile).
+
+The programs are the samples in tests/valid, the programs of
+benchmarks.backends exercising each rule of the language and each runtime
+error, seeded random programs, and the loop-heavy programs of benchmarks.vm
+with few iterations.
+
+Run with: python -m pytest tests
+"""
+
+import glob
+import io
+import os
+
+import pytest
+
+from benchmarks.backends import CASES, RandomProgram
+from benchmarks.vm import PROGRAMS
+from parser import CodeGoParser
+from parser.compiler import CompileError, compile_program
+from parser.lexer import CodeGoLexer
+from parser.optimize import Optimizer
+from parser.tokens import LineIndex
+from parser.transpile import transpile
+from parser.vm import VM, ExecutionError
+
+SAMPLES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'valid', '*.cg')))
+
+RANDOM_PROGRAMS = 300
+
+# A loop with an expression the optimizer moves out of it
+HOISTED = '''
+Numero a = 3
+Numero i = 0
+Habang (i < 3) {
+    print(a * 2 + i)
+    i = i + 1
+}
+'''
+
+
+def run_backend(backend, statements, lines):
+    """ Runs a program on a backend, returning what it printed and its error message, if any """
+    out = io.StringIO()
+    try:
+        if backend == 'vm':
+            VM(out, lines).run(compile_program(statements, lines))
+        else:
+            transpile(statements, lines).run(out)
+    except (CompileError, ExecutionError) as e:
+        return out.getvalue(), f'{type(e).__name__}: {e}'
+    return out.getvalue(), None
+
+
+def assert_backends_agree(source):
+    lines = LineIndex(source)
+    statements = CodeGoParser(CodeGoLexer.iter_tokens(source, lines), lines).parse()
+    assert run_backend('py', statements, lines) == run_backend('vm', statements, lines)
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=os.path.basename)
+def test_sample(path):
+    with open(path, encoding='utf-8') as file:
+        assert_backends_agree(file.read())
+
+
+@pytest.mark.parametrize('name', CASES)
+def test_case(name):
+    assert_backends_agree(CASES[name])
+
+
+@pytest.mark.parametrize('seed', range(RANDOM_PROGRAMS))
+def test_random_program(seed):
+    assert_backends_agree(RandomProgram(seed).generate())
+
+
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_timed_program(name):
+    generate, _ = PROGRAMS[name]
+    assert_backends_agree(generate(100))
+
+
+@pytest.mark.parametrize('name', ('python-constants', 'prefixed-names', 'hoisted'))
+def test_python_source_compiles(name):
+    # Variables added by the optimizer must also get valid Python names
+    source = HOISTED if name == 'hoisted' else CASES[name]
+    lines = LineIndex(source)
+    statements = CodeGoParser(CodeGoLexer.iter_tokens(source, lines), lines).parse()
+    python_source = transpile(Optimizer(2, lines).optimize(statements), lines).source()
+    compile(python_source, name, 'exec')
@@ -0,0 +1,77 @@
+"""
+Deep nesting: programs nested far beyond the Python recursion limit must parse
+into a tree as deep as the program, and everything done with the tree after
+parsing must cope with its depth.
+
+Run with: python -m pytest tests
+"""
+
+import io
+import json
+
+import pytest
+
+from benchmarks.depth import GENERATORS
+from parser import CodeGoParser
+from parser.emit import BufferedWriter, write_json
+from parser.lexer import CodeGoLexer
+from parser.nodes import Node, to_dict
+
+DEPTH = 10000
+
+
+def parse(source):
+    return CodeGoParser(CodeGoLexer.token_stream(source)).parse()
+
+
+def node_depth(ast):
+    """ Returns the largest number of nodes on a path from the root of a tree """
+    deepest = 0
+    stack = [(ast, 0)]
+    while stack:
+        value, depth = stack.pop()
+        if isinstance(value, Node):
+            depth += 1
+            deepest = max(deepest, depth)
+            stack.extend((child, depth) for _, child in value.fields())
+        elif isinstance(value, list):
+            stack.extend((item, depth) for item in value)
+        elif isinstance(value, dict):
+            stack.extend((item, depth) for item in value.values())
+    return deepest
+
+
+def json_text(ast):
+    """ Returns the syntax tree as written by write_json() """
+    stream = io.StringIO()
+    out = BufferedWriter(stream)
+    write_json(ast, out)
+    out.flush()
+    return stream.getvalue()
+
+
+@pytest.mark.parametrize('name', GENERATORS)
+def test_deep_program_parses(name):
+    ast = parse(GENERATORS[name](DEPTH))
+    assert node_depth(ast) >= DEPTH
+
+
+@pytest.mark.parametrize('name', GENERATORS)
+def test_deep_trees_compare_equal(name):
+    generate = GENERATORS[name]
+    assert parse(generate(DEPTH)) == parse(generate(DEPTH))
+    assert parse(generate(DEPTH)) != parse(generate(DEPTH + 1))
+
+
+@pytest.mark.parametrize('name', GENERATORS)
+def test_deep_tree_converts(name):
+    ast = parse(GENERATORS[name](DEPTH))
+    assert to_dict(ast)
+    assert json_text(ast)
+
+
+@pytest.mark.parametrize('name', GENERATORS)
+def test_json_matches_dictionary_form(name):
+    # Shallow enough for the json module, which recurses
+    ast = parse(GENERATORS[name](100))
+    assert json.loads(json_text(ast)) == json.loads(json.dumps(to_dict(ast)))
@@ -0,0 +1,86 @@
+"""
+Incremental reparsing: a parser.incremental Document edited at random must
+always hold exactly the statements of a full parse of its text, or fail with
+the same error.
+
+The edits are small insertions and deletions, many of which break the syntax
+(unclosed blocks and strings, stray braces, comments) and are then mostly
+undone, so that errors sometimes pile up in several places.
+
+Run with: python -m pytest tests
+"""
+
+import random
+
+import pytest
+
+from benchmarks.corpus import generate
+from parser import CodeGoParser
+from parser.incremental import Document
+from parser.lexer import CodeGoLexer
+from parser.tokens import LineIndex
+
+# Text inserted by the random edits
+SNIPPETS = (
+    '{', '}', '(', ')', '"', '#', '-', '=', ' + 1', 'x', '1', ' ', '\n', '"a"', '# komento\n',
+    'y = 3 ', 'print(x)\n', 'Numero z = 2\n', 'Kung (a > 1) {\n', 'Gawa f (a) {\n', '\nHabang (b) {\n}\n',
+    '[', ']', ',', '[1, [2]]', '{k: ', 'Lista l = [\n',
+)
+
+# Share of the edits that break the program and are not undone
+KEEP_BROKEN = 0.2
+
+SIZE = 10_000
+EDITS = 400
+
+
+def full_parse(text):
+    """ Returns the statements of a full parse of the text, or its error message """
+    lines = LineIndex(text)
+    try:
+        return CodeGoParser(CodeGoLexer.iter_tokens(text, lines), lines).parse()
+    except RuntimeError as e:
+        return str(e)
+
+
+def document_statements(document, start, end, text):
+    """ Applies an edit, returning the statements of the document or its error message """
+    try:
+        document.edit(start, end, text)
+        return document.statements()
+    except RuntimeError as e:
+        return str(e)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_random_edits_match_a_full_parse(seed):
+    rand = random.Random(seed)
+    document = Document(generate(SIZE, seed))
+    failed = []
+    for _ in range(EDITS):
+        text = document.text()
+        start = rand.randrange(len(text) + 1)
+        end = min(len(text), start + rand.choice((0, 0, 1, 2, 5)))
+        snippet = rand.choice(SNIPPETS)
+        result = document_statements(document, start, end, snippet)
+        expected = full_parse(document.text())
+        if result != expected:
+            failed.append(f'edit {start}:{end} -> {snippet!r}: {str(result)[:200]} instead of {str(expected)[:200]}')
+
+        # Undo most edits that break the program, so that most edits start from valid text
+        if isinstance(expected, str) and rand.random() >= KEEP_BROKEN:
+            document_statements(document, start, start + len(snippet), text[start:end])
+    assert failed == []
+
+
+def test_block_left_open_is_reported_then_fixed():
+    source = generate(SIZE)
+    document = Document(source)
+    offset = source.index('\n') + 1
+    document.edit(offset, offset, 'Kung (bukas) {\n')
+    assert document.syntax_error() is not None
+    assert document_statements(document, offset, offset, '') == full_parse(document.text())
+
+    document.edit(offset, offset + len('Kung (bukas) {\n'), '')
+    assert document.syntax_error() is None
+    assert document.statements() == full_parse(source)
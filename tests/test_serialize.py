@@ -0,0 +1,150 @@
+"""
+Binary syntax trees: every sample in tests/valid, deeply nested programs and a
+generated corpus must survive a round trip through parser.serialize, walk()
+must visit every value of them, and truncated or corrupt data must either
+decode or fail with ValueError.
+
+Run with: python -m pytest tests
+"""
+
+import glob
+import os
+import random
+
+import pytest
+
+from benchmarks.corpus import generate
+from benchmarks.depth import GENERATORS
+from parser import CodeGoParser, serialize
+from parser.lexer import CodeGoLexer
+from parser.nodes import Comment, Literal, Node
+
+SAMPLES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'valid', '*.cg')))
+
+
+def parse(source):
+    return CodeGoParser(CodeGoLexer.iter_tokens(source)).parse()
+
+
+def sample_trees():
+    """ Returns the trees to round-trip, by name """
+    trees = {os.path.basename(path): parse(open(path).read()) for path in SAMPLES}
+    trees.update((f'nested {name}', parse(generate_depth(10000))) for name, generate_depth in GENERATORS.items())
+
+    # Large enough to be written in several blocks
+    trees['corpus'] = parse(generate(300_000, seed=3))
+
+    # Comments are skipped by the lexer, so this node is made by hand
+    trees['comment'] = [Comment('# Komento', 5)]
+    return trees
+
+
+TREES = sample_trees()
+
+
+def node_classes(ast):
+    """ Returns the classes of all nodes in a tree """
+    classes = set()
+    stack = [ast]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, Node):
+            classes.add(type(value))
+            stack.extend(child for _, child in value.fields())
+        elif isinstance(value, list):
+            stack.extend(value)
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+    return classes
+
+
+def rebuild(events):
+    """ Builds the statements of a tree back from its walk() events """
+    statements = []
+
+    # Each entry is [number of parts still to come, parts so far, function building the value]
+    stack = []
+    for event, value, offset in events:
+        if event == serialize.NODE_EVENT:
+            count = len(value._fields)
+            build = lambda parts, cls=value, offset=offset: cls(*parts, offset)
+        elif event == serialize.LIST_EVENT:
+            count, build = value, list
+        elif event == serialize.DICT_EVENT:
+            count, build = value * 2, lambda parts: dict(zip(parts[::2], parts[1::2]))
+        else:
+            count, build = 0, lambda parts, value=value: value
+
+        stack.append([count, [], build])
+        while stack and not stack[-1][0]:
+            _, parts, build = stack.pop()
+            value = build(parts)
+            if not stack:
+                statements.append(value)
+                break
+            stack[-1][0] -= 1
+            stack[-1][1].append(value)
+    assert not stack
+    return statements
+
+
+@pytest.mark.parametrize('name', TREES)
+def test_round_trip(name):
+    ast = TREES[name]
+    data = serialize.dumps(ast)
+    assert serialize.loads(data) == ast
+    assert list(serialize.iter_loads(data)) == ast
+
+
+@pytest.mark.parametrize('name', TREES)
+def test_walk_visits_every_value(name):
+    ast = TREES[name]
+    assert rebuild(serialize.walk(serialize.dumps(ast))) == ast
+
+
+def test_samples_cover_every_node_class():
+    covered = set().union(*map(node_classes, TREES.values()))
+    assert [cls.__name__ for cls in serialize.NODE_CLASSES if cls not in covered] == []
+
+
+def test_scalars_keep_their_type():
+    values = [0, 1, 1.0, True, False, None, 0.0, -0.0, -5, 2 ** 70, -2 ** 70, '', '1', 'Ñ\ud800']
+    ast = [Literal(0, value, offset) for offset, value in enumerate(values)]
+    loaded = serialize.loads(serialize.dumps(ast))
+    assert [(type(node.value), repr(node.value)) for node in loaded] == [(type(value), repr(value)) for value in values]
+
+
+def test_unsupported_value_is_rejected():
+    with pytest.raises(TypeError):
+        serialize.dumps([Literal(0, object(), 0)])
+
+
+def decode_failure(data):
+    """ Returns the error that loading or walking data fails with other than ValueError, or None """
+    for decode in (serialize.loads, lambda data: list(serialize.walk(data))):
+        try:
+            decode(data)
+        except ValueError:
+            pass
+        except Exception as e:
+            return e
+    return None
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=os.path.basename)
+def test_damaged_tree_is_rejected_with_value_error(path):
+    rng = random.Random(0)
+    data = serialize.dumps(parse(open(path).read()))
+    damaged = [(f'cut at {length}', data[:length]) for length in range(len(data))]
+    for _ in range(200):
+        position = rng.randrange(len(data))
+        corrupt = bytearray(data)
+        corrupt[position] = rng.randrange(256)
+        damaged.append((f'byte {position} set to {corrupt[position]}', bytes(corrupt)))
+
+    failed = []
+    for description, value in damaged:
+        error = decode_failure(value)
+        if error is not None:
+            failed.append(f'{description}: {type(error).__name__}: {error}')
+    assert failed == []